@@ -0,0 +1,3 @@
+"""
+Benchmarks de rendimiento del bot (se ejecutan sin conexión contra ficheros temporales)
+"""
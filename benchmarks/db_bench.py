@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la capa de base de datos (src/database/models.py)
+
+Genera datasets sintéticos de verifications/pending_verifications en ficheros
+temporales, mide cada método de Database bajo carga concurrente de asyncio y
+escribe latencias p50/p99 y throughput en JSON.
+
+Uso:
+    python -m benchmarks.db_bench
+    python -m benchmarks.db_bench --sizes 1000,10000,100000,1000000 --output bench.json
+    python -m benchmarks.db_bench --write-behind --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.models import Database, VERIFIED_PAGE_COLUMNS
+from src.utils.role_mapping import CANONICAL_ROLES, roles_to_mask
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+INSERT_CHUNK = 50000
+PAGE_SIZE = 10
+# Fracción de verificados que siguen en el servidor en el escenario de limpieza
+MEMBER_RATIO = 0.9
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+def summarize(latencies: List[float], wall_seconds: float) -> Dict[str, Any]:
+    """Resumen de latencias (en ms) y throughput de una operación"""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "count": count,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 4),
+        "mean_ms": round((sum(ordered) / count if count else 0.0) * 1000, 4),
+        "ops_per_sec": round(count / wall_seconds, 1) if wall_seconds > 0 else 0.0
+    }
+
+async def run_concurrent(op: Callable[[int], Awaitable[Any]], iterations: int,
+                         concurrency: int) -> Dict[str, Any]:
+    """Ejecuta op(i) iterations veces con como mucho concurrency tareas a la vez"""
+    latencies: List[float] = []
+    counter = iter(range(iterations))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            await op(i)
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, iterations)))))
+    return summarize(latencies, time.perf_counter() - wall_start)
+
+async def run_once(op: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Mide una operación que solo tiene sentido ejecutar una vez (limpieza real)"""
+    start = time.perf_counter()
+    await op()
+    elapsed = time.perf_counter() - start
+    return summarize([elapsed], elapsed)
+
+async def populate(database: Database, size: int, rng: random.Random) -> List[int]:
+    """Inserta size verificaciones y size/10 pendientes sintéticas; devuelve los discord_ids"""
+    discord_ids = rng.sample(range(10 ** 17, 10 ** 17 + size * 20), size)
+    base_ts = time.time() - 365 * 24 * 3600
+
+    async with database._connection() as db:
+        for start in range(0, size, INSERT_CHUNK):
+            rows = []
+            for offset, discord_id in enumerate(discord_ids[start:start + INSERT_CHUNK], start):
+                roles = rng.sample(CANONICAL_ROLES, rng.randint(1, 2))
+                verified_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(base_ts + offset * 30))
+                rows.append((discord_id, offset, f"user{offset}", f"User {offset}",
+                             ','.join(roles), roles_to_mask(roles), "token", verified_at))
+            await db.executemany("""
+                INSERT INTO verifications
+                (discord_id, genius_id, genius_username, genius_display_name,
+                 genius_roles, genius_roles_mask, access_token, verified_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+
+        # Mitad de las pendientes ya caducadas para que el barrido tenga trabajo
+        pending = []
+        for i in range(max(1, size // 10)):
+            age = rng.choice((60, 2 * database.pending_ttl))
+            created_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(time.time() - age))
+            pending.append((f"bench-{i}", rng.choice(discord_ids), created_at))
+        await db.executemany(
+            "INSERT INTO pending_verifications (state, discord_id, created_at) VALUES (?, ?, ?)",
+            pending
+        )
+        await db.commit()
+
+    await database.refresh_verified_index()
+    return discord_ids
+
+async def bench_size(size: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    """Ejecuta todos los escenarios sobre un dataset de size filas"""
+    rng = random.Random(args.seed)
+    db_path = os.path.join(workdir, f"bench_{size}.db")
+    database = Database(db_path=db_path, write_behind=args.write_behind)
+    # El barrido periódico se mide explícitamente, no en segundo plano
+    database.sweep_interval = 0
+    await database.init_db()
+
+    populate_start = time.perf_counter()
+    discord_ids = await populate(database, size, rng)
+    populate_seconds = time.perf_counter() - populate_start
+    print(f"📦 {size} verificaciones generadas en {populate_seconds:.1f}s", file=sys.stderr)
+
+    n, c = args.iterations, args.concurrency
+    missing_base = 10 ** 16
+    genius_data = {"id": 1, "login": "bench", "name": "Bench", "roles": ["Editor", "Staff"]}
+    results: Dict[str, Any] = {}
+
+    async def step(name: str, coro: Awaitable[Dict[str, Any]]):
+        results[name] = await coro
+        print(f"   ⏱️ {name}: p50={results[name]['p50_ms']} ms p99={results[name]['p99_ms']} ms "
+              f"({results[name]['ops_per_sec']} ops/s)", file=sys.stderr)
+
+    # Lecturas puntuales
+    await step("is_verified_hit", run_concurrent(
+        lambda i: database.is_verified(discord_ids[i % size]), n, c))
+    await step("is_verified_miss", run_concurrent(
+        lambda i: database.is_verified(missing_base + i), n, c))
+    await step("get_verification", run_concurrent(
+        lambda i: database.get_verification(discord_ids[rng.randrange(size)]), n, c))
+
+    # Flujo de verificación: pendiente -> consumo -> guardado
+    await step("create_pending_verification", run_concurrent(
+        lambda i: database.create_pending_verification(f"run-{i}", discord_ids[i % size]), n, c))
+    await step("get_pending_verification", run_concurrent(
+        lambda i: database.get_pending_verification(f"run-{i}"), n, c))
+    await step("save_verification_update", run_concurrent(
+        lambda i: database.save_verification(discord_ids[i % size], genius_data, "token"), n, c))
+    await step("save_verification_insert", run_concurrent(
+        lambda i: database.save_verification(missing_base + i, genius_data, "token"), n, c))
+    await step("remove_verification", run_concurrent(
+        lambda i: database.remove_verification(missing_base + i), n, c))
+    await step("flush", run_concurrent(lambda i: database.flush(), max(1, n // 10), 1))
+
+    # Estadísticas (health checks, panel, bot_stats)
+    await step("get_stats", run_concurrent(lambda i: database.get_stats(), n, c))
+    await step("get_verified_count", run_concurrent(lambda i: database.get_verified_count(), n, c))
+    await step("get_pending_count", run_concurrent(lambda i: database.get_pending_count(), max(1, n // 10), c))
+    await step("get_role_distribution", run_concurrent(
+        lambda i: database.get_role_distribution(), max(1, n // 10), c))
+    await step("count_members_with_role", run_concurrent(
+        lambda i: database.count_members_with_role(CANONICAL_ROLES[i % len(CANONICAL_ROLES)]),
+        max(1, n // 10), c))
+    await step("get_members_with_role", run_concurrent(
+        lambda i: database.get_members_with_role(CANONICAL_ROLES[i % len(CANONICAL_ROLES)], limit=100),
+        max(1, n // 10), c))
+
+    # Consulta de verified_list: primera página, avance por clave y saltos
+    await step("verified_list_first_page", run_concurrent(
+        lambda i: database.get_verified_page(PAGE_SIZE), n, c))
+    page_cursors = []
+    cursor_key = None
+    for _ in range(min(100, size // PAGE_SIZE)):
+        rows = await database.get_verified_page(PAGE_SIZE, after=cursor_key)
+        if not rows:
+            break
+        cursor_key = (rows[-1][4], rows[-1][0])
+        page_cursors.append(cursor_key)
+    page_cursors = page_cursors or [None]
+    await step("verified_list_keyset_next", run_concurrent(
+        lambda i: database.get_verified_page(PAGE_SIZE, after=page_cursors[i % len(page_cursors)]), n, c))
+    await step("verified_list_keyset_prev", run_concurrent(
+        lambda i: database.get_verified_page(PAGE_SIZE, before=page_cursors[i % len(page_cursors)]), n, c))
+    await step("verified_list_last_page", run_concurrent(
+        lambda i: database.get_verified_tail(PAGE_SIZE), max(1, n // 10), c))
+    await step("verified_list_jump", run_concurrent(
+        lambda i: database.get_verified_page_at(rng.randrange(max(1, size - PAGE_SIZE)), PAGE_SIZE),
+        max(1, n // 10), c))
+
+    # Consulta antigua de verified_list (tabla completa) como referencia
+    async def full_scan(_):
+        async with database._connection() as db:
+            cursor = await db.execute(
+                f"SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications ORDER BY verified_at DESC"
+            )
+            await cursor.fetchall()
+    await step("verified_list_full_scan_baseline", run_concurrent(full_scan, max(1, n // 100), 1))
+
+    # Limpieza: miembros actuales = MEMBER_RATIO de los verificados
+    member_ids = set(rng.sample(discord_ids, int(size * MEMBER_RATIO)))
+    await step("find_departed_verifications", run_concurrent(
+        lambda i: database.find_departed_verifications(member_ids), max(1, n // 100), 1))
+    await step("cleanup_departed_dry_run", run_concurrent(
+        lambda i: database.cleanup_departed(member_ids, dry_run=True), max(1, n // 100), 1))
+    await step("cleanup_departed", run_once(lambda: database.cleanup_departed(member_ids)))
+
+    # Barrido de pendientes caducadas
+    await step("sweep_expired_pending", run_once(lambda: database.sweep_expired_pending()))
+
+    await database.close()
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(db_path + suffix)
+        except FileNotFoundError:
+            pass
+
+    return {
+        "size": size,
+        "populate_seconds": round(populate_seconds, 3),
+        "results": results
+    }
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    report = {
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "python": sys.version.split()[0],
+        "iterations": args.iterations,
+        "concurrency": args.concurrency,
+        "write_behind": args.write_behind,
+        "runs": []
+    }
+    with tempfile.TemporaryDirectory(prefix="geebot-bench-") as workdir:
+        for size in args.sizes:
+            print(f"🚀 Benchmark con {size} filas", file=sys.stderr)
+            report["runs"].append(await bench_size(size, args, workdir))
+    return report
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de la capa de base de datos")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Tamaños de dataset separados por comas (p. ej. 1000,10000,100000,1000000)")
+    parser.add_argument("--iterations", type=int, default=2000,
+                        help="Operaciones por escenario de lectura/escritura")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Tareas asyncio concurrentes por escenario")
+    parser.add_argument("--write-behind", action="store_true",
+                        help="Activar el modo write-behind de Database")
+    parser.add_argument("--seed", type=int, default=1234, help="Semilla del generador de datos")
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    return args
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    result = asyncio.run(main(arguments))
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"✅ Resultados guardados en {arguments.output}")
+    else:
+        print(output)
@@ -41,16 +41,16 @@ async def start_discord_bot():
         env_token = os.environ.get('DISCORD_TOKEN')
         # Si hay token en entorno y difiere del guardado, sobrescribir DB para aplicarlo
         if env_token and env_token != config.get('DISCORD_TOKEN'):
-            config.set('DISCORD_TOKEN', env_token, description='Token sincronizado desde entorno (override)')
+            await config.aset('DISCORD_TOKEN', env_token, description='Token sincronizado desde entorno (override)')
         env_client = os.environ.get('GENIUS_CLIENT_ID')
         if env_client and not config.get('GENIUS_CLIENT_ID'):
-            config.set('GENIUS_CLIENT_ID', env_client)
+            await config.aset('GENIUS_CLIENT_ID', env_client)
         env_secret = os.environ.get('GENIUS_CLIENT_SECRET')
         if env_secret and not config.get('GENIUS_CLIENT_SECRET'):
-            config.set('GENIUS_CLIENT_SECRET', env_secret)
+            await config.aset('GENIUS_CLIENT_SECRET', env_secret)
         env_base = os.environ.get('BASE_URL') or os.environ.get('RENDER_EXTERNAL_URL')
         if env_base and not config.get('BASE_URL'):
-            config.set('BASE_URL', env_base)
+            await config.aset('BASE_URL', env_base)
         
         # Normalizar token (trim espacios/line breaks)
         token_raw = config.get('DISCORD_TOKEN')
@@ -148,6 +148,11 @@ async def lifespan(app: FastAPI):
         
         if bot_task:
             bot_task.cancel()
+        
+        # Cerrar pool de conexiones de la base de datos
+        from src.database.models import db
+        await db.close()
+        logger.info("✅ Base de datos cerrada")
             
     except Exception as e:
         logger.error(f"❌ Error en shutdown: {e}")
@@ -0,0 +1,212 @@
+"""
+Planificador de acciones salientes hacia Discord
+Las acciones (asignar roles, cambiar nicknames, reaccionar, purgar mensajes) se encolan por
+bucket de rate limit con prioridad, en vez de esperarse en línea desde eventos y rutas HTTP
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = antes): las verificaciones nunca esperan detrás de reacciones
+PRIORITY_VERIFICATION = 0
+PRIORITY_MODERATION = 1
+PRIORITY_REACTION = 2
+PRIORITY_BULK = 3  # Trabajos masivos (reconciliación de roles), detrás de todo lo demás
+
+# Acciones ejecutándose a la vez entre todos los buckets
+MAX_CONCURRENT_ACTIONS = 4
+
+# Buckets equivalentes a los rate limits por ruta de Discord (parámetro principal de la ruta)
+def member_bucket(guild_id: int) -> str:
+    """Roles y edición de miembros de un servidor"""
+    return f"members:{guild_id}"
+
+def reaction_bucket(channel_id: int) -> str:
+    """Reacciones en un canal"""
+    return f"reactions:{channel_id}"
+
+def messages_bucket(channel_id: int) -> str:
+    """Borrado de mensajes en un canal"""
+    return f"messages:{channel_id}"
+
+class ScheduledAction:
+    """Acción pendiente: fábrica de la corrutina y future que recibe su resultado"""
+    __slots__ = ('priority', 'seq', 'bucket', 'key', 'factory', 'future', 'enqueued_at', 'superseded')
+
+    def __init__(self, priority: int, seq: int, bucket: str, key: Optional[Hashable],
+                 factory: Callable[[], Awaitable[Any]], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.bucket = bucket
+        self.key = key
+        self.factory = factory
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        # Reemplazada por una entrada de mayor prioridad para la misma clave
+        self.superseded = False
+
+    def __lt__(self, other: "ScheduledAction") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class BucketStats:
+    """Métricas de un bucket"""
+    __slots__ = ('executed', 'coalesced', 'errors', 'max_depth', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+class ActionScheduler:
+    """
+    Una cola con prioridad por bucket y como mucho una acción en curso por bucket, así un
+    bucket limitado por Discord solo retrasa sus propias acciones. Entre buckets se elige
+    siempre la acción más prioritaria, con un máximo global de acciones simultáneas.
+    Las acciones con la misma clave que aún no han empezado se agrupan en una sola.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_ACTIONS):
+        self.max_concurrency = max_concurrency
+        self.loop = None
+        self._queues: Dict[str, List[ScheduledAction]] = {}
+        self._pending: Dict[Hashable, ScheduledAction] = {}
+        self._busy = set()
+        self._running = 0
+        self._seq = itertools.count()
+        self._stats: Dict[str, BucketStats] = {}
+
+    def submit(self, bucket: str, factory: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_MODERATION, key: Optional[Hashable] = None) -> asyncio.Future:
+        """
+        Encolar una acción y devolver un future con su resultado.
+        factory crea la corrutina al ejecutarse (p. ej. lambda: member.add_roles(*roles)).
+        Con key, una acción pendiente con la misma clave se sustituye por esta y
+        ambos llamadores reciben el mismo future.
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is None or self.loop.is_closed():
+            self.loop = loop
+        if loop is not self.loop:
+            # Llamada desde otro loop: encolar en el del planificador
+            return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                self._submit_from_loop(bucket, factory, priority, key), self.loop
+            ))
+        return self._enqueue(bucket, factory, priority, key)
+
+    async def _submit_from_loop(self, bucket, factory, priority, key):
+        return await self._enqueue(bucket, factory, priority, key)
+
+    def _enqueue(self, bucket: str, factory, priority: int, key) -> asyncio.Future:
+        stats = self._stats.get(bucket)
+        if stats is None:
+            stats = self._stats[bucket] = BucketStats()
+
+        existing = self._pending.get(key) if key is not None else None
+        if existing is not None:
+            stats.coalesced += 1
+            existing.factory = factory
+            if priority >= existing.priority:
+                return existing.future
+            # Subir de prioridad: la entrada antigua se salta al desencolarla
+            existing.superseded = True
+            future = existing.future
+        else:
+            future = self.loop.create_future()
+            future.add_done_callback(_consume_exception)
+
+        action = ScheduledAction(priority, next(self._seq), bucket, key, factory, future)
+        if existing is not None:
+            action.enqueued_at = existing.enqueued_at
+        if key is not None:
+            self._pending[key] = action
+        queue = self._queues.setdefault(bucket, [])
+        heapq.heappush(queue, action)
+        stats.max_depth = max(stats.max_depth, len(queue))
+        self._pump()
+        return future
+
+    def _next_action(self) -> Optional[ScheduledAction]:
+        """Sacar la acción más prioritaria de los buckets libres"""
+        best = None
+        for bucket, queue in self._queues.items():
+            if bucket in self._busy:
+                continue
+            while queue and queue[0].superseded:
+                heapq.heappop(queue)
+            if queue and (best is None or queue[0] < best):
+                best = queue[0]
+        if best is not None:
+            heapq.heappop(self._queues[best.bucket])
+        return best
+
+    def _pump(self):
+        """Arrancar acciones mientras haya hueco"""
+        while self._running < self.max_concurrency:
+            action = self._next_action()
+            if action is None:
+                return
+            if action.key is not None and self._pending.get(action.key) is action:
+                del self._pending[action.key]
+            self._busy.add(action.bucket)
+            self._running += 1
+            self.loop.create_task(self._run(action))
+
+    async def _run(self, action: ScheduledAction):
+        stats = self._stats[action.bucket]
+        wait = time.perf_counter() - action.enqueued_at
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        try:
+            result = await action.factory()
+            if not action.future.done():
+                action.future.set_result(result)
+        except Exception as e:
+            stats.errors += 1
+            logger.warning(f"⚠️ Acción en {action.bucket} fallida: {e}")
+            if not action.future.done():
+                action.future.set_exception(e)
+        finally:
+            stats.executed += 1
+            self._busy.discard(action.bucket)
+            self._running -= 1
+            queue = self._queues.get(action.bucket)
+            if queue is not None and not queue:
+                del self._queues[action.bucket]
+            self._pump()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Profundidad de cola y tiempos de espera por bucket"""
+        buckets = {}
+        for bucket, stats in self._stats.items():
+            executed = stats.executed or 1
+            buckets[bucket] = {
+                "depth": sum(1 for action in self._queues.get(bucket, ()) if not action.superseded),
+                "max_depth": stats.max_depth,
+                "executed": stats.executed,
+                "coalesced": stats.coalesced,
+                "errors": stats.errors,
+                "avg_wait_ms": round(stats.total_wait / executed * 1000, 3),
+                "max_wait_ms": round(stats.max_wait * 1000, 3),
+            }
+        return {
+            "running": self._running,
+            "queued": sum(bucket["depth"] for bucket in buckets.values()),
+            "buckets": buckets,
+        }
+
+def _consume_exception(future: asyncio.Future):
+    """Marcar la excepción como recogida: ya se registra en el log al fallar la acción"""
+    if not future.cancelled():
+        future.exception()
+
+# Instancia global
+action_scheduler = ActionScheduler()
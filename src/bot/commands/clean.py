@@ -5,33 +5,12 @@ import logging
 import asyncio
 from typing import Optional
 
+from src.utils.permissions import has_manage_messages_or_staff
+from src.bot.action_scheduler import action_scheduler, messages_bucket, PRIORITY_MODERATION
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-def has_staff_permissions(user: discord.Member) -> bool:
-    """
-    Verifica si un usuario tiene permisos de staff (administrador o roles específicos)
-    """
-    # Verificar si es administrador
-    if user.guild_permissions.administrator:
-        return True
-    
-    # Verificar roles específicos de staff
-    staff_role_names = ["Staff", "Moderator", "Editor", "Moderador"]  # Incluir variantes en español
-    user_role_names = [role.name for role in user.roles]
-    
-    for staff_role in staff_role_names:
-        if staff_role in user_role_names:
-            return True
-    
-    return False
-
-def has_manage_messages_or_staff(user: discord.Member) -> bool:
-    """
-    Verifica si un usuario tiene permisos para gestionar mensajes o es staff
-    """
-    return user.guild_permissions.manage_messages or has_staff_permissions(user)
-
 class CleanConfirmationView(discord.ui.View):
     """Vista para confirmar la limpieza de mensajes"""
     
@@ -63,7 +42,11 @@ class CleanConfirmationView(discord.ui.View):
             )
             
             # Eliminar mensajes
-            deleted = await self.channel.purge(limit=self.amount)
+            deleted = await action_scheduler.submit(
+                messages_bucket(self.channel.id),
+                lambda: self.channel.purge(limit=self.amount),
+                PRIORITY_MODERATION
+            )
             
             # Enviar confirmación
             await interaction.edit_original_response(
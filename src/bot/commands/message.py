@@ -7,27 +7,11 @@ import asyncio
 import re
 from typing import Optional, List
 
+from src.utils.permissions import has_staff_permissions
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-def has_staff_permissions(user: discord.Member) -> bool:
-    """
-    Verifica si un usuario tiene permisos de staff (administrador o roles específicos)
-    """
-    # Verificar si es administrador
-    if user.guild_permissions.administrator:
-        return True
-    
-    # Verificar roles específicos de staff
-    staff_role_names = ["Staff", "Moderator", "Editor", "Moderador"]  # Incluir variantes en español
-    user_role_names = [role.name for role in user.roles]
-    
-    for staff_role in staff_role_names:
-        if staff_role in user_role_names:
-            return True
-    
-    return False
-
 def process_mentions(content: str, guild: discord.Guild) -> str:
     """
     Procesa menciones en el texto y las convierte a formato Discord válido.
@@ -14,6 +14,12 @@ from src.database.models import db
 from src.utils.config import *
 from src.services.keep_alive import start_keep_alive, stop_keep_alive, get_keep_alive_stats
 from src.utils.bot_instance import set_bot_instance
+from src.utils.role_mapping import mask_to_roles
+from src.utils.role_cache import role_cache
+from src.utils.permissions import permissions, has_staff_permissions
+from src.bot.action_scheduler import action_scheduler, reaction_bucket, PRIORITY_MODERATION, PRIORITY_REACTION
+from src.bot.member_mutation import MemberMutation
+from src.bot.role_reconciler import role_reconciler, STATUS_RUNNING
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -27,75 +33,30 @@ logger.info(f"🤖 Bot iniciado - Instancia ID: {BOT_INSTANCE_ID}")
 import time
 server_start_time = time.time()
 
-def has_staff_permissions(user: discord.Member) -> bool:
-    """
-    Verifica si un usuario tiene permisos de staff (administrador o roles específicos)
-    """
-    # Verificar si es administrador
-    if user.guild_permissions.administrator:
-        return True
-    
-    # Verificar roles específicos de staff
-    staff_role_names = ["Staff", "Moderator", "Editor", "Moderador"]  # Incluir variantes en español
-    user_role_names = [role.name for role in user.roles]
-    
-    for staff_role in staff_role_names:
-        if staff_role in user_role_names:
-            return True
-    
-    return False
-
-def has_manage_messages_or_staff(user: discord.Member) -> bool:
-    """
-    Verifica si un usuario tiene permisos para gestionar mensajes o es staff
-    """
-    return user.guild_permissions.manage_messages or has_staff_permissions(user)
-
 async def remove_genius_roles(member: discord.Member, guild: discord.Guild):
     """Elimina todos los roles de Genius de un usuario"""
     try:
-        # Obtener configuración dinámica
-        from src.utils.dynamic_config import config
-        
-        # Lista de todos los roles de Genius que el bot puede asignar
-        genius_role_ids = []
-        genius_roles = ['ROLE_CONTRIBUTOR', 'ROLE_EDITOR', 'ROLE_MODERATOR', 'ROLE_STAFF', 'ROLE_VERIFIED_ARTIST', 'ROLE_TRANSCRIBER', 'ROLE_MEDIATOR']
-        for role_key in genius_roles:
-            role_id = config.get(role_key, '')
-            if role_id and role_id.isdigit():
-                genius_role_ids.append(int(role_id))
-        
-        verified_role_id = config.get('VERIFIED_ROLE_ID', '')
-        if verified_role_id and verified_role_id.isdigit():
-            genius_role_ids.append(int(verified_role_id))
-
-        # Debug: mostrar configuración de roles
-        print(f"🔍 DEBUG UNVERIFY - Genius role IDs configurados: {genius_role_ids}")
-        print(f"🔍 DEBUG UNVERIFY - Roles del usuario: {[f'{role.name} (ID: {role.id})' for role in member.roles]}")
+        # Roles de Genius (y de verificado) resueltos para la configuración actual
+        resolved = role_cache.resolve(guild)
         
         # Encontrar roles que el usuario tiene y que son de Genius
-        roles_to_remove = []
-        for role in member.roles:
-            if role.id in genius_role_ids:
-                roles_to_remove.append(role)
-                print(f"✅ DEBUG UNVERIFY - Rol a eliminar: {role.name} (ID: {role.id})")
-            else:
-                print(f"⏭️ DEBUG UNVERIFY - Rol no es de Genius: {role.name} (ID: {role.id})")
-
-        print(f"🔍 DEBUG UNVERIFY - Total roles a eliminar: {len(roles_to_remove)}")
+        roles_to_remove = resolved.managed_roles_of(member)
+        logger.debug(f"🔍 Unverify - Roles a eliminar: {[f'{role.name} (ID: {role.id})' for role in roles_to_remove]}")
+        
+        # Quitar roles y restaurar nickname en un único PATCH (ninguno si no hay cambios)
+        changes = await (
+            MemberMutation(member)
+            .remove_roles(*roles_to_remove)
+            .set_nick(None)
+            .schedule(PRIORITY_MODERATION, reason="Usuario desverificado")
+        )
         
         if roles_to_remove:
-            await member.remove_roles(*roles_to_remove, reason="Usuario desverificado")
             logger.info(f"✅ Roles de Genius eliminados de {member}: {[role.name for role in roles_to_remove]}")
         else:
             logger.info(f"ℹ️ {member} no tenía roles de Genius para eliminar")
-
-        # Intentar restaurar nickname (opcional)
-        try:
-            await member.edit(nick=None, reason="Usuario desverificado")
+        if "nick" in changes:
             logger.info(f"✅ Nickname restaurado para {member}")
-        except Exception as e:
-            logger.warning(f"⚠️ No se pudo restaurar nickname de {member}: {e}")
 
     except Exception as e:
         logger.error(f"❌ Error eliminando roles de Genius de {member}: {e}")
@@ -103,29 +64,25 @@ async def remove_genius_roles(member: discord.Member, guild: discord.Guild):
 async def setup_config_event_listeners():
     """Configurar listeners para eventos de configuración"""
     try:
-        # Sistema de eventos local
-        from src.utils.event_system import event_system, Events
-        
-        # Establecer el loop de eventos para callbacks async
-        event_system.set_event_loop(asyncio.get_event_loop())
+        from src.utils.topic_bus import bus, Topics
+        from src.utils.event_system import CONFIG_COALESCE_WINDOW
         
-        # Suscribirse a eventos de configuración
-        event_system.subscribe_async(Events.CONFIG_UPDATED, on_config_updated)
-        event_system.subscribe_async(Events.ROLE_CONFIG_CHANGED, on_role_config_changed)
-        event_system.subscribe_async(Events.DISCORD_TOKEN_CHANGED, on_discord_token_changed)
+        # Un solo handler por evento: recibe en proceso los cambios hechos aquí y, por el
+        # registro de señales, los hechos por otros procesos (p. ej. el panel).
+        # Una ráfaga de cambios (p. ej. un guardado del panel) se entrega como un solo change-set
+        bus.subscribe(Topics.CONFIG_ALL, on_config_updated, remote=True, coalesce=CONFIG_COALESCE_WINDOW)
+        bus.subscribe(Topics.CONFIG_ROLES, on_role_config_changed, remote=True, coalesce=CONFIG_COALESCE_WINDOW)
+        bus.subscribe(Topics.CONFIG_TOKEN, on_discord_token_changed, remote=True)
         
-        # Sistema de señales para comunicación entre procesos
-        from src.utils.signal_system import signal_system, Signals
+        # Escuchar mensajes remotos por socket (aviso inmediato); el polling queda como respaldo
+        bus.start(asyncio.get_running_loop(), poll_interval=2.0)
         
-        # Suscribirse a señales de configuración
-        signal_system.subscribe(Signals.CONFIG_UPDATED, on_config_signal)
-        signal_system.subscribe(Signals.ROLE_CONFIG_CHANGED, on_role_config_signal)
-        signal_system.subscribe(Signals.DISCORD_TOKEN_CHANGED, on_discord_token_signal)
-        
-        # Iniciar polling de señales
-        signal_system.start_polling(interval=2.0)
+        # Los cambios de configuración de otros procesos se aplican al llegar su mensaje por
+        # el bus (refresh vía PRAGMA data_version); el hilo solo hace un repaso de respaldo
+        from src.utils.dynamic_config import config
+        config.start_watching()
         
-        logger.info("✅ Sistema de eventos y señales de configuración configurado")
+        logger.info("✅ Bus de eventos de configuración configurado")
         
     except Exception as e:
         logger.error(f"❌ Error configurando listeners de eventos: {e}")
@@ -148,6 +105,9 @@ async def on_role_config_changed(data):
     try:
         logger.info(f"🎭 Configuración de roles actualizada: {data}")
         
+        # Los roles resueltos ya dependen de la versión de configuración; se descartan igualmente
+        role_cache.invalidate()
+        
         # Obtener configuración dinámica actualizada
         from src.utils.dynamic_config import config
         verified_role_id = config.get('VERIFIED_ROLE_ID', '')
@@ -170,42 +130,6 @@ async def on_discord_token_changed(data):
     except Exception as e:
         logger.error(f"❌ Error procesando cambio de token: {e}")
 
-def on_config_signal(data):
-    """Callback síncrono para señales de configuración"""
-    try:
-        logger.info(f"📡 Señal de configuración recibida: {data}")
-        
-        # La configuración dinámica se actualiza automáticamente
-        # No necesitamos recargar nada manualmente
-        
-        logger.info("✅ Configuración dinámica actualizada desde señal")
-        
-    except Exception as e:
-        logger.error(f"❌ Error procesando señal de configuración: {e}")
-
-def on_role_config_signal(data):
-    """Callback síncrono para señales de cambio de roles"""
-    try:
-        logger.info(f"🎭 Señal de roles recibida: {data}")
-        
-        # La configuración dinámica se actualiza automáticamente
-        # No necesitamos recargar nada manualmente
-        
-        logger.info("✅ Configuración de roles actualizada dinámicamente desde señal")
-        
-    except Exception as e:
-        logger.error(f"❌ Error procesando señal de roles: {e}")
-
-def on_discord_token_signal(data):
-    """Callback síncrono para señales de cambio de token"""
-    try:
-        logger.warning("⚠️ Señal de cambio de token recibida - Se requiere reinicio")
-        
-        # En un entorno de producción, esto podría disparar un reinicio automático
-        
-    except Exception as e:
-        logger.error(f"❌ Error procesando señal de token: {e}")
-
 intents = discord.Intents.default()
 # Asegúrate de habilitar estos intents también en el Developer Portal
 intents.guilds = True
@@ -214,11 +138,50 @@ intents.message_content = True  # necesario para leer el contenido y usar prefij
 intents.guild_reactions = True
 intents.members = True  # Necesario para obtener miembros del servidor
 
+# Mensajes de sistema de bienvenida que Discord puede enviar (se construyen una sola vez)
+BOOST_MESSAGE_TYPES = frozenset({
+    discord.MessageType.premium_guild_subscription,  # Boost del servidor
+    discord.MessageType.premium_guild_tier_1,        # Servidor alcanzó nivel 1
+    discord.MessageType.premium_guild_tier_2,        # Servidor alcanzó nivel 2
+    discord.MessageType.premium_guild_tier_3         # Servidor alcanzó nivel 3
+})
+WELCOME_MESSAGE_TYPES = BOOST_MESSAGE_TYPES | {discord.MessageType.new_member}  # Usuario se unió al servidor
+
+class MessagePrefilter:
+    """
+    Primera etapa de on_message: descarta con un par de comprobaciones de atributos los
+    mensajes que no son comandos ni bienvenidas, antes de entrar en el parseo de comandos
+    """
+    __slots__ = ('_config', '_snapshot', 'prefix', 'counters')
+
+    def __init__(self):
+        from src.utils.dynamic_config import config
+        self._config = config
+        self._snapshot = None
+        self.prefix = ''
+        # Mensajes que ha resuelto cada rama
+        self.counters = {'bot': 0, 'welcome': 0, 'ignored': 0, 'command': 0}
+
+    def current_prefix(self) -> str:
+        """Prefijo de comandos, recalculado solo cuando cambia el snapshot de configuración"""
+        snapshot = self._config.snapshot()
+        if snapshot is not self._snapshot:
+            self.prefix = self._config.str('CMD_PREFIX')
+            self._snapshot = snapshot
+        return self.prefix
+
+    def get_stats(self) -> dict:
+        """Contadores por rama y total de mensajes vistos"""
+        stats = dict(self.counters)
+        stats['total'] = sum(self.counters.values())
+        return stats
+
+message_filter = MessagePrefilter()
+
 # Prefijo dinámico desde configuración
 def get_prefix(_bot, message):
     # Devuelve el prefijo actual sin reiniciar el bot
-    from src.utils.dynamic_config import config
-    return config.get('CMD_PREFIX', '!!') or "!!"
+    return message_filter.current_prefix()
 
 bot = commands.Bot(command_prefix=get_prefix, intents=intents, help_command=None)
 
@@ -246,40 +209,59 @@ async def on_member_remove(member: discord.Member):
     except Exception as e:
         logger.error(f"Error procesando salida de miembro {member}: {e}")
 
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    """Un rol borrado puede ser uno de los roles de Genius o de staff resueltos en caché"""
+    role_cache.invalidate(role.guild.id)
+    permissions.invalidate(role.guild.id)
+
+@bot.event
+async def on_guild_role_create(role: discord.Role):
+    """Un rol nuevo puede tener el ID configurado que antes no existía"""
+    role_cache.invalidate(role.guild.id)
+    permissions.invalidate(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    """Un rol renombrado puede entrar o salir de los roles de staff por nombre"""
+    if before.name != after.name:
+        permissions.invalidate(after.guild.id)
+
 @bot.event
 async def on_message(message: discord.Message):
     """Se ejecuta cuando se recibe un mensaje"""
+    counters = message_filter.counters
     try:
-        # Ignorar mensajes del bot
-        if message.author == bot.user:
+        # Ignorar mensajes de bots (incluido este) y webhooks: nunca son comandos
+        if message.author.bot or message.webhook_id is not None:
+            counters['bot'] += 1
             return
         
         # Verificar si es un mensaje de bienvenida del sistema de Discord
-        # Tipos de mensajes de bienvenida que Discord puede enviar:
-        welcome_message_types = [
-            discord.MessageType.new_member,           # Usuario se unió al servidor
-            discord.MessageType.premium_guild_subscription,  # Boost del servidor
-            discord.MessageType.premium_guild_tier_1,        # Servidor alcanzó nivel 1
-            discord.MessageType.premium_guild_tier_2,        # Servidor alcanzó nivel 2  
-            discord.MessageType.premium_guild_tier_3         # Servidor alcanzó nivel 3
-        ]
-        
-        if (message.type in welcome_message_types and 
-            message.author.bot is False):
+        if message.type in WELCOME_MESSAGE_TYPES:
+            counters['welcome'] += 1
             
-            # Reaccionar con emoji de saludo
-            await message.add_reaction("👋🏻")
+            # Reaccionar con emoji de saludo (sin esperar: va detrás de verificaciones y moderación)
+            action_scheduler.submit(
+                reaction_bucket(message.channel.id),
+                lambda: message.add_reaction("👋🏻"),
+                PRIORITY_REACTION
+            )
             
             # Log específico según el tipo de mensaje
-            if message.type == discord.MessageType.new_member:
-                logger.info(f"👋 Reaccioné al mensaje de bienvenida de {message.author} en {message.guild.name}")
-            elif message.type in [discord.MessageType.premium_guild_subscription, 
-                                discord.MessageType.premium_guild_tier_1,
-                                discord.MessageType.premium_guild_tier_2, 
-                                discord.MessageType.premium_guild_tier_3]:
+            if message.type in BOOST_MESSAGE_TYPES:
                 logger.info(f"🎉 Reaccioné al mensaje de boost/nivel de {message.author} en {message.guild.name}")
+            else:
+                logger.info(f"👋 Reaccioné al mensaje de bienvenida de {message.author} en {message.guild.name}")
+            return
+        
+        # Sin el prefijo no hay comando: evitar el parseo de process_commands
+        if not message.content.startswith(message_filter.current_prefix()):
+            counters['ignored'] += 1
+            return
         
         # Procesar comandos normalmente
+        counters['command'] += 1
         await bot.process_commands(message)
         
     except discord.Forbidden:
@@ -293,7 +275,7 @@ async def on_message(message: discord.Message):
 @bot.command(name='ping')
 async def ping(ctx: commands.Context):
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_PING', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_PING'):
         return
     
     # Verificar permisos de staff
@@ -313,7 +295,7 @@ async def ping(ctx: commands.Context):
 @bot.command(name='test_welcome')
 async def test_welcome_reaction(ctx: commands.Context):
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_TEST_WELCOME', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_TEST_WELCOME'):
         return
     
     # Verificar permisos de staff
@@ -328,7 +310,11 @@ async def test_welcome_reaction(ctx: commands.Context):
     """Comando de prueba para verificar que las reacciones de bienvenida funcionan"""
     try:
         # Reaccionar al mensaje del comando con el emoji de bienvenida
-        await ctx.message.add_reaction("👋🏻")
+        await action_scheduler.submit(
+            reaction_bucket(ctx.channel.id),
+            lambda: ctx.message.add_reaction("👋🏻"),
+            PRIORITY_REACTION
+        )
         
         embed = discord.Embed(
             title="🧪 Prueba de Reacciones de Bienvenida",
@@ -469,8 +455,8 @@ class HelpView(discord.ui.View):
                 {
                     "name": "verified_list",
                     "description": "Lista todos los usuarios verificados del servidor",
-                    "prefix_usage": "!!verified_list",
-                    "slash_usage": "/verified_list"
+                    "prefix_usage": "!!verified_list [página]",
+                    "slash_usage": "/verified_list [página]"
                 },
                 {
                     "name": "list_roles",
@@ -496,6 +482,12 @@ class HelpView(discord.ui.View):
                     "prefix_usage": "!!cleanup_verifications",
                     "slash_usage": "/cleanup_verifications"
                 },
+                {
+                    "name": "reconcile_roles",
+                    "description": "Sincroniza los roles de Discord con las verificaciones guardadas",
+                    "prefix_usage": "!!reconcile_roles [simular|aplicar|cancelar|estado]",
+                    "slash_usage": "/reconcile_roles [modo]"
+                },
                 {
                     "name": "bot_stats",
                     "description": "Muestra estadísticas completas del bot y sistema",
@@ -675,7 +667,7 @@ class HelpView(discord.ui.View):
 async def help_command(ctx):
     """Muestra la ayuda interactiva del bot con paginación (solo para staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_HELP', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_HELP'):
         return
     
     # Verificar permisos de staff
@@ -704,7 +696,7 @@ async def help_command(ctx):
 async def test(ctx):
     """Comando de prueba simple (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_TEST', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_TEST'):
         return
     
     # Verificar permisos de staff
@@ -739,11 +731,17 @@ class VerificationView(discord.ui.View):
             return
         
         # Generar estado único para la verificación
-        state = str(uuid.uuid4())
-        logger.info(f"🔗 [BOTÓN] Estado generado: {state} para usuario {interaction.user.id}")
-        
-        # Guardar verificación pendiente
-        await db.create_pending_verification(state, interaction.user.id)
+        from src.utils.oauth_state import state_signer
+        if state_signer.is_enabled():
+            # Token firmado: se valida en memoria en el callback, sin tocar la base de datos
+            state = state_signer.issue(interaction.user.id, interaction.guild_id)
+            logger.info(f"🔗 [BOTÓN] Estado firmado generado para usuario {interaction.user.id}")
+        else:
+            state = str(uuid.uuid4())
+            logger.info(f"🔗 [BOTÓN] Estado generado: {state} para usuario {interaction.user.id}")
+            
+            # Guardar verificación pendiente
+            await db.create_pending_verification(state, interaction.user.id)
         
         # Crear URL de verificación
         verification_url = f"{BASE_URL}/auth?state={state}"
@@ -790,6 +788,12 @@ async def on_ready():
         # Configurar sistema de eventos para sincronización en tiempo real
         await setup_config_event_listeners()
         
+        # Reanudar reconciliaciones de roles interrumpidas por un reinicio
+        try:
+            await role_reconciler.resume(bot)
+        except Exception as e:
+            logger.error(f"❌ Error reanudando reconciliaciones de roles: {e}")
+        
         # Cargar comandos adicionales
         try:
             # Cargar todos los comandos dinámicamente
@@ -835,6 +839,10 @@ async def on_ready():
         else:
             logger.info("🌐 Modo unificado: servidor web gestionado externamente")
         
+        # Limpieza periódica de verificaciones obsoletas (referencia guardada para cancelarla al cerrar)
+        bot._cleanup_task = asyncio.create_task(verification_cleanup_loop())
+        bot._cleanup_task.add_done_callback(log_task_failure)
+        
         # Iniciar keep-alive service si está habilitado
         if KEEP_ALIVE_ENABLED:
             asyncio.create_task(start_keep_alive(interval=KEEP_ALIVE_INTERVAL))
@@ -856,7 +864,7 @@ async def start_web_server():
 async def setup_verification(ctx):
     """Comando para configurar el canal de verificación (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_SETUP_VERIFICATION', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_SETUP_VERIFICATION'):
         return
     
     # Verificar permisos de staff
@@ -898,7 +906,7 @@ async def setup_verification(ctx):
 async def verify_status(ctx, user: discord.Member = None):
     """Verifica el estado de verificación de un usuario"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_VERIFY_STATUS', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_VERIFY_STATUS'):
         return
     
     # Si el usuario especifica a otro usuario, verificar permisos
@@ -939,7 +947,7 @@ async def verify_status(ctx, user: discord.Member = None):
 async def unverify(ctx, user: discord.Member):
     """Desverifica a un usuario y elimina sus roles de Genius (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_UNVERIFY', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_UNVERIFY'):
         return
     
     # Verificar permisos de staff
@@ -978,10 +986,10 @@ async def unverify(ctx, user: discord.Member):
         await ctx.send(embed=embed)
 
 @bot.command(name='verified_list')
-async def verified_list(ctx):
+async def verified_list(ctx, page: int = 1):
     """Lista todos los usuarios verificados (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_VERIFIED_LIST', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_VERIFIED_LIST'):
         return
     
     # Verificar permisos de staff
@@ -1009,94 +1017,13 @@ async def verified_list(ctx):
             await ctx.send(embed=embed)
             return
         
-        # Obtener todos los usuarios verificados
-        # Necesitamos agregar un método a la base de datos para esto
-        try:
-            import aiosqlite
-            async with aiosqlite.connect(db.db_path) as database:
-                cursor = await database.execute("""
-                    SELECT discord_id, genius_username, genius_display_name, 
-                           genius_roles, verified_at 
-                    FROM verifications 
-                    ORDER BY verified_at DESC
-                """)
-                verified_users = await cursor.fetchall()
-        except Exception as e:
-            logger.error(f"Error obteniendo usuarios verificados: {e}")
-            embed = discord.Embed(
-                title="❌ Error",
-                description="Error al obtener la lista de usuarios verificados",
-                color=0xf04747
-            )
-            await ctx.send(embed=embed)
-            return
-        
-        # Crear embed con la lista
-        embed = discord.Embed(
-            title="📋 Lista de Usuarios Verificados",
-            description=f"Total de usuarios verificados: **{verified_count}**",
-            color=0x43b581
-        )
-        
-        # Procesar usuarios en grupos de 10 para evitar límites de embed
-        users_per_page = 10
-        current_page = 0
-        total_pages = (len(verified_users) + users_per_page - 1) // users_per_page
-        
-        start_idx = current_page * users_per_page
-        end_idx = min(start_idx + users_per_page, len(verified_users))
-        
-        users_text = ""
-        for i, user_data in enumerate(verified_users[start_idx:end_idx], start_idx + 1):
-            discord_id, genius_username, genius_display_name, genius_roles, verified_at = user_data
-            
-            # Intentar obtener el usuario de Discord
-            discord_user = ctx.guild.get_member(discord_id)
-            if discord_user:
-                discord_name = f"{discord_user.mention}"
-                status_emoji = "🟢"
-            else:
-                discord_name = f"Usuario no encontrado (ID: {discord_id})"
-                status_emoji = "🔴"
-            
-            # Formatear roles
-            roles_list = genius_roles.split(',') if genius_roles else ['Contributor']
-            roles_text = ', '.join(roles_list)
-            
-            # Formatear fecha
-            try:
-                from datetime import datetime
-                verified_date = datetime.fromisoformat(verified_at.replace('Z', '+00:00'))
-                date_text = verified_date.strftime("%d/%m/%Y")
-            except:
-                date_text = "Fecha desconocida"
-            
-            users_text += f"{status_emoji} **{i}.** {discord_name}\n"
-            users_text += f"   🎵 **Genius:** {genius_display_name or genius_username}\n"
-            users_text += f"   🏷️ **Roles:** {roles_text}\n"
-            users_text += f"   📅 **Verificado:** {date_text}\n\n"
-        
-        embed.add_field(
-            name=f"👥 Usuarios ({start_idx + 1}-{end_idx} de {len(verified_users)})",
-            value=users_text or "No hay usuarios para mostrar",
-            inline=False
-        )
-        
-        # Agregar información de páginas si hay más de una página
-        if total_pages > 1:
-            embed.set_footer(text=f"Página {current_page + 1} de {total_pages} • Usa !!verified_list [página] para ver más")
+        # Solo se consultan las filas de la página mostrada
+        view = VerifiedListView(ctx.author.id, ctx.guild, verified_count)
+        view.current_page = max(0, min(page - 1, view.total_pages - 1))
+        embed = await view.get_page_embed(view.current_page)
+        view.update_buttons()
         
-        # Agregar estadísticas adicionales
-        active_users = sum(1 for user_data in verified_users if ctx.guild.get_member(user_data[0]))
-        inactive_users = len(verified_users) - active_users
-        
-        embed.add_field(
-            name="📊 Estadísticas",
-            value=f"🟢 **Activos:** {active_users}\n🔴 **Inactivos:** {inactive_users}",
-            inline=True
-        )
-        
-        await ctx.send(embed=embed)
+        await ctx.send(embed=embed, view=view)
         
     except Exception as e:
         logger.error(f"Error en verified_list: {e}")
@@ -1111,7 +1038,7 @@ async def verified_list(ctx):
 async def test_roles(ctx, user: discord.Member = None):
     """Prueba la asignación de roles manualmente (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_TEST_ROLES', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_TEST_ROLES'):
         return
     
     # Verificar permisos de staff
@@ -1129,22 +1056,14 @@ async def test_roles(ctx, user: discord.Member = None):
     test_roles = ["Contributor", "Editor", "Staff", "Verified Artist"]
 
     discord_roles_to_add = []
-    role_mapping = {
-        "Contributor": config.get('ROLE_CONTRIBUTOR', ''),
-        "Editor": config.get('ROLE_EDITOR', ''),
-        "Moderator": config.get('ROLE_MODERATOR', ''),
-        "Staff": config.get('ROLE_STAFF', ''),
-        "Verified Artist": config.get('ROLE_VERIFIED_ARTIST', ''),
-        "Transcriber": config.get('ROLE_TRANSCRIBER', ''),
-        "Mediator": config.get('ROLE_MEDIATOR', '')
-    }
+    resolved = role_cache.resolve(ctx.guild)
 
     embed = discord.Embed(title="🧪 Prueba de Asignación de Roles", color=0x5865f2)
 
     for genius_role in test_roles:
-        role_id = role_mapping.get(genius_role, '')
-        if role_id and role_id.isdigit():
-            role = ctx.guild.get_role(int(role_id))
+        role_id = resolved.role_ids_by_name.get(genius_role, 0)
+        if role_id:
+            role = resolved.roles_by_name.get(genius_role)
             if role:
                 discord_roles_to_add.append(role)
                 # Mostrar mención del rol en vez de ID
@@ -1156,7 +1075,11 @@ async def test_roles(ctx, user: discord.Member = None):
 
     if discord_roles_to_add:
         try:
-            await target_user.add_roles(*discord_roles_to_add, reason="Prueba manual de roles")
+            await (
+                MemberMutation(target_user)
+                .add_roles(*discord_roles_to_add)
+                .schedule(PRIORITY_MODERATION, reason="Prueba manual de roles")
+            )
             embed.add_field(name="Resultado", value=f"✅ Roles asignados a {target_user.mention}", inline=False)
         except Exception as e:
             embed.add_field(name="Error", value=f"❌ {str(e)}", inline=False)
@@ -1169,7 +1092,7 @@ async def test_roles(ctx, user: discord.Member = None):
 async def list_roles(ctx):
     """Lista todos los roles del servidor con sus IDs (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_LIST_ROLES', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_LIST_ROLES'):
         return
     
     # Verificar permisos de staff
@@ -1204,7 +1127,7 @@ async def list_roles(ctx):
 async def show_config(ctx):
     """Muestra la configuración actual del bot (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_SHOW_CONFIG', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_SHOW_CONFIG'):
         return
     
     # Verificar permisos de staff
@@ -1231,7 +1154,7 @@ async def show_config(ctx):
         
         # Mostrar canal de verificación
         if verification_channel_id:
-            channel = ctx.guild.get_channel(int(verification_channel_id)) if verification_channel_id.isdigit() else None
+            channel = ctx.guild.get_channel(config.int('VERIFICATION_CHANNEL_ID'))
             channel_name = channel.name if channel else "Canal no encontrado"
             embed.add_field(
                 name="📢 Canal de Verificación",
@@ -1247,7 +1170,7 @@ async def show_config(ctx):
         
         # Mostrar rol verificado general
         if verified_role_id:
-            role = ctx.guild.get_role(int(verified_role_id)) if verified_role_id.isdigit() else None
+            role = ctx.guild.get_role(config.int('VERIFIED_ROLE_ID'))
             role_name = role.name if role else "Rol no encontrado"
             embed.add_field(
                 name="✅ Rol Verificado General",
@@ -1265,10 +1188,10 @@ async def show_config(ctx):
         roles_info = []
         genius_roles = ['ROLE_CONTRIBUTOR', 'ROLE_EDITOR', 'ROLE_MODERATOR', 'ROLE_STAFF', 'ROLE_VERIFIED_ARTIST', 'ROLE_TRANSCRIBER', 'ROLE_MEDIATOR']
         for genius_role_key in genius_roles:
-            role_id = config.get(genius_role_key, '')
+            role_id = config.int(genius_role_key)
             genius_role_name = genius_role_key.replace('ROLE_', '').replace('_', ' ').title()
-            if role_id and role_id.isdigit():
-                role = ctx.guild.get_role(int(role_id))
+            if role_id:
+                role = ctx.guild.get_role(role_id)
                 role_name = role.name if role else "Rol no encontrado"
                 status = "✅" if role else "⚠️"
                 roles_info.append(f"{status} **{genius_role_name}**: {role_name} (`{role_id}`)")
@@ -1299,11 +1222,78 @@ async def show_config(ctx):
         )
         await ctx.send(embed=embed)
 
+async def get_guild_member_ids(guild: discord.Guild) -> set:
+    """Conjunto de IDs de miembros del servidor; solicita el chunk si la caché está incompleta"""
+    if not guild.chunked:
+        await guild.chunk()
+    return {member.id for member in guild.members}
+
+async def build_cleanup_preview(departed_ids, limit: int = 10) -> str:
+    """Texto con los primeros usuarios que se eliminarían en la limpieza"""
+    users_text = ""
+    summaries = await db.get_verification_summaries(departed_ids[:limit])
+    for i, (discord_id, genius_username, genius_display_name) in enumerate(summaries, 1):
+        users_text += f"{i}. **{genius_display_name or genius_username}** (ID: {discord_id})\n"
+    
+    if len(departed_ids) > limit:
+        users_text += f"... y {len(departed_ids) - limit} más"
+    return users_text
+
+# Marca de tiempo (epoch) de la última limpieza programada, guardada en la tabla counters
+CLEANUP_LAST_RUN_COUNTER = "cleanup:last_run"
+# Espera máxima entre comprobaciones: recoge cambios de CLEANUP_INTERVAL_HOURS sin reiniciar
+CLEANUP_CHECK_INTERVAL = 3600
+# Reintento cuando los miembros de los servidores aún no están cargados
+CLEANUP_RETRY_INTERVAL = 300
+
+def log_task_failure(task: asyncio.Task):
+    """Registrar la excepción de una tarea en segundo plano que termina con error"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Tarea {task.get_coro().__name__} terminada con error: {task.exception()}")
+
+async def verification_cleanup_loop():
+    """
+    Limpieza periódica de verificaciones de usuarios que ya no están en ningún servidor.
+    La última ejecución se guarda en la base de datos, así que los reinicios (p. ej. en Render)
+    no reinician la cuenta atrás; sin ejecución previa se limpia en cuanto hay miembros cargados.
+    """
+    from src.utils.dynamic_config import config
+    while True:
+        # Un valor no numérico en el panel se parsea al default del esquema (24), no a 0
+        interval_hours = config.int('CLEANUP_INTERVAL_HOURS')
+        if interval_hours <= 0:
+            # Desactivada: volver a comprobar la configuración más tarde
+            await asyncio.sleep(CLEANUP_CHECK_INTERVAL)
+            continue
+        
+        try:
+            last_run = await db.get_counter(CLEANUP_LAST_RUN_COUNTER) or 0
+            remaining = last_run + interval_hours * 3600 - time.time()
+            if remaining > 0:
+                await asyncio.sleep(min(remaining, CLEANUP_CHECK_INTERVAL))
+                continue
+            
+            # Con la caché de miembros incompleta se borrarían usuarios presentes
+            if not bot.guilds or not all(guild.chunked for guild in bot.guilds):
+                logger.info("🧹 Limpieza programada aplazada: miembros de servidores aún sin cargar")
+                await asyncio.sleep(CLEANUP_RETRY_INTERVAL)
+                continue
+            member_ids = set()
+            for guild in bot.guilds:
+                member_ids.update(member.id for member in guild.members)
+            result = await db.cleanup_departed(member_ids)
+            await db.set_counter(CLEANUP_LAST_RUN_COUNTER, int(time.time()))
+            if result["removed"]:
+                logger.info(f"🧹 Limpieza programada: {result['removed']} verificaciones eliminadas")
+        except Exception as e:
+            logger.error(f"Error en limpieza programada de verificaciones: {e}")
+            await asyncio.sleep(CLEANUP_RETRY_INTERVAL)
+
 @bot.command(name='cleanup_verifications')
 async def cleanup_verifications(ctx):
     """Limpia verificaciones de usuarios que ya no están en el servidor (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_CLEANUP_VERIFICATIONS', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_CLEANUP_VERIFICATIONS'):
         return
     
     # Verificar permisos de staff
@@ -1318,16 +1308,8 @@ async def cleanup_verifications(ctx):
     logger.info(f"🧹 [COMANDO] cleanup_verifications ejecutado por {ctx.author}")
     
     try:
-        # Obtener todos los usuarios verificados
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as database:
-            cursor = await database.execute("""
-                SELECT discord_id, genius_username, genius_display_name 
-                FROM verifications
-            """)
-            verified_users = await cursor.fetchall()
-        
-        if not verified_users:
+        verified_count = await db.get_verified_count()
+        if verified_count == 0:
             embed = discord.Embed(
                 title="🧹 Limpieza de Verificaciones",
                 description="No hay verificaciones para limpiar",
@@ -1336,14 +1318,11 @@ async def cleanup_verifications(ctx):
             await ctx.send(embed=embed)
             return
         
-        # Verificar qué usuarios ya no están en el servidor
-        users_to_remove = []
-        for discord_id, genius_username, genius_display_name in verified_users:
-            member = ctx.guild.get_member(discord_id)
-            if not member:
-                users_to_remove.append((discord_id, genius_username, genius_display_name))
+        # Diferencia de conjuntos entre verificados y miembros actuales (sin escribir)
+        member_ids = await get_guild_member_ids(ctx.guild)
+        departed_ids = await db.find_departed_verifications(member_ids)
         
-        if not users_to_remove:
+        if not departed_ids:
             embed = discord.Embed(
                 title="🧹 Limpieza de Verificaciones",
                 description="✅ Todas las verificaciones están actualizadas\nNo se encontraron usuarios inactivos para limpiar",
@@ -1353,16 +1332,11 @@ async def cleanup_verifications(ctx):
             return
         
         # Mostrar usuarios que serán eliminados y pedir confirmación
-        users_text = ""
-        for i, (discord_id, genius_username, genius_display_name) in enumerate(users_to_remove[:10], 1):
-            users_text += f"{i}. **{genius_display_name or genius_username}** (ID: {discord_id})\n"
-        
-        if len(users_to_remove) > 10:
-            users_text += f"... y {len(users_to_remove) - 10} más"
+        users_text = await build_cleanup_preview(departed_ids)
         
         embed = discord.Embed(
             title="🧹 Limpieza de Verificaciones",
-            description=f"Se encontraron **{len(users_to_remove)}** verificaciones de usuarios que ya no están en el servidor:",
+            description=f"Se encontraron **{len(departed_ids)}** verificaciones de usuarios que ya no están en el servidor:",
             color=0xffa500
         )
         embed.add_field(
@@ -1389,16 +1363,9 @@ async def cleanup_verifications(ctx):
             reaction, user = await bot.wait_for('reaction_add', timeout=30.0, check=check)
             
             if str(reaction.emoji) == "✅":
-                # Proceder con la limpieza
-                removed_count = 0
-                async with aiosqlite.connect(db.db_path) as database:
-                    for discord_id, _, _ in users_to_remove:
-                        await database.execute(
-                            "DELETE FROM verifications WHERE discord_id = ?",
-                            (discord_id,)
-                        )
-                        removed_count += 1
-                    await database.commit()
+                # Recalcular con los miembros actuales y borrar en una sola transacción
+                result = await db.cleanup_departed(await get_guild_member_ids(ctx.guild))
+                removed_count = result["removed"]
                 
                 embed = discord.Embed(
                     title="🧹 Limpieza Completada",
@@ -1407,7 +1374,7 @@ async def cleanup_verifications(ctx):
                 )
                 embed.add_field(
                     name="📊 Resultado",
-                    value=f"• Verificaciones eliminadas: {removed_count}\n• Verificaciones restantes: {len(verified_users) - removed_count}",
+                    value=f"• Verificaciones eliminadas: {removed_count}\n• Verificaciones restantes: {await db.get_verified_count()}",
                     inline=False
                 )
                 await message.edit(embed=embed)
@@ -1443,11 +1410,45 @@ async def cleanup_verifications(ctx):
         )
         await ctx.send(embed=embed)
 
+@bot.command(name='reconcile_roles')
+async def reconcile_roles(ctx, mode: str = "simular"):
+    """Sincroniza los roles de Discord con las verificaciones guardadas (solo administradores y staff)"""
+    from src.utils.dynamic_config import config
+    if not config.bool('ENABLE_COMMAND_RECONCILE_ROLES'):
+        return
+    
+    # Verificar permisos de staff
+    if not has_staff_permissions(ctx.author):
+        embed = discord.Embed(
+            title="❌ Sin Permisos",
+            description="Este comando solo está disponible para administradores y staff.",
+            color=0xf04747
+        )
+        await ctx.send(embed=embed)
+        return
+    logger.info(f"🔁 [COMANDO] reconcile_roles {mode} ejecutado por {ctx.author}")
+    
+    mode = mode.lower()
+    if mode not in ("simular", "aplicar", "cancelar", "estado"):
+        await ctx.send("❌ Modo no válido. Usa: `simular`, `aplicar`, `cancelar` o `estado`")
+        return
+    
+    try:
+        await ctx.send(embed=await run_reconcile_command(ctx.guild, mode))
+    except Exception as e:
+        logger.error(f"Error en reconcile_roles: {e}")
+        embed = discord.Embed(
+            title="❌ Error",
+            description=f"Error ejecutando reconciliación: {str(e)}",
+            color=0xf04747
+        )
+        await ctx.send(embed=embed)
+
 @bot.command(name='sync', aliases=['sincronizar'])
 async def sync_commands(ctx):
     """Sincroniza los comandos slash con Discord (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_SYNC', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_SYNC'):
         return
     
     # Verificar permisos de staff
@@ -1487,7 +1488,7 @@ async def sync_commands(ctx):
 async def bot_stats(ctx):
     """Muestra estadísticas completas del bot (solo administradores y staff)"""
     from src.utils.dynamic_config import config
-    if not config.get('ENABLE_COMMAND_BOT_STATS', 'true').lower() == 'true':
+    if not config.bool('ENABLE_COMMAND_BOT_STATS'):
         return
     
     # Verificar permisos de staff
@@ -1561,6 +1562,13 @@ async def bot_stats(ctx):
             inline=True
         )
         
+        # Distribución de roles de Genius (agregada en SQL sobre la máscara de bits)
+        embed.add_field(
+            name="🏷️ Roles de Genius",
+            value=format_role_distribution(await db.get_role_distribution()),
+            inline=True
+        )
+        
         # Información del sistema
         embed.add_field(
             name="💻 Sistema",
@@ -1570,6 +1578,13 @@ async def bot_stats(ctx):
             inline=True
         )
         
+        # Mensajes procesados por on_message
+        embed.add_field(
+            name="📨 Mensajes",
+            value=format_message_stats(message_filter.get_stats()),
+            inline=True
+        )
+        
         # Información de keep-alive
         if KEEP_ALIVE_ENABLED:
             try:
@@ -1621,26 +1636,265 @@ async def bot_stats(ctx):
 # ==================== VIEWS ADICIONALES ====================
 # Vistas para slash commands que requieren confirmación
 
+# Tamaño de página y vida de la caché de páginas de !!verified_list
+VERIFIED_LIST_PAGE_SIZE = 10
+VERIFIED_LIST_CACHE_TTL = 60  # segundos
+
+def format_role_distribution(distribution) -> str:
+    """Texto con el número de verificados por rol de Genius"""
+    lines = [f"• **{name}:** {count}" for name, count in distribution.items() if count]
+    return "\n".join(lines) or "Sin datos"
+
+def format_message_stats(stats) -> str:
+    """Texto con los mensajes resueltos por cada rama de on_message"""
+    return (f"• **Total:** {stats['total']}\n"
+            f"• **Comandos:** {stats['command']}\n"
+            f"• **Bienvenidas:** {stats['welcome']}\n"
+            f"• **Bots/webhooks:** {stats['bot']}\n"
+            f"• **Ignorados:** {stats['ignored']}")
+
+RECONCILE_STATUS_LABELS = {
+    "running": "⏳ En curso",
+    "done": "✅ Completada",
+    "cancelled": "⏹️ Cancelada",
+    "failed": "❌ Fallida",
+}
+
+def format_role_counts(counts) -> str:
+    """Texto con el número de miembros por rol"""
+    lines = [f"• **{name}:** {count}" for name, count in sorted(counts.items(), key=lambda item: -item[1])]
+    return "\n".join(lines[:10]) or "Ninguno"
+
+def build_reconcile_embed(job) -> discord.Embed:
+    """Embed con el progreso e informe de una reconciliación de roles"""
+    embed = discord.Embed(
+        title="🔁 Reconciliación de Roles" + (" (simulación)" if job.dry_run else ""),
+        description=f"**Estado:** {RECONCILE_STATUS_LABELS.get(job.status, job.status)} — {job.progress}%",
+        color=0x43b581 if job.status == "done" else 0x5865f2
+    )
+    embed.add_field(
+        name="📊 Progreso",
+        value=f"• **Revisados:** {job.checked}/{job.total}\n"
+              f"• **Correctos:** {job.in_sync}\n"
+              f"• **Con cambios:** {job.changed}\n"
+              f"• **Fuera del servidor:** {job.missing}\n"
+              f"• **Errores:** {job.errors}",
+        inline=False
+    )
+    verb = "a añadir" if job.dry_run else "añadidos"
+    embed.add_field(name=f"➕ Roles {verb}", value=format_role_counts(job.roles_added), inline=True)
+    verb = "a quitar" if job.dry_run else "quitados"
+    embed.add_field(name=f"➖ Roles {verb}", value=format_role_counts(job.roles_removed), inline=True)
+    if job.sample:
+        lines = []
+        for entry in job.sample[:5]:
+            changes = [f"+{name}" for name in entry["added"]] + [f"-{name}" for name in entry["removed"]]
+            lines.append(f"• <@{entry['member_id']}>: {', '.join(changes)}")
+        embed.add_field(name="🔍 Ejemplos", value="\n".join(lines), inline=False)
+    return embed
+
+async def run_reconcile_command(guild: discord.Guild, mode: str) -> discord.Embed:
+    """Acción común de !!reconcile_roles y /reconcile_roles"""
+    if mode == "cancelar":
+        if role_reconciler.cancel(guild.id):
+            return discord.Embed(title="⏹️ Reconciliación Cancelada",
+                                 description="Los cambios ya encolados terminarán de aplicarse", color=0xffa500)
+        return discord.Embed(title="🔁 Reconciliación de Roles",
+                             description="No hay ninguna reconciliación en curso", color=0xffa500)
+    
+    job = role_reconciler.get_job(guild.id)
+    if mode == "estado" or (job is not None and job.status == STATUS_RUNNING):
+        if job is None:
+            return discord.Embed(title="🔁 Reconciliación de Roles",
+                                 description="No se ha ejecutado ninguna reconciliación", color=0xffa500)
+        return build_reconcile_embed(job)
+    
+    job = await role_reconciler.start(guild, dry_run=(mode != "aplicar"))
+    return build_reconcile_embed(job)
+
+def build_verified_list_embed(guild: discord.Guild, rows, page: int, total_pages: int,
+                              total: int, active_users) -> discord.Embed:
+    """Construye el embed de una página de la lista de verificados"""
+    embed = discord.Embed(
+        title="📋 Lista de Usuarios Verificados",
+        description=f"Total de usuarios verificados: **{total}**",
+        color=0x43b581
+    )
+    
+    start_idx = page * VERIFIED_LIST_PAGE_SIZE
+    end_idx = start_idx + len(rows)
+    
+    users_text = ""
+    for i, user_data in enumerate(rows, start_idx + 1):
+        discord_id, genius_username, genius_display_name, genius_roles_mask, verified_at = user_data
+        
+        # Intentar obtener el usuario de Discord
+        discord_user = guild.get_member(discord_id)
+        if discord_user:
+            discord_name = f"{discord_user.mention}"
+            status_emoji = "🟢"
+        else:
+            discord_name = f"Usuario no encontrado (ID: {discord_id})"
+            status_emoji = "🔴"
+        
+        # Formatear roles desde la máscara de bits
+        roles_text = ', '.join(mask_to_roles(genius_roles_mask))
+        
+        # Formatear fecha
+        try:
+            from datetime import datetime
+            verified_date = datetime.fromisoformat(verified_at.replace('Z', '+00:00'))
+            date_text = verified_date.strftime("%d/%m/%Y")
+        except:
+            date_text = "Fecha desconocida"
+        
+        users_text += f"{status_emoji} **{i}.** {discord_name}\n"
+        users_text += f"   🎵 **Genius:** {genius_display_name or genius_username}\n"
+        users_text += f"   🏷️ **Roles:** {roles_text}\n"
+        users_text += f"   📅 **Verificado:** {date_text}\n\n"
+    
+    embed.add_field(
+        name=f"👥 Usuarios ({start_idx + 1}-{end_idx} de {total})",
+        value=users_text or "No hay usuarios para mostrar",
+        inline=False
+    )
+    
+    # Estadísticas calculadas con el índice de verificados, sin recorrer la tabla
+    if active_users is not None:
+        stats_text = f"🟢 **Activos:** {active_users}\n🔴 **Inactivos:** {max(total - active_users, 0)}"
+    else:
+        stats_text = "🟢 **Activos:** N/D\n🔴 **Inactivos:** N/D"
+    embed.add_field(name="📊 Estadísticas", value=stats_text, inline=True)
+    
+    if total_pages > 1:
+        embed.set_footer(text=f"Página {page + 1} de {total_pages} • Usa los botones para navegar")
+    
+    return embed
+
+class VerifiedListJumpModal(discord.ui.Modal, title="Ir a página"):
+    page_input = discord.ui.TextInput(label="Número de página", min_length=1, max_length=6)
+    
+    def __init__(self, list_view: "VerifiedListView"):
+        super().__init__()
+        self.list_view = list_view
+        self.page_input.placeholder = f"1-{list_view.total_pages}"
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page_input.value) - 1
+        except ValueError:
+            await interaction.response.send_message("❌ Introduce un número de página válido", ephemeral=True)
+            return
+        await self.list_view.show_page(interaction, page)
+
+class VerifiedListView(discord.ui.View):
+    """
+    Lista paginada de verificados. Cada página se consulta bajo demanda por clave
+    (verified_at, discord_id) y los embeds ya renderizados se guardan brevemente.
+    """
+    
+    def __init__(self, author_id: int, guild: discord.Guild, total: int):
+        super().__init__(timeout=300)  # 5 minutos de timeout
+        self.author_id = author_id
+        self.guild = guild
+        self.total = total
+        self.total_pages = max(1, (total + VERIFIED_LIST_PAGE_SIZE - 1) // VERIFIED_LIST_PAGE_SIZE)
+        self.current_page = 0
+        # página -> (instante de render, embed)
+        self._page_cache = {}
+        # página -> (clave de la primera fila, clave de la última fila)
+        self._page_keys = {}
+        self.active_users = db.count_verified_members(member.id for member in guild.members)
+    
+    async def _fetch_rows(self, page: int):
+        """Obtiene las filas de una página usando la clave de una página vecina si se conoce"""
+        if page == 0:
+            return await db.get_verified_page(VERIFIED_LIST_PAGE_SIZE)
+        if page - 1 in self._page_keys:
+            return await db.get_verified_page(VERIFIED_LIST_PAGE_SIZE, after=self._page_keys[page - 1][1])
+        if page + 1 in self._page_keys:
+            return await db.get_verified_page(VERIFIED_LIST_PAGE_SIZE, before=self._page_keys[page + 1][0])
+        if page == self.total_pages - 1:
+            return await db.get_verified_tail(self.total - page * VERIFIED_LIST_PAGE_SIZE)
+        return await db.get_verified_page_at(page * VERIFIED_LIST_PAGE_SIZE, VERIFIED_LIST_PAGE_SIZE)
+    
+    async def get_page_embed(self, page: int) -> discord.Embed:
+        """Devuelve el embed de una página, desde la caché si sigue vigente"""
+        cached = self._page_cache.get(page)
+        if cached and time.monotonic() - cached[0] < VERIFIED_LIST_CACHE_TTL:
+            return cached[1]
+        
+        rows = await self._fetch_rows(page)
+        if rows:
+            self._page_keys[page] = ((rows[0][4], rows[0][0]), (rows[-1][4], rows[-1][0]))
+        embed = build_verified_list_embed(self.guild, rows, page, self.total_pages,
+                                          self.total, self.active_users)
+        self._page_cache[page] = (time.monotonic(), embed)
+        return embed
+    
+    def update_buttons(self):
+        """Habilita o deshabilita los botones según la página actual"""
+        at_start = self.current_page == 0
+        at_end = self.current_page >= self.total_pages - 1
+        self.first_page.disabled = at_start
+        self.previous_page.disabled = at_start
+        self.next_page.disabled = at_end
+        self.last_page.disabled = at_end
+        self.jump_page.disabled = self.total_pages <= 1
+        self.jump_page.label = f"{self.current_page + 1}/{self.total_pages}"
+    
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        """Muestra la página indicada editando el mensaje original"""
+        page = max(0, min(page, self.total_pages - 1))
+        embed = await self.get_page_embed(page)
+        self.current_page = page
+        self.update_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Solo quien ejecutó el comando puede navegar por la lista", ephemeral=True)
+            return False
+        return True
+    
+    @discord.ui.button(label='⏮️', style=discord.ButtonStyle.secondary)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, 0)
+    
+    @discord.ui.button(label='◀️ Anterior', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.current_page - 1)
+    
+    @discord.ui.button(label='1/1', style=discord.ButtonStyle.primary)
+    async def jump_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(VerifiedListJumpModal(self))
+    
+    @discord.ui.button(label='Siguiente ▶️', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.current_page + 1)
+    
+    @discord.ui.button(label='⏭️', style=discord.ButtonStyle.secondary)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.total_pages - 1)
+    
+    async def on_timeout(self):
+        # Deshabilitar botones y liberar la caché cuando expire el timeout
+        for item in self.children:
+            item.disabled = True
+        self._page_cache.clear()
+
 class CleanupConfirmationView(discord.ui.View):
-    def __init__(self, users_to_remove, database):
+    def __init__(self, guild, database):
         super().__init__(timeout=30.0)
-        self.users_to_remove = users_to_remove
+        self.guild = guild
         self.database = database
     
     @discord.ui.button(label='✅ Confirmar Limpieza', style=discord.ButtonStyle.danger)
     async def confirm_cleanup(self, interaction: discord.Interaction, button: discord.ui.Button):
         try:
-            # Proceder con la limpieza
-            removed_count = 0
-            import aiosqlite
-            async with aiosqlite.connect(self.database.db_path) as database:
-                for discord_id, _, _ in self.users_to_remove:
-                    await database.execute(
-                        "DELETE FROM verifications WHERE discord_id = ?",
-                        (discord_id,)
-                    )
-                    removed_count += 1
-                await database.commit()
+            # Recalcular con los miembros actuales y borrar en una sola transacción
+            result = await self.database.cleanup_departed(await get_guild_member_ids(self.guild))
+            removed_count = result["removed"]
             
             embed = discord.Embed(
                 title="🧹 Limpieza Completada",
@@ -1848,7 +2102,8 @@ async def slash_unverify(interaction: discord.Interaction, user: discord.Member)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @bot.tree.command(name="verified_list", description="Lista todos los usuarios verificados del servidor (Solo administradores y staff)")
-async def slash_verified_list(interaction: discord.Interaction):
+@app_commands.describe(page="Página inicial de la lista (opcional, por defecto la primera)")
+async def slash_verified_list(interaction: discord.Interaction, page: int = 1):
     """Slash command version of verified_list"""
     # Verificar permisos de staff
     if not has_staff_permissions(interaction.user):
@@ -1876,93 +2131,13 @@ async def slash_verified_list(interaction: discord.Interaction):
             await interaction.response.send_message(embed=embed)
             return
         
-        # Obtener todos los usuarios verificados
-        try:
-            import aiosqlite
-            async with aiosqlite.connect(db.db_path) as database:
-                cursor = await database.execute("""
-                    SELECT discord_id, genius_username, genius_display_name, 
-                           genius_roles, verified_at 
-                    FROM verifications 
-                    ORDER BY verified_at DESC
-                """)
-                verified_users = await cursor.fetchall()
-        except Exception as e:
-            logger.error(f"Error obteniendo usuarios verificados: {e}")
-            embed = discord.Embed(
-                title="❌ Error",
-                description="Error al obtener la lista de usuarios verificados",
-                color=0xf04747
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
-        # Crear embed con la lista
-        embed = discord.Embed(
-            title="📋 Lista de Usuarios Verificados",
-            description=f"Total de usuarios verificados: **{verified_count}**",
-            color=0x43b581
-        )
-        
-        # Procesar usuarios en grupos de 10 para evitar límites de embed
-        users_per_page = 10
-        current_page = 0
-        total_pages = (len(verified_users) + users_per_page - 1) // users_per_page
+        # Solo se consultan las filas de la página mostrada
+        view = VerifiedListView(interaction.user.id, interaction.guild, verified_count)
+        view.current_page = max(0, min(page - 1, view.total_pages - 1))
+        embed = await view.get_page_embed(view.current_page)
+        view.update_buttons()
         
-        start_idx = current_page * users_per_page
-        end_idx = min(start_idx + users_per_page, len(verified_users))
-        
-        users_text = ""
-        for i, user_data in enumerate(verified_users[start_idx:end_idx], start_idx + 1):
-            discord_id, genius_username, genius_display_name, genius_roles, verified_at = user_data
-            
-            # Intentar obtener el usuario de Discord
-            discord_user = interaction.guild.get_member(discord_id)
-            if discord_user:
-                discord_name = f"{discord_user.mention}"
-                status_emoji = "🟢"
-            else:
-                discord_name = f"Usuario no encontrado (ID: {discord_id})"
-                status_emoji = "🔴"
-            
-            # Formatear roles
-            roles_list = genius_roles.split(',') if genius_roles else ['Contributor']
-            roles_text = ', '.join(roles_list)
-            
-            # Formatear fecha
-            try:
-                from datetime import datetime
-                verified_date = datetime.fromisoformat(verified_at.replace('Z', '+00:00'))
-                date_text = verified_date.strftime("%d/%m/%Y")
-            except:
-                date_text = "Fecha desconocida"
-            
-            users_text += f"{status_emoji} **{i}.** {discord_name}\n"
-            users_text += f"   🎵 **Genius:** {genius_display_name or genius_username}\n"
-            users_text += f"   🏷️ **Roles:** {roles_text}\n"
-            users_text += f"   📅 **Verificado:** {date_text}\n\n"
-        
-        embed.add_field(
-            name=f"👥 Usuarios ({start_idx + 1}-{end_idx} de {len(verified_users)})",
-            value=users_text or "No hay usuarios para mostrar",
-            inline=False
-        )
-        
-        # Agregar información de páginas si hay más de una página
-        if total_pages > 1:
-            embed.set_footer(text=f"Página {current_page + 1} de {total_pages} • Usa /verified_list para ver más")
-        
-        # Agregar estadísticas adicionales
-        active_users = sum(1 for user_data in verified_users if interaction.guild.get_member(user_data[0]))
-        inactive_users = len(verified_users) - active_users
-        
-        embed.add_field(
-            name="📊 Estadísticas",
-            value=f"🟢 **Activos:** {active_users}\n🔴 **Inactivos:** {inactive_users}",
-            inline=True
-        )
-        
-        await interaction.response.send_message(embed=embed)
+        await interaction.response.send_message(embed=embed, view=view)
         
     except Exception as e:
         logger.error(f"Error en verified_list: {e}")
@@ -1992,25 +2167,15 @@ async def slash_test_roles(interaction: discord.Interaction, user: discord.Membe
     # Simular roles de Genius para prueba - puedes cambiar estos roles
     test_roles = ["Contributor", "Editor", "Staff", "Verified Artist"]
 
-    from src.utils.dynamic_config import config
-    
     discord_roles_to_add = []
-    role_mapping = {
-        "Contributor": config.get('ROLE_CONTRIBUTOR', ''),
-        "Editor": config.get('ROLE_EDITOR', ''),
-        "Moderator": config.get('ROLE_MODERATOR', ''),
-        "Staff": config.get('ROLE_STAFF', ''),
-        "Verified Artist": config.get('ROLE_VERIFIED_ARTIST', ''),
-        "Transcriber": config.get('ROLE_TRANSCRIBER', ''),
-        "Mediator": config.get('ROLE_MEDIATOR', '')
-    }
+    resolved = role_cache.resolve(interaction.guild)
 
     embed = discord.Embed(title="🧪 Prueba de Asignación de Roles", color=0x5865f2)
 
     for genius_role in test_roles:
-        role_id = role_mapping.get(genius_role, '')
-        if role_id and role_id.isdigit():
-            role = interaction.guild.get_role(int(role_id))
+        role_id = resolved.role_ids_by_name.get(genius_role, 0)
+        if role_id:
+            role = resolved.roles_by_name.get(genius_role)
             if role:
                 discord_roles_to_add.append(role)
                 # Mostrar mención del rol en vez de ID
@@ -2022,7 +2187,11 @@ async def slash_test_roles(interaction: discord.Interaction, user: discord.Membe
 
     if discord_roles_to_add:
         try:
-            await target_user.add_roles(*discord_roles_to_add, reason="Prueba manual de roles")
+            await (
+                MemberMutation(target_user)
+                .add_roles(*discord_roles_to_add)
+                .schedule(PRIORITY_MODERATION, reason="Prueba manual de roles")
+            )
             embed.add_field(name="Resultado", value=f"✅ Roles asignados a {target_user.mention}", inline=False)
         except Exception as e:
             embed.add_field(name="Error", value=f"❌ {str(e)}", inline=False)
@@ -2092,7 +2261,7 @@ async def slash_show_config(interaction: discord.Interaction):
         
         # Mostrar canal de verificación
         if verification_channel_id:
-            channel = interaction.guild.get_channel(int(verification_channel_id)) if verification_channel_id.isdigit() else None
+            channel = interaction.guild.get_channel(config.int('VERIFICATION_CHANNEL_ID'))
             channel_name = channel.name if channel else "Canal no encontrado"
             embed.add_field(
                 name="📢 Canal de Verificación",
@@ -2108,7 +2277,7 @@ async def slash_show_config(interaction: discord.Interaction):
         
         # Mostrar rol verificado general
         if verified_role_id:
-            role = interaction.guild.get_role(int(verified_role_id)) if verified_role_id.isdigit() else None
+            role = interaction.guild.get_role(config.int('VERIFIED_ROLE_ID'))
             role_name = role.name if role else "Rol no encontrado"
             embed.add_field(
                 name="✅ Rol Verificado General",
@@ -2126,10 +2295,10 @@ async def slash_show_config(interaction: discord.Interaction):
         roles_info = []
         genius_roles = ['ROLE_CONTRIBUTOR', 'ROLE_EDITOR', 'ROLE_MODERATOR', 'ROLE_STAFF', 'ROLE_VERIFIED_ARTIST', 'ROLE_TRANSCRIBER', 'ROLE_MEDIATOR']
         for genius_role_key in genius_roles:
-            role_id = config.get(genius_role_key, '')
+            role_id = config.int(genius_role_key)
             genius_role_name = genius_role_key.replace('ROLE_', '').replace('_', ' ').title()
-            if role_id and role_id.isdigit():
-                role = interaction.guild.get_role(int(role_id))
+            if role_id:
+                role = interaction.guild.get_role(role_id)
                 role_name = role.name if role else "Rol no encontrado"
                 status = "✅" if role else "⚠️"
                 roles_info.append(f"{status} **{genius_role_name}**: {role_name} (`{role_id}`)")
@@ -2176,16 +2345,8 @@ async def slash_cleanup_verifications(interaction: discord.Interaction):
     logger.info(f"🧹 [SLASH] cleanup_verifications ejecutado por {interaction.user}")
     
     try:
-        # Obtener todos los usuarios verificados
-        import aiosqlite
-        async with aiosqlite.connect(db.db_path) as database:
-            cursor = await database.execute("""
-                SELECT discord_id, genius_username, genius_display_name 
-                FROM verifications
-            """)
-            verified_users = await cursor.fetchall()
-        
-        if not verified_users:
+        verified_count = await db.get_verified_count()
+        if verified_count == 0:
             embed = discord.Embed(
                 title="🧹 Limpieza de Verificaciones",
                 description="No hay verificaciones para limpiar",
@@ -2194,14 +2355,11 @@ async def slash_cleanup_verifications(interaction: discord.Interaction):
             await interaction.response.send_message(embed=embed)
             return
         
-        # Verificar qué usuarios ya no están en el servidor
-        users_to_remove = []
-        for discord_id, genius_username, genius_display_name in verified_users:
-            member = interaction.guild.get_member(discord_id)
-            if not member:
-                users_to_remove.append((discord_id, genius_username, genius_display_name))
+        # Diferencia de conjuntos entre verificados y miembros actuales (sin escribir)
+        member_ids = await get_guild_member_ids(interaction.guild)
+        departed_ids = await db.find_departed_verifications(member_ids)
         
-        if not users_to_remove:
+        if not departed_ids:
             embed = discord.Embed(
                 title="🧹 Limpieza de Verificaciones",
                 description="✅ Todas las verificaciones están actualizadas\nNo se encontraron usuarios inactivos para limpiar",
@@ -2211,16 +2369,11 @@ async def slash_cleanup_verifications(interaction: discord.Interaction):
             return
         
         # Mostrar usuarios que serán eliminados
-        users_text = ""
-        for i, (discord_id, genius_username, genius_display_name) in enumerate(users_to_remove[:10], 1):
-            users_text += f"{i}. **{genius_display_name or genius_username}** (ID: {discord_id})\n"
-        
-        if len(users_to_remove) > 10:
-            users_text += f"... y {len(users_to_remove) - 10} más"
+        users_text = await build_cleanup_preview(departed_ids)
         
         embed = discord.Embed(
             title="🧹 Limpieza de Verificaciones",
-            description=f"Se encontraron **{len(users_to_remove)}** verificaciones de usuarios que ya no están en el servidor:",
+            description=f"Se encontraron **{len(departed_ids)}** verificaciones de usuarios que ya no están en el servidor:",
             color=0xffa500
         )
         embed.add_field(
@@ -2235,7 +2388,7 @@ async def slash_cleanup_verifications(interaction: discord.Interaction):
         )
         
         # Crear vista con botones de confirmación
-        view = CleanupConfirmationView(users_to_remove, db)
+        view = CleanupConfirmationView(interaction.guild, db)
         await interaction.response.send_message(embed=embed, view=view)
             
     except Exception as e:
@@ -2247,6 +2400,39 @@ async def slash_cleanup_verifications(interaction: discord.Interaction):
         )
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="reconcile_roles", description="Sincroniza los roles de Discord con las verificaciones guardadas (Solo administradores y staff)")
+@app_commands.describe(mode="Simular (por defecto), aplicar los cambios, cancelar o ver el estado")
+@app_commands.choices(mode=[
+    app_commands.Choice(name="Simular", value="simular"),
+    app_commands.Choice(name="Aplicar", value="aplicar"),
+    app_commands.Choice(name="Cancelar", value="cancelar"),
+    app_commands.Choice(name="Estado", value="estado"),
+])
+async def slash_reconcile_roles(interaction: discord.Interaction, mode: str = "simular"):
+    """Slash command version of reconcile_roles"""
+    # Verificar permisos de staff
+    if not has_staff_permissions(interaction.user):
+        embed = discord.Embed(
+            title="❌ Sin Permisos",
+            description="Este comando solo está disponible para administradores y staff.",
+            color=0xf04747
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    logger.info(f"🔁 [SLASH] reconcile_roles {mode} ejecutado por {interaction.user}")
+    
+    try:
+        await interaction.response.send_message(embed=await run_reconcile_command(interaction.guild, mode))
+    except Exception as e:
+        logger.error(f"Error en reconcile_roles: {e}")
+        embed = discord.Embed(
+            title="❌ Error",
+            description=f"Error ejecutando reconciliación: {str(e)}",
+            color=0xf04747
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="bot_stats", description="Muestra estadísticas completas del bot (Solo administradores y staff)")
 async def slash_bot_stats(interaction: discord.Interaction):
     """Slash command version of bot_stats"""
@@ -2322,6 +2508,13 @@ async def slash_bot_stats(interaction: discord.Interaction):
             inline=True
         )
         
+        # Distribución de roles de Genius (agregada en SQL sobre la máscara de bits)
+        embed.add_field(
+            name="🏷️ Roles de Genius",
+            value=format_role_distribution(await db.get_role_distribution()),
+            inline=True
+        )
+        
         # Información del sistema
         embed.add_field(
             name="💻 Sistema",
@@ -2331,6 +2524,13 @@ async def slash_bot_stats(interaction: discord.Interaction):
             inline=True
         )
         
+        # Mensajes procesados por on_message
+        embed.add_field(
+            name="📨 Mensajes",
+            value=format_message_stats(message_filter.get_stats()),
+            inline=True
+        )
+        
         # Información de keep-alive
         if KEEP_ALIVE_ENABLED:
             try:
@@ -2384,6 +2584,17 @@ async def shutdown_handler():
     logger.info("🔄 Iniciando cierre limpio...")
     
     try:
+        # Detener la limpieza periódica de verificaciones
+        cleanup_task = getattr(bot, '_cleanup_task', None)
+        # Si ya terminó con error, log_task_failure lo registró
+        if cleanup_task is not None and not cleanup_task.done():
+            cleanup_task.cancel()
+            try:
+                await cleanup_task
+            except asyncio.CancelledError:
+                pass
+            bot._cleanup_task = None
+        
         # Detener keep-alive
         if KEEP_ALIVE_ENABLED:
             await stop_keep_alive()
@@ -2393,6 +2604,10 @@ async def shutdown_handler():
         if not bot.is_closed():
             await bot.close()
             logger.info("🛑 Bot desconectado")
+        
+        # Cerrar pool de conexiones de la base de datos
+        await db.close()
+        logger.info("🛑 Base de datos cerrada")
             
     except Exception as e:
         logger.error(f"Error durante cierre: {e}")
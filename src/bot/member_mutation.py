@@ -0,0 +1,125 @@
+"""
+Cambios de roles y nickname de un miembro aplicados en una sola petición a Discord
+En vez de add_roles/remove_roles seguido de edit(nick=...), se calcula el estado final
+y se envía un único PATCH con member.edit(roles=..., nick=...)
+"""
+
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from src.bot.action_scheduler import action_scheduler, member_bucket, PRIORITY_MODERATION
+
+logger = logging.getLogger(__name__)
+
+# Longitud máxima de un nickname en Discord
+MAX_NICK_LENGTH = 32
+
+# Marcador de "nickname sin cambios" (None significa quitar el nickname)
+_UNSET = object()
+
+# (servidor, miembro) -> mutación encolada que aún no ha empezado
+_queued: Dict[Tuple[int, int], "MemberMutation"] = {}
+
+class MemberMutation:
+    """
+    Constructor de cambios sobre un miembro. Los cambios se calculan contra el estado del
+    miembro en el momento de aplicarlos, y si no cambia nada no se hace ninguna petición.
+
+        await MemberMutation(member).add_roles(*roles).set_nick(name).apply(reason="...")
+    """
+
+    def __init__(self, member):
+        self.member = member
+        self._add: Dict[int, Any] = {}
+        self._remove: Dict[int, Any] = {}
+        self._nick = _UNSET
+        # Cambios enviados al aplicarse desde el planificador (None = aún no aplicada)
+        self._applied: Optional[Dict[str, Any]] = None
+
+    def add_roles(self, *roles) -> "MemberMutation":
+        """Añadir roles (anula una eliminación previa del mismo rol)"""
+        for role in roles:
+            self._remove.pop(role.id, None)
+            self._add[role.id] = role
+        return self
+
+    def remove_roles(self, *roles) -> "MemberMutation":
+        """Quitar roles (anula una adición previa del mismo rol)"""
+        for role in roles:
+            self._add.pop(role.id, None)
+            self._remove[role.id] = role
+        return self
+
+    def set_nick(self, nick: Optional[str]) -> "MemberMutation":
+        """Cambiar el nickname (None lo elimina); se recorta a la longitud máxima de Discord"""
+        self._nick = nick[:MAX_NICK_LENGTH] if nick else None
+        return self
+
+    def merge(self, other: "MemberMutation") -> "MemberMutation":
+        """Incorporar los cambios de otra mutación posterior sobre el mismo miembro"""
+        self.add_roles(*other._add.values())
+        self.remove_roles(*other._remove.values())
+        if other._nick is not _UNSET:
+            self._nick = other._nick
+        return self
+
+    def changes(self) -> Dict[str, Any]:
+        """Argumentos de member.edit con solo lo que cambia respecto al estado actual"""
+        member = self.member
+        changes = {}
+
+        current_roles = member.roles[1:]  # Sin @everyone, que Discord no acepta en la lista
+        current_ids = {role.id for role in current_roles}
+        if (not current_ids.issuperset(self._add)) or (not current_ids.isdisjoint(self._remove)):
+            roles = [role for role in current_roles if role.id not in self._remove]
+            roles.extend(role for role_id, role in self._add.items() if role_id not in current_ids)
+            changes["roles"] = roles
+
+        # El nickname del propietario del servidor no se puede cambiar
+        if (self._nick is not _UNSET and self._nick != member.nick
+                and member.guild.owner_id != member.id):
+            changes["nick"] = self._nick
+
+        return changes
+
+    async def apply(self, reason: Optional[str] = None) -> Dict[str, Any]:
+        """Enviar un único PATCH con los cambios; devuelve lo que se cambió (vacío = nada)"""
+        import discord
+
+        changes = self.changes()
+        if not changes:
+            return changes
+        try:
+            await self.member.edit(reason=reason, **changes)
+        except discord.Forbidden:
+            # Sin jerarquía para cambiar el nickname: aplicar al menos los roles
+            if "nick" not in changes or "roles" not in changes:
+                raise
+            logger.warning(f"⚠️ No se pudo cambiar el nickname de {self.member}, aplicando solo roles")
+            changes.pop("nick")
+            await self.member.edit(reason=reason, **changes)
+        return changes
+
+    def schedule(self, priority: int = PRIORITY_MODERATION, reason: Optional[str] = None):
+        """
+        Encolar la mutación en el planificador de acciones; devuelve un future con los cambios.
+        Si ya hay una mutación pendiente para el miembro, esta se fusiona con ella y ambas
+        se aplican en el mismo PATCH.
+        """
+        guild_id = self.member.guild.id
+        key = (guild_id, self.member.id)
+        mutation = _queued.get(key)
+        if mutation is None:
+            mutation = _queued[key] = self
+        else:
+            mutation.merge(self)
+
+        async def run():
+            # Una acción encolada después de que otra empezase ya va incluida en su PATCH
+            if mutation._applied is None:
+                if _queued.get(key) is mutation:
+                    del _queued[key]
+                mutation._applied = await mutation.apply(reason=reason)
+            return mutation._applied
+
+        return action_scheduler.submit(member_bucket(guild_id), run, priority, key=("member",) + key)
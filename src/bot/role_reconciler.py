@@ -0,0 +1,231 @@
+"""
+Reconciliación masiva de roles de Discord con la tabla verifications
+Recorre las verificaciones por tramos, calcula por diferencia de conjuntos los roles que
+sobran o faltan a cada miembro y encola solo esos cambios en el planificador de acciones
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from src.bot.action_scheduler import PRIORITY_BULK
+from src.bot.member_mutation import MemberMutation
+
+logger = logging.getLogger(__name__)
+
+# Verificaciones leídas por tramo; también es el máximo de cambios en vuelo a la vez
+RECONCILE_CHUNK_SIZE = 500
+
+# Miembros con cambios que se guardan como ejemplo en el informe
+REPORT_SAMPLE_SIZE = 20
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_CANCELLED = "cancelled"
+STATUS_FAILED = "failed"
+
+class ReconcileJob:
+    """Progreso e informe de una reconciliación en un servidor"""
+
+    def __init__(self, guild_id: int, dry_run: bool, last_id: int = 0,
+                 report: Optional[Dict[str, Any]] = None):
+        report = report or {}
+        self.guild_id = guild_id
+        self.dry_run = dry_run
+        self.status = STATUS_RUNNING
+        # Último discord_id procesado: desde aquí se reanuda
+        self.last_id = last_id
+        self.task: Optional[asyncio.Task] = None
+        self.total = report.get("total", 0)
+        self.checked = report.get("checked", 0)
+        self.missing = report.get("missing", 0)
+        self.in_sync = report.get("in_sync", 0)
+        self.changed = report.get("changed", 0)
+        self.errors = report.get("errors", 0)
+        # Nombre de rol -> número de miembros a los que se añade / quita
+        self.roles_added: Dict[str, int] = report.get("roles_added", {})
+        self.roles_removed: Dict[str, int] = report.get("roles_removed", {})
+        self.sample: List[Dict[str, Any]] = report.get("sample", [])
+        self.started_at = report.get("started_at") or time.time()
+        self.finished_at = report.get("finished_at")
+
+    @property
+    def progress(self) -> float:
+        """Porcentaje de verificaciones revisadas"""
+        if not self.total:
+            return 100.0 if self.status == STATUS_DONE else 0.0
+        return min(100.0, round(self.checked / self.total * 100, 1))
+
+    def record(self, member_id: int, added: List[str], removed: List[str]):
+        """Anotar los cambios de un miembro en el informe"""
+        self.changed += 1
+        for name in added:
+            self.roles_added[name] = self.roles_added.get(name, 0) + 1
+        for name in removed:
+            self.roles_removed[name] = self.roles_removed.get(name, 0) + 1
+        if len(self.sample) < REPORT_SAMPLE_SIZE:
+            self.sample.append({"member_id": member_id, "added": added, "removed": removed})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "guild_id": self.guild_id,
+            "status": self.status,
+            "dry_run": self.dry_run,
+            "last_id": self.last_id,
+            "progress": self.progress,
+            "total": self.total,
+            "checked": self.checked,
+            "missing": self.missing,
+            "in_sync": self.in_sync,
+            "changed": self.changed,
+            "errors": self.errors,
+            "roles_added": self.roles_added,
+            "roles_removed": self.roles_removed,
+            "sample": self.sample,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class RoleReconciler:
+    """
+    Un trabajo por servidor. Cada tramo se lee por clave (discord_id), se compara con los
+    roles en caché de los miembros y sus cambios se encolan con la prioridad más baja;
+    el cursor se guarda al terminar cada tramo, así que al reiniciar se continúa donde
+    se quedó y la memoria usada no depende del número de verificados.
+    """
+
+    def __init__(self, chunk_size: int = RECONCILE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.jobs: Dict[int, ReconcileJob] = {}
+
+    async def start(self, guild, dry_run: bool = True) -> ReconcileJob:
+        """Iniciar una reconciliación (si ya hay una en curso en el servidor, se devuelve esa)"""
+        from src.database.models import db
+        job = self.jobs.get(guild.id)
+        if job is not None and job.status == STATUS_RUNNING:
+            return job
+        # Registrar antes del primer await: un start simultáneo verá este trabajo en curso
+        job = self.jobs[guild.id] = ReconcileJob(guild.id, dry_run)
+        try:
+            job.total = await db.get_verified_count()
+            # Guardar antes de lanzar: el panel lee el estado persistido
+            await self._save(job)
+        except Exception:
+            job.status = STATUS_FAILED
+            job.finished_at = time.time()
+            raise
+        self._launch(guild, job)
+        logger.info(f"🔁 Reconciliación de roles iniciada en {guild.name} ({'simulación' if dry_run else 'aplicando cambios'})")
+        return job
+
+    async def resume(self, bot) -> int:
+        """Reanudar las reconciliaciones que estaban en curso al reiniciar"""
+        from src.database.models import db
+        resumed = 0
+        for guild_id, status, dry_run, last_id, report in await db.get_reconcile_jobs(STATUS_RUNNING):
+            guild = bot.get_guild(guild_id)
+            if guild is None or guild_id in self.jobs:
+                continue
+            job = ReconcileJob(guild_id, bool(dry_run), last_id, json.loads(report or "{}"))
+            self._launch(guild, job)
+            resumed += 1
+            logger.info(f"🔁 Reconciliación de roles reanudada en {guild.name} desde {last_id} ({job.progress}%)")
+        return resumed
+
+    def cancel(self, guild_id: int) -> bool:
+        """Cancelar la reconciliación en curso de un servidor"""
+        job = self.jobs.get(guild_id)
+        if job is None or job.status != STATUS_RUNNING or job.task is None:
+            return False
+        job.task.cancel()
+        return True
+
+    def get_job(self, guild_id: int) -> Optional[ReconcileJob]:
+        return self.jobs.get(guild_id)
+
+    def get_progress(self) -> Dict[int, Dict[str, Any]]:
+        """Estado de los trabajos de este proceso, por servidor"""
+        return {guild_id: job.to_dict() for guild_id, job in self.jobs.items()}
+
+    def _launch(self, guild, job: ReconcileJob):
+        self.jobs[guild.id] = job
+        job.task = asyncio.create_task(self._run(guild, job))
+
+    async def _save(self, job: ReconcileJob):
+        from src.database.models import db
+        await db.save_reconcile_job(job.guild_id, job.status, job.dry_run, job.last_id,
+                                    json.dumps(job.to_dict()))
+
+    async def _run(self, guild, job: ReconcileJob):
+        from src.database.models import db
+        try:
+            while True:
+                rows = await db.get_role_masks_after(job.last_id, self.chunk_size)
+                if not rows:
+                    break
+                await self._reconcile_chunk(guild, job, rows)
+                job.last_id = rows[-1][0]
+                await self._save(job)
+            job.status = STATUS_DONE
+            logger.info(f"✅ Reconciliación de roles completada en {guild.name}: "
+                        f"{job.changed} con cambios, {job.in_sync} correctos, {job.missing} fuera del servidor")
+        except asyncio.CancelledError:
+            job.status = STATUS_CANCELLED
+            logger.info(f"⏹️ Reconciliación de roles cancelada en {guild.name}")
+        except Exception as e:
+            job.status = STATUS_FAILED
+            logger.error(f"❌ Error en la reconciliación de roles de {guild.name}: {e}")
+        finally:
+            job.finished_at = time.time()
+            try:
+                await self._save(job)
+            except Exception as e:
+                logger.error(f"❌ No se pudo guardar el estado de la reconciliación: {e}")
+
+    async def _reconcile_chunk(self, guild, job: ReconcileJob, rows):
+        """Comparar un tramo de verificaciones con los roles actuales y encolar los cambios"""
+        from src.utils.role_cache import role_cache
+        from src.utils.permissions import member_role_ids
+
+        # Se resuelve por tramo: un cambio de configuración a mitad se aplica en el siguiente
+        resolved = role_cache.resolve(guild)
+        managed = resolved.managed_role_ids
+        pending = []
+
+        for discord_id, mask in rows:
+            job.checked += 1
+            member = guild.get_member(discord_id)
+            if member is None:
+                job.missing += 1
+                continue
+
+            desired = resolved.role_ids_for_mask(mask)
+            actual = managed.intersection(member_role_ids(member))
+            to_add = desired - actual
+            to_remove = actual - desired
+            if not to_add and not to_remove:
+                job.in_sync += 1
+                continue
+
+            add_roles = [role for role in map(guild.get_role, to_add) if role is not None]
+            remove_roles = [role for role in map(guild.get_role, to_remove) if role is not None]
+            job.record(discord_id, [role.name for role in add_roles], [role.name for role in remove_roles])
+            if not job.dry_run:
+                # El planificador comparte el future con otras acciones fusionadas sobre el
+                # mismo miembro (p. ej. una verificación): cancelar el trabajo no debe cancelarlas
+                pending.append(asyncio.shield(
+                    MemberMutation(member)
+                    .add_roles(*add_roles)
+                    .remove_roles(*remove_roles)
+                    .schedule(PRIORITY_BULK, reason="Reconciliación de roles")
+                ))
+
+        # Esperar a que el tramo se aplique antes de avanzar el cursor (cambios en vuelo acotados)
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, Exception):
+                job.errors += 1
+
+# Instancia global
+role_reconciler = RoleReconciler()
@@ -1,10 +1,92 @@
 import aiosqlite
 import asyncio
+import logging
 import os
-from typing import Optional, Dict, Any
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.utils.role_mapping import CANONICAL_ROLES, ROLE_BITS, DEFAULT_ROLE, roles_to_mask
+
+logger = logging.getLogger(__name__)
+
+# Parámetros del pool de conexiones (configurables por entorno)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 4))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", 5000))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 8192))  # 8 MB de page cache por conexión
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))  # 64 MB
+DB_STATEMENT_CACHE = 64  # sentencias preparadas cacheadas por conexión
+
+# Write-behind (opcional): agrupa escrituras de verificación en una sola transacción
+DB_WRITE_BEHIND = os.environ.get("DB_WRITE_BEHIND", "false").lower() == "true"
+DB_FLUSH_INTERVAL_MS = int(os.environ.get("DB_FLUSH_INTERVAL_MS", 50))
+DB_FLUSH_MAX_ROWS = int(os.environ.get("DB_FLUSH_MAX_ROWS", 500))
+DB_FLUSH_RETRIES = 3
+
+# Caducidad de verificaciones pendientes ("Este enlace expira en 10 minutos")
+PENDING_TTL_SECONDS = int(os.environ.get("PENDING_TTL_SECONDS", 600))
+PENDING_SWEEP_INTERVAL = float(os.environ.get("PENDING_SWEEP_INTERVAL", 60))  # 0 desactiva el barrido
+PENDING_SWEEP_BATCH = int(os.environ.get("PENDING_SWEEP_BATCH", 500))
+
+# Vida del espejo en memoria de la tabla counters (segundos)
+DB_COUNTERS_TTL = float(os.environ.get("DB_COUNTERS_TTL", 5))
+
+# Sentencias de escritura compartidas por el modo directo y el write-behind.
+# Se usa ON CONFLICT DO UPDATE en lugar de INSERT OR REPLACE: el borrado implícito
+# de REPLACE no dispara los triggers que mantienen la tabla counters.
+SQL_UPSERT_PENDING = """
+    INSERT INTO pending_verifications (state, discord_id) VALUES (?, ?)
+    ON CONFLICT(state) DO UPDATE SET
+        discord_id = excluded.discord_id,
+        created_at = CURRENT_TIMESTAMP
+"""
+SQL_DELETE_PENDING = "DELETE FROM pending_verifications WHERE state = ?"
+SQL_CONSUME_PENDING = """
+    DELETE FROM pending_verifications WHERE state = ? AND created_at > datetime('now', ?)
+    RETURNING discord_id
+"""
+SQL_UPSERT_VERIFICATION = """
+    INSERT INTO verifications
+    (discord_id, genius_id, genius_username, genius_display_name, genius_roles, genius_roles_mask, access_token)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(discord_id) DO UPDATE SET
+        genius_id = excluded.genius_id,
+        genius_username = excluded.genius_username,
+        genius_display_name = excluded.genius_display_name,
+        genius_roles = excluded.genius_roles,
+        genius_roles_mask = excluded.genius_roles_mask,
+        access_token = excluded.access_token,
+        verified_at = CURRENT_TIMESTAMP
+"""
+
+# Contadores mantenidos por triggers: nombre -> tabla contada
+COUNTER_TABLES = {
+    "verified_users": "verifications",
+    "pending_verifications": "pending_verifications",
+}
+SQL_DELETE_VERIFICATION = "DELETE FROM verifications WHERE discord_id = ?"
+
+# Contadores de verificados por rol canónico (mismos triggers sobre la máscara de bits)
+ROLE_COUNTER_PREFIX = "role:"
+
+# Tamaño de lote para borrados masivos de verificaciones
+DB_DELETE_CHUNK = 500
+
+# Columnas mostradas en la lista paginada de verificados
+VERIFIED_PAGE_COLUMNS = "discord_id, genius_username, genius_display_name, genius_roles_mask, verified_at"
+
+def distribution_from_masks(rows) -> Dict[str, int]:
+    """Número de verificados por rol canónico a partir de filas (máscara, número)"""
+    distribution = {name: 0 for name in CANONICAL_ROLES}
+    for mask, count in rows:
+        for name in CANONICAL_ROLES:
+            if mask & ROLE_BITS[name]:
+                distribution[name] += count
+    return distribution
 
 class Database:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = DB_POOL_SIZE,
+                 write_behind: Optional[bool] = None):
         # Configuración específica para Render
         if db_path is None:
             # En Render, usar disco persistente si está disponible
@@ -16,15 +98,90 @@ class Database:
                 self.db_path = "verification.db"
         else:
             self.db_path = db_path
-        
+
         # Crear directorio si no existe
         db_dir = os.path.dirname(self.db_path)
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
-    
+
+        # Pool de conexiones persistentes (se abre en init_db)
+        self.pool_size = max(1, pool_size)
+        self._pool: Optional[asyncio.Queue] = None
+        self._connections: List[aiosqlite.Connection] = []
+        self._init_lock = asyncio.Lock()
+
+        # Write-behind: cola de mutaciones + overlay en memoria para leer lo no volcado
+        self.write_behind = DB_WRITE_BEHIND if write_behind is None else write_behind
+        self.flush_interval = DB_FLUSH_INTERVAL_MS / 1000
+        self.flush_max_rows = max(1, DB_FLUSH_MAX_ROWS)
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._write_seq = 0
+        # clave -> (seq, valor); valor None significa "borrado"
+        self._pending_overlay: Dict[str, Tuple[int, Optional[int]]] = {}
+        self._verification_overlay: Dict[int, Tuple[int, Optional[Dict[str, Any]]]] = {}
+
+        # Índice en memoria de discord_ids verificados (se precarga en init_db)
+        self._verified_ids: Optional[set] = None
+
+        # Espejo en memoria de la tabla counters; se invalida con cada escritura propia
+        self._counters: Optional[Dict[str, int]] = None
+        self._counters_loaded_at = 0.0
+        self._counters_generation = 0
+
+        # Barrido periódico de verificaciones pendientes caducadas
+        self.pending_ttl = PENDING_TTL_SECONDS
+        self.sweep_interval = PENDING_SWEEP_INTERVAL
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self.sweeper_stats = {
+            "runs": 0,
+            "deleted_total": 0,
+            "last_deleted": 0,
+            "last_run": None,
+            "last_duration_ms": 0.0,
+            "errors": 0
+        }
+
+    async def _open_connection(self) -> aiosqlite.Connection:
+        """Abre una conexión configurada para uso concurrente"""
+        conn = await aiosqlite.connect(self.db_path, cached_statements=DB_STATEMENT_CACHE)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        await conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @asynccontextmanager
+    async def _connection(self):
+        """Toma una conexión del pool y la devuelve al terminar"""
+        if self._pool is None:
+            await self.init_db()
+        conn = await self._pool.get()
+        changes_before = conn.total_changes
+        try:
+            yield conn
+        finally:
+            if conn.total_changes != changes_before:
+                self._counters = None
+                self._counters_generation += 1
+            # No devolver al pool una conexión con una transacción a medias
+            if conn.in_transaction:
+                try:
+                    await conn.rollback()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error haciendo rollback de conexión del pool: {e}")
+            self._pool.put_nowait(conn)
+
     async def init_db(self):
-        """Inicializa la base de datos con las tablas necesarias"""
-        async with aiosqlite.connect(self.db_path) as db:
+        """Inicializa la base de datos con las tablas necesarias y abre el pool"""
+        async with self._init_lock:
+            if self._pool is not None:
+                return
+
+            connections = [await self._open_connection() for _ in range(self.pool_size)]
+            db = connections[0]
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS verifications (
                     discord_id INTEGER PRIMARY KEY,
@@ -32,11 +189,13 @@ class Database:
                     genius_username TEXT,
                     genius_display_name TEXT,
                     genius_roles TEXT,
+                    genius_roles_mask INTEGER NOT NULL DEFAULT 0,
                     access_token TEXT,
                     verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            
+            await self._migrate_roles_mask(db)
+
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS pending_verifications (
                     state TEXT PRIMARY KEY,
@@ -44,56 +203,477 @@ class Database:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
-            
+
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_pending_created_at
+                ON pending_verifications (created_at)
+            """)
+
+            # Índice para paginar la lista de verificados por clave (keyset)
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_verifications_verified_at
+                ON verifications (verified_at, discord_id)
+            """)
+
+            # Índice de la máscara de roles: cubre los conteos por rol y las búsquedas por rol
+            await db.execute("""
+                CREATE INDEX IF NOT EXISTS idx_verifications_roles_mask
+                ON verifications (genius_roles_mask)
+            """)
+
+            # Estado de los trabajos de reconciliación de roles (para reanudar tras reiniciar)
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS reconcile_jobs (
+                    guild_id INTEGER PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    dry_run INTEGER NOT NULL DEFAULT 0,
+                    last_id INTEGER NOT NULL DEFAULT 0,
+                    report TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            await self._install_counters(db)
+
+            await db.commit()
+
+            await self._load_verified_index(db)
+
+            pool = asyncio.Queue()
+            for conn in connections:
+                pool.put_nowait(conn)
+            self._connections = connections
+            self._pool = pool
+            logger.info(f"✅ Pool de base de datos abierto ({self.pool_size} conexiones, WAL)")
+
+            if self.write_behind:
+                self._write_queue = asyncio.Queue()
+                self._flusher_task = asyncio.create_task(self._write_behind_loop())
+                logger.info(f"✍️ Write-behind activo (cada {DB_FLUSH_INTERVAL_MS} ms o {self.flush_max_rows} filas)")
+
+            if self.sweep_interval > 0:
+                self._sweeper_task = asyncio.create_task(self._sweeper_loop())
+
+    async def close(self):
+        """Vuelca las escrituras pendientes y cierra todas las conexiones del pool"""
+        await self.flush()
+        async with self._init_lock:
+            if self._sweeper_task is not None:
+                self._sweeper_task.cancel()
+                try:
+                    await self._sweeper_task
+                except asyncio.CancelledError:
+                    pass
+                self._sweeper_task = None
+            if self._flusher_task is not None:
+                self._flusher_task.cancel()
+                try:
+                    await self._flusher_task
+                except asyncio.CancelledError:
+                    pass
+                self._flusher_task = None
+                self._write_queue = None
+            if self._pool is None:
+                return
+            connections, self._connections = self._connections, []
+            self._pool = None
+            self._verified_ids = None
+            for conn in connections:
+                try:
+                    await conn.close()
+                except Exception as e:
+                    logger.warning(f"⚠️ Error cerrando conexión de base de datos: {e}")
+            logger.info("🛑 Pool de base de datos cerrado")
+
+    async def _migrate_roles_mask(self, db: aiosqlite.Connection):
+        """Añade genius_roles_mask a bases de datos antiguas y la rellena desde genius_roles"""
+        cursor = await db.execute("PRAGMA table_info(verifications)")
+        columns = {row[1] for row in await cursor.fetchall()}
+        if "genius_roles_mask" in columns:
+            return
+
+        await db.execute("ALTER TABLE verifications ADD COLUMN genius_roles_mask INTEGER NOT NULL DEFAULT 0")
+        # Relleno en SQL: un UPDATE por rol canónico buscando el nombre entre comas
+        for name in CANONICAL_ROLES:
+            await db.execute("""
+                UPDATE verifications SET genius_roles_mask = genius_roles_mask | ?
+                WHERE instr(',' || replace(IFNULL(genius_roles, ''), ', ', ',') || ',', ',' || ? || ',') > 0
+            """, (ROLE_BITS[name], name))
+        await db.execute(
+            "UPDATE verifications SET genius_roles_mask = ? WHERE genius_roles_mask = 0",
+            (ROLE_BITS[DEFAULT_ROLE],)
+        )
+        logger.info("🏷️ Columna genius_roles_mask añadida y rellenada")
+
+    async def _install_counters(self, db: aiosqlite.Connection):
+        """Crea la tabla counters, sus triggers y la sincroniza con un conteo inicial"""
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        for name, table in COUNTER_TABLES.items():
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_insert
+                AFTER INSERT ON {table}
+                BEGIN
+                    UPDATE counters SET value = value + 1 WHERE name = '{name}';
+                END
+            """)
+            await db.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_count_delete
+                AFTER DELETE ON {table}
+                BEGIN
+                    UPDATE counters SET value = value - 1 WHERE name = '{name}';
+                END
+            """)
+            # Un único COUNT(*) al arrancar corrige cualquier desviación previa
+            await db.execute(f"""
+                INSERT OR REPLACE INTO counters (name, value) SELECT ?, COUNT(*) FROM {table}
+            """, (name,))
+
+        await self._install_role_counters(db)
+
+    async def _install_role_counters(self, db: aiosqlite.Connection):
+        """Triggers que mantienen un contador por rol canónico a partir de genius_roles_mask"""
+        def role_updates(sign: str, row: str) -> str:
+            return "\n".join(
+                f"UPDATE counters SET value = value {sign} (({row}.genius_roles_mask & {ROLE_BITS[role]}) != 0) "
+                f"WHERE name = '{ROLE_COUNTER_PREFIX}{role}';"
+                for role in CANONICAL_ROLES
+            )
+        # Se recrean en cada arranque: CANONICAL_ROLES puede haber crecido por el final
+        for trigger, timing, body in (
+            ("trg_verifications_roles_insert", "AFTER INSERT ON verifications", role_updates("+", "NEW")),
+            ("trg_verifications_roles_delete", "AFTER DELETE ON verifications", role_updates("-", "OLD")),
+            ("trg_verifications_roles_update", "AFTER UPDATE OF genius_roles_mask ON verifications",
+             role_updates("-", "OLD") + "\n" + role_updates("+", "NEW")),
+        ):
+            await db.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            await db.execute(f"CREATE TRIGGER {trigger} {timing} BEGIN {body} END")
+
+        # Sincronizar con un único recorrido agrupado por máscara (solo al arrancar)
+        cursor = await db.execute("""
+            SELECT genius_roles_mask, COUNT(*) FROM verifications
+            GROUP BY genius_roles_mask
+        """)
+        distribution = distribution_from_masks(await cursor.fetchall())
+        await db.executemany(
+            "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)",
+            [(ROLE_COUNTER_PREFIX + role, count) for role, count in distribution.items()]
+        )
+
+    async def _read_counters(self) -> Dict[str, int]:
+        """Lee la tabla counters, usando el espejo en memoria mientras siga vigente"""
+        counters = self._counters
+        if counters is not None and time.monotonic() - self._counters_loaded_at < DB_COUNTERS_TTL:
+            return counters
+        generation = self._counters_generation
+        async with self._connection() as db:
+            cursor = await db.execute("SELECT name, value FROM counters")
+            counters = {name: value for name, value in await cursor.fetchall()}
+        # No guardar una lectura que pudo cruzarse con una escritura concurrente
+        if generation == self._counters_generation:
+            self._counters = counters
+            self._counters_loaded_at = time.monotonic()
+        return counters
+
+    async def _read_counters_with_overlay(self) -> Dict[str, int]:
+        """
+        Contadores incluyendo las escrituras del write-behind aún no volcadas.
+        Sin overlay es la lectura del espejo. Con overlay, en una misma transacción de lectura se
+        leen los contadores y, por clave primaria, el estado en disco de las claves del overlay;
+        a los contadores se suma la diferencia entre el overlay y ese estado.
+        """
+        pending = dict(self._pending_overlay)
+        verifications = dict(self._verification_overlay)
+        if not pending and not verifications:
+            return await self._read_counters()
+
+        disk_states = set()
+        disk_masks: Dict[int, int] = {}
+        async with self._connection() as db:
+            # Contadores y filas del mismo snapshot: una escritura ya volcada no se cuenta dos veces
+            await db.execute("BEGIN")
+            cursor = await db.execute("SELECT name, value FROM counters")
+            counters = {name: value for name, value in await cursor.fetchall()}
+            states = list(pending)
+            for start in range(0, len(states), DB_DELETE_CHUNK):
+                chunk = states[start:start + DB_DELETE_CHUNK]
+                cursor = await db.execute(
+                    f"SELECT state FROM pending_verifications WHERE state IN ({','.join('?' * len(chunk))})",
+                    tuple(chunk)
+                )
+                disk_states.update(row[0] for row in await cursor.fetchall())
+            discord_ids = list(verifications)
+            for start in range(0, len(discord_ids), DB_DELETE_CHUNK):
+                chunk = discord_ids[start:start + DB_DELETE_CHUNK]
+                cursor = await db.execute(
+                    f"SELECT discord_id, genius_roles_mask FROM verifications "
+                    f"WHERE discord_id IN ({','.join('?' * len(chunk))})",
+                    tuple(chunk)
+                )
+                disk_masks.update(await cursor.fetchall())
+            await db.rollback()
+
+        for state, (_, discord_id) in pending.items():
+            counters["pending_verifications"] = (
+                counters.get("pending_verifications", 0) + (discord_id is not None) - (state in disk_states)
+            )
+        for discord_id, (_, row) in verifications.items():
+            old_mask = disk_masks.get(discord_id)
+            new_mask = row["genius_roles_mask"] if row is not None else None
+            counters["verified_users"] = (
+                counters.get("verified_users", 0) + (new_mask is not None) - (old_mask is not None)
+            )
+            for role in CANONICAL_ROLES:
+                name = ROLE_COUNTER_PREFIX + role
+                bit = ROLE_BITS[role]
+                counters[name] = (
+                    counters.get(name, 0) + bool((new_mask or 0) & bit) - bool((old_mask or 0) & bit)
+                )
+        return counters
+
+    async def get_counter(self, name: str) -> Optional[int]:
+        """Valor guardado en la tabla counters (None si no existe)"""
+        return (await self._read_counters()).get(name)
+
+    async def set_counter(self, name: str, value: int):
+        """Guarda un valor en la tabla counters (p. ej. la última ejecución de una tarea periódica)"""
+        async with self._connection() as db:
+            await db.execute("""
+                INSERT INTO counters (name, value) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET value = excluded.value
+            """, (name, value))
             await db.commit()
-    
+
+    async def _load_verified_index(self, db: aiosqlite.Connection):
+        """Carga en memoria el conjunto de discord_ids verificados"""
+        cursor = await db.execute("SELECT discord_id FROM verifications")
+        self._verified_ids = {row[0] for row in await cursor.fetchall()}
+        logger.info(f"📇 Índice de verificados cargado ({len(self._verified_ids)} usuarios)")
+
+    async def refresh_verified_index(self):
+        """Recarga el índice de verificados (p. ej. tras escrituras de otro proceso)"""
+        await self.flush()
+        async with self._connection() as db:
+            await self._load_verified_index(db)
+
+    # ==================== WRITE-BEHIND ====================
+
+    def _enqueue_write(self, overlay: Dict, key, value, sql: str, params: tuple):
+        """Registra una mutación en el overlay y la encola para el próximo volcado"""
+        self._write_seq += 1
+        overlay[key] = (self._write_seq, value)
+        self._write_queue.put_nowait((overlay, key, self._write_seq, sql, params))
+
+    async def _write_behind_loop(self):
+        """Agrupa mutaciones durante flush_interval (o hasta flush_max_rows) y las confirma juntas"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._apply_batch(batch)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    async def _apply_batch(self, batch: List[tuple]):
+        """Aplica un lote de mutaciones en una única transacción"""
+        dropped = False
+        for attempt in range(1, DB_FLUSH_RETRIES + 1):
+            try:
+                async with self._connection() as db:
+                    for _, _, _, sql, params in batch:
+                        await db.execute(sql, params)
+                    await db.commit()
+                break
+            except Exception as e:
+                if attempt < DB_FLUSH_RETRIES:
+                    logger.warning(f"⚠️ Error volcando {len(batch)} escrituras (intento {attempt}): {e}")
+                    await asyncio.sleep(0.1 * attempt)
+                else:
+                    logger.error(f"❌ Se descartan {len(batch)} escrituras tras {attempt} intentos: {e}")
+                    dropped = True
+
+        # Retirar del overlay solo lo que no haya sido sobrescrito mientras tanto
+        for overlay, key, seq, _, _ in batch:
+            entry = overlay.get(key)
+            if entry is not None and entry[0] == seq:
+                del overlay[key]
+
+        # El índice se actualizó al encolar: deshacer lo que no llegó a disco
+        if dropped and self._verified_ids is not None:
+            try:
+                await self._rebuild_verified_index()
+            except Exception as e:
+                logger.error(f"❌ No se pudo reconstruir el índice de verificados: {e}")
+
+    async def _rebuild_verified_index(self):
+        """
+        Recarga el índice desde disco y vuelve a aplicar las escrituras aún encoladas.
+        Sin flush: se llama desde el propio volcador.
+        """
+        async with self._connection() as db:
+            await self._load_verified_index(db)
+        for discord_id, (_, row) in list(self._verification_overlay.items()):
+            if row is None:
+                self._verified_ids.discard(discord_id)
+            else:
+                self._verified_ids.add(discord_id)
+
+    async def flush(self):
+        """Espera a que todas las escrituras encoladas estén confirmadas en disco"""
+        if self._write_queue is not None and self._flusher_task is not None:
+            await self._write_queue.join()
+
+    # ==================== CADUCIDAD DE PENDIENTES ====================
+
+    def _ttl_modifier(self) -> str:
+        """Modificador de datetime() de SQLite para el límite de caducidad"""
+        return f"-{self.pending_ttl} seconds"
+
+    async def sweep_expired_pending(self, batch_size: int = PENDING_SWEEP_BATCH) -> int:
+        """Elimina verificaciones pendientes caducadas en lotes acotados"""
+        deleted = 0
+        while True:
+            async with self._connection() as db:
+                cursor = await db.execute("""
+                    DELETE FROM pending_verifications WHERE rowid IN (
+                        SELECT rowid FROM pending_verifications
+                        WHERE created_at <= datetime('now', ?)
+                        LIMIT ?
+                    )
+                """, (self._ttl_modifier(), batch_size))
+                await db.commit()
+                batch_deleted = cursor.rowcount
+            deleted += batch_deleted
+            if batch_deleted < batch_size:
+                return deleted
+            # Ceder el loop entre lotes para no bloquear otras consultas
+            await asyncio.sleep(0)
+
+    async def _sweeper_loop(self):
+        """Ejecuta el barrido de pendientes cada sweep_interval segundos"""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            start = time.perf_counter()
+            try:
+                deleted = await self.sweep_expired_pending()
+                self.sweeper_stats["last_deleted"] = deleted
+                self.sweeper_stats["deleted_total"] += deleted
+                if deleted:
+                    logger.info(f"🧹 {deleted} verificaciones pendientes caducadas eliminadas")
+            except Exception as e:
+                self.sweeper_stats["errors"] += 1
+                logger.error(f"❌ Error en barrido de verificaciones pendientes: {e}")
+            self.sweeper_stats["runs"] += 1
+            self.sweeper_stats["last_run"] = time.time()
+            self.sweeper_stats["last_duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def get_sweeper_stats(self) -> Dict[str, Any]:
+        """Métricas del barrido de pendientes caducadas"""
+        return {
+            **self.sweeper_stats,
+            "interval_seconds": self.sweep_interval,
+            "ttl_seconds": self.pending_ttl
+        }
+
+    # ==================== VERIFICACIONES ====================
+
     async def create_pending_verification(self, state: str, discord_id: int):
         """Crea una verificación pendiente"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT OR REPLACE INTO pending_verifications (state, discord_id) VALUES (?, ?)",
-                (state, discord_id)
-            )
+        if self._write_queue is not None:
+            self._enqueue_write(self._pending_overlay, state, discord_id,
+                                SQL_UPSERT_PENDING, (state, discord_id))
+            return
+        async with self._connection() as db:
+            await db.execute(SQL_UPSERT_PENDING, (state, discord_id))
             await db.commit()
-    
+
     async def get_pending_verification(self, state: str) -> Optional[int]:
-        """Obtiene el discord_id de una verificación pendiente"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                "SELECT discord_id FROM pending_verifications WHERE state = ?",
-                (state,)
-            )
-            result = await cursor.fetchone()
-            if result:
-                # Eliminar la verificación pendiente después de usarla
-                await db.execute(
-                    "DELETE FROM pending_verifications WHERE state = ?",
-                    (state,)
+        """Obtiene el discord_id de una verificación pendiente y la consume"""
+        seq = None
+        if self._write_queue is not None:
+            entry = self._pending_overlay.get(state)
+            if entry is not None:
+                discord_id = entry[1]
+                if discord_id is not None:
+                    # Consumir el estado (se borra en el próximo volcado)
+                    self._enqueue_write(self._pending_overlay, state, None,
+                                        SQL_DELETE_PENDING, (state,))
+                return discord_id
+            # Marcar el estado como consumido antes de esperar a disco: una llamada
+            # concurrente con el mismo estado lo verá ya consumido en el overlay
+            self._write_seq += 1
+            seq = self._write_seq
+            self._pending_overlay[state] = (seq, None)
+
+        try:
+            async with self._connection() as db:
+                # Leer y consumir en una sola sentencia: dos callbacks con el mismo estado no
+                # pueden obtener ambos el discord_id. Los caducados se ignoran (el barrido los elimina)
+                cursor = await db.execute(
+                    SQL_CONSUME_PENDING, (state, self._ttl_modifier())
                 )
+                result = await cursor.fetchone()
                 await db.commit()
-                return result[0]
-            return None
-    
+                return result[0] if result else None
+        finally:
+            if seq is not None:
+                # La marca no tiene escritura encolada: retirarla salvo que otra la haya sustituido
+                entry = self._pending_overlay.get(state)
+                if entry is not None and entry[0] == seq:
+                    del self._pending_overlay[state]
+
     async def save_verification(self, discord_id: int, genius_data: Dict[str, Any], access_token: str):
         """Guarda una verificación completada"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT OR REPLACE INTO verifications 
-                (discord_id, genius_id, genius_username, genius_display_name, genius_roles, access_token)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                discord_id,
-                genius_data.get('id'),
-                genius_data.get('login'),
-                genius_data.get('name'),
-                ','.join(genius_data.get('roles', [])),
-                access_token
+        roles = genius_data.get('roles', [])
+        params = (
+            discord_id,
+            genius_data.get('id'),
+            genius_data.get('login'),
+            genius_data.get('name'),
+            ','.join(roles),
+            roles_to_mask(roles),
+            access_token
+        )
+        if self._write_queue is not None:
+            # Visible al instante vía overlay e índice; si el volcado se descarta se reconstruye
+            if self._verified_ids is not None:
+                self._verified_ids.add(discord_id)
+            row = dict(zip(
+                ('discord_id', 'genius_id', 'genius_username', 'genius_display_name',
+                 'genius_roles', 'genius_roles_mask', 'access_token'),
+                params
             ))
+            row['verified_at'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+            self._enqueue_write(self._verification_overlay, discord_id, row,
+                                SQL_UPSERT_VERIFICATION, params)
+            return
+        async with self._connection() as db:
+            await db.execute(SQL_UPSERT_VERIFICATION, params)
             await db.commit()
-    
+        # Solo tras confirmar la escritura
+        if self._verified_ids is not None:
+            self._verified_ids.add(discord_id)
+
     async def get_verification(self, discord_id: int) -> Optional[Dict[str, Any]]:
         """Obtiene los datos de verificación de un usuario"""
-        async with aiosqlite.connect(self.db_path) as db:
+        entry = self._verification_overlay.get(discord_id)
+        if entry is not None:
+            return dict(entry[1]) if entry[1] is not None else None
+        async with self._connection() as db:
             cursor = await db.execute(
                 "SELECT * FROM verifications WHERE discord_id = ?",
                 (discord_id,)
@@ -103,40 +683,279 @@ class Database:
                 columns = [description[0] for description in cursor.description]
                 return dict(zip(columns, result))
             return None
-    
+
     async def is_verified(self, discord_id: int) -> bool:
         """Verifica si un usuario ya está verificado"""
-        verification = await self.get_verification(discord_id)
-        return verification is not None
-    
+        # Camino rápido: consulta O(1) al índice en memoria, sin ida y vuelta a SQLite
+        if self._verified_ids is not None:
+            return discord_id in self._verified_ids
+        entry = self._verification_overlay.get(discord_id)
+        if entry is not None:
+            return entry[1] is not None
+        async with self._connection() as db:
+            cursor = await db.execute(
+                "SELECT 1 FROM verifications WHERE discord_id = ?",
+                (discord_id,)
+            )
+            return await cursor.fetchone() is not None
+
     async def remove_verification(self, discord_id: int):
         """Elimina la verificación de un usuario"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "DELETE FROM verifications WHERE discord_id = ?",
-                (discord_id,)
+        if self._write_queue is not None:
+            if self._verified_ids is not None:
+                self._verified_ids.discard(discord_id)
+            self._enqueue_write(self._verification_overlay, discord_id, None,
+                                SQL_DELETE_VERIFICATION, (discord_id,))
+            return
+        async with self._connection() as db:
+            await db.execute(SQL_DELETE_VERIFICATION, (discord_id,))
+            await db.commit()
+        if self._verified_ids is not None:
+            self._verified_ids.discard(discord_id)
+
+    async def get_verified_page(self, limit: int, after: Optional[Tuple[str, int]] = None,
+                                before: Optional[Tuple[str, int]] = None) -> List[Tuple]:
+        """
+        Obtiene una página de verificados ordenada por (verified_at, discord_id) descendente.
+        after/before son la clave (verified_at, discord_id) de la última/primera fila
+        de la página ya mostrada; sin ninguna de las dos devuelve la primera página.
+        """
+        await self.flush()
+        async with self._connection() as db:
+            if before is not None:
+                # Página anterior: se recorre el índice en sentido ascendente y se invierte
+                cursor = await db.execute(f"""
+                    SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications
+                    WHERE (verified_at, discord_id) > (?, ?)
+                    ORDER BY verified_at ASC, discord_id ASC
+                    LIMIT ?
+                """, (before[0], before[1], limit))
+                rows = await cursor.fetchall()
+                rows.reverse()
+                return rows
+            if after is not None:
+                cursor = await db.execute(f"""
+                    SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications
+                    WHERE (verified_at, discord_id) < (?, ?)
+                    ORDER BY verified_at DESC, discord_id DESC
+                    LIMIT ?
+                """, (after[0], after[1], limit))
+            else:
+                cursor = await db.execute(f"""
+                    SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications
+                    ORDER BY verified_at DESC, discord_id DESC
+                    LIMIT ?
+                """, (limit,))
+            return await cursor.fetchall()
+
+    async def get_verified_tail(self, limit: int) -> List[Tuple]:
+        """Obtiene las últimas filas de la lista (verificaciones más antiguas) en orden descendente"""
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute(f"""
+                SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications
+                ORDER BY verified_at ASC, discord_id ASC
+                LIMIT ?
+            """, (limit,))
+            rows = await cursor.fetchall()
+        rows.reverse()
+        return rows
+
+    async def get_verified_page_at(self, offset: int, limit: int) -> List[Tuple]:
+        """
+        Obtiene una página por posición. Solo para saltos directos a una página;
+        la navegación secuencial debe usar get_verified_page.
+        """
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute(f"""
+                SELECT {VERIFIED_PAGE_COLUMNS} FROM verifications
+                ORDER BY verified_at DESC, discord_id DESC
+                LIMIT ? OFFSET ?
+            """, (limit, offset))
+            return await cursor.fetchall()
+
+    def count_verified_members(self, member_ids) -> Optional[int]:
+        """
+        Cuenta cuántos de los IDs dados están verificados usando el índice en memoria.
+        Devuelve None si el índice no está cargado.
+        """
+        if self._verified_ids is None:
+            return None
+        if not isinstance(member_ids, (set, frozenset)):
+            member_ids = set(member_ids)
+        return len(self._verified_ids & member_ids)
+
+    # ==================== LIMPIEZA DE VERIFICACIONES ====================
+
+    async def find_departed_verifications(self, member_ids) -> List[int]:
+        """
+        IDs verificados que no pertenecen al conjunto de miembros dado.
+        Se calcula como diferencia de conjuntos contra el índice en memoria.
+        """
+        if not isinstance(member_ids, (set, frozenset)):
+            member_ids = set(member_ids)
+        if self._verified_ids is not None:
+            return sorted(self._verified_ids - member_ids)
+
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute("SELECT discord_id FROM verifications")
+            verified = {row[0] for row in await cursor.fetchall()}
+        return sorted(verified - member_ids)
+
+    async def get_verification_summaries(self, discord_ids: List[int]) -> List[Tuple]:
+        """Obtiene (discord_id, genius_username, genius_display_name) para los IDs dados"""
+        if not discord_ids:
+            return []
+        await self.flush()
+        placeholders = ",".join("?" * len(discord_ids))
+        async with self._connection() as db:
+            cursor = await db.execute(f"""
+                SELECT discord_id, genius_username, genius_display_name
+                FROM verifications WHERE discord_id IN ({placeholders})
+            """, tuple(discord_ids))
+            rows = {row[0]: row for row in await cursor.fetchall()}
+        return [rows[discord_id] for discord_id in discord_ids if discord_id in rows]
+
+    async def remove_verifications(self, discord_ids: List[int], chunk_size: int = DB_DELETE_CHUNK) -> int:
+        """Elimina varias verificaciones en una sola transacción con executemany por lotes"""
+        if not discord_ids:
+            return 0
+        # Las escrituras encoladas deben llegar antes para no resucitar filas borradas
+        await self.flush()
+        async with self._connection() as db:
+            for start in range(0, len(discord_ids), chunk_size):
+                chunk = discord_ids[start:start + chunk_size]
+                await db.executemany(SQL_DELETE_VERIFICATION, [(discord_id,) for discord_id in chunk])
+            await db.commit()
+        if self._verified_ids is not None:
+            self._verified_ids.difference_update(discord_ids)
+        return len(discord_ids)
+
+    async def cleanup_departed(self, member_ids, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Elimina las verificaciones de usuarios que ya no están en el servidor.
+        Con dry_run solo cuenta cuántas se eliminarían.
+        """
+        departed = await self.find_departed_verifications(member_ids)
+        removed = 0 if dry_run else await self.remove_verifications(departed)
+        return {"departed": len(departed), "removed": removed}
+
+    # ==================== ROLES ====================
+
+    async def get_role_distribution(self) -> Dict[str, int]:
+        """
+        Número de verificados por rol canónico.
+        Lectura de la tabla counters (mantenida por triggers) más las escrituras aún no
+        volcadas del write-behind, sin forzar el volcado.
+        """
+        counters = await self._read_counters_with_overlay()
+        return {name: counters.get(ROLE_COUNTER_PREFIX + name, 0) for name in CANONICAL_ROLES}
+
+    async def count_members_with_role(self, role: str) -> int:
+        """Número de verificados que tienen el rol indicado"""
+        bit = ROLE_BITS.get(role)
+        if bit is None:
+            return 0
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*) FROM verifications WHERE genius_roles_mask & ? != 0", (bit,)
+            )
+            result = await cursor.fetchone()
+            return result[0] if result else 0
+
+    async def get_members_with_role(self, role: str, limit: Optional[int] = None) -> List[int]:
+        """discord_ids de los verificados que tienen el rol indicado"""
+        bit = ROLE_BITS.get(role)
+        if bit is None:
+            return []
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute(
+                "SELECT discord_id FROM verifications WHERE genius_roles_mask & ? != 0 LIMIT ?",
+                (bit, -1 if limit is None else limit)
             )
+            return [row[0] for row in await cursor.fetchall()]
+
+    # ==================== RECONCILIACIÓN DE ROLES ====================
+
+    async def get_role_masks_after(self, after_id: int, limit: int) -> List[Tuple[int, int]]:
+        """
+        Siguiente tramo de (discord_id, genius_roles_mask) ordenado por discord_id.
+        Recorre la clave primaria por rango (keyset), así que cada tramo cuesta lo mismo
+        independientemente de cuántas filas se hayan leído antes.
+        """
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute("""
+                SELECT discord_id, genius_roles_mask FROM verifications
+                WHERE discord_id > ?
+                ORDER BY discord_id
+                LIMIT ?
+            """, (after_id, limit))
+            return await cursor.fetchall()
+
+    async def save_reconcile_job(self, guild_id: int, status: str, dry_run: bool,
+                                 last_id: int, report: str):
+        """Guarda el progreso de un trabajo de reconciliación (una fila por servidor)"""
+        async with self._connection() as db:
+            await db.execute("""
+                INSERT INTO reconcile_jobs (guild_id, status, dry_run, last_id, report)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET
+                    status = excluded.status,
+                    dry_run = excluded.dry_run,
+                    last_id = excluded.last_id,
+                    report = excluded.report,
+                    updated_at = CURRENT_TIMESTAMP
+            """, (guild_id, status, int(dry_run), last_id, report))
             await db.commit()
-    
+
+    async def get_reconcile_jobs(self, status: Optional[str] = None) -> List[Tuple]:
+        """Trabajos de reconciliación guardados: (guild_id, status, dry_run, last_id, report)"""
+        async with self._connection() as db:
+            if status is None:
+                cursor = await db.execute(
+                    "SELECT guild_id, status, dry_run, last_id, report FROM reconcile_jobs"
+                )
+            else:
+                cursor = await db.execute(
+                    "SELECT guild_id, status, dry_run, last_id, report FROM reconcile_jobs WHERE status = ?",
+                    (status,)
+                )
+            return await cursor.fetchall()
+
     async def get_verified_count(self) -> int:
         """Obtiene el número total de usuarios verificados"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM verifications")
-            result = await cursor.fetchone()
-            return result[0] if result else 0
-    
+        await self.flush()
+        counters = await self._read_counters()
+        return counters.get("verified_users", 0)
+
     async def get_pending_count(self) -> int:
-        """Obtiene el número de verificaciones pendientes"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM pending_verifications")
+        """Obtiene el número de verificaciones pendientes (no caducadas)"""
+        await self.flush()
+        async with self._connection() as db:
+            cursor = await db.execute(
+                "SELECT COUNT(*) FROM pending_verifications WHERE created_at > datetime('now', ?)",
+                (self._ttl_modifier(),)
+            )
             result = await cursor.fetchone()
             return result[0] if result else 0
-    
+
     async def get_stats(self) -> Dict[str, int]:
-        """Obtiene estadísticas generales de la base de datos"""
+        """
+        Obtiene estadísticas generales de la base de datos.
+        Lectura de la tabla counters más las escrituras aún no volcadas del write-behind;
+        las pendientes incluyen las caducadas que el barrido aún no ha eliminado (como mucho
+        PENDING_SWEEP_INTERVAL segundos). Como es la ruta de health checks y del panel,
+        no fuerza el volcado.
+        """
+        counters = await self._read_counters_with_overlay()
         return {
-            "verified_users": await self.get_verified_count(),
-            "pending_verifications": await self.get_pending_count()
+            "verified_users": counters.get("verified_users", 0),
+            "pending_verifications": counters.get("pending_verifications", 0)
         }
 
 # Instancia global de la base de datos
@@ -11,6 +11,10 @@ from typing import Dict, Any
 import secrets
 from pathlib import Path
 
+from src.utils.config_schema import (
+    panel_mapping, SECTION_GENERAL, SECTION_COMMANDS, SECTION_MESSAGES, SECTION_VERIFICATION
+)
+
 # Configuración
 PANEL_USERNAME = os.environ.get("PANEL_USERNAME", "tweo")
 PANEL_PASSWORD_HASH = os.environ.get("PANEL_PASSWORD_HASH")
@@ -62,136 +66,8 @@ async def favicon():
     from fastapi.responses import FileResponse
     return FileResponse(str(BASE_DIR / "assets" / "static" / "favicon.ico"))
 
-# Configuración actual del bot
-CONFIG_MAPPING = {
-    "DISCORD_TOKEN": {
-        "name": "Discord Bot Token",
-        "type": "password",
-        "description": "Token del bot de Discord",
-        "required": True
-    },
-    "GENIUS_CLIENT_ID": {
-        "name": "Genius Client ID",
-        "type": "text",
-        "description": "ID de cliente de la aplicación Genius",
-        "required": True
-    },
-    "GENIUS_CLIENT_SECRET": {
-        "name": "Genius Client Secret",
-        "type": "password",
-        "description": "Secreto de cliente de la aplicación Genius",
-        "required": True
-    },
-    "BASE_URL": {
-        "name": "URL Base",
-        "type": "url",
-        "description": "URL base del servidor (ej: https://geebot.onrender.com)",
-        "required": True
-    },
-    "VERIFICATION_CHANNEL_ID": {
-        "name": "Canal de Verificación",
-        "type": "number",
-        "description": "ID del canal donde estará el botón de verificación",
-        "required": True
-    },
-    "VERIFIED_ROLE_ID": {
-        "name": "Rol Verificado",
-        "type": "number",
-        "description": "ID del rol general para usuarios verificados",
-        "required": True
-    },
-    "ROLE_VERIFIED_ARTIST": {
-        "name": "Rol Artista Verificado",
-        "type": "number",
-        "description": "ID del rol para artistas verificados",
-        "required": False
-    },
-    "ROLE_STAFF": {
-        "name": "Rol Staff",
-        "type": "number",
-        "description": "ID del rol para staff",
-        "required": False
-    },
-    "ROLE_MODERATOR": {
-        "name": "Rol Moderador",
-        "type": "number",
-        "description": "ID del rol para moderadores",
-        "required": False
-    },
-    "ROLE_EDITOR": {
-        "name": "Rol Editor",
-        "type": "number",
-        "description": "ID del rol para editores",
-        "required": False
-    },
-    "ROLE_TRANSCRIBER": {
-        "name": "Rol Transcriptor",
-        "type": "number",
-        "description": "ID del rol para transcriptores",
-        "required": False
-    },
-    "ROLE_MEDIATOR": {
-        "name": "Rol Mediador",
-        "type": "number",
-        "description": "ID del rol para mediadores",
-        "required": False
-    },
-    "ROLE_CONTRIBUTOR": {
-        "name": "Rol Contribuidor",
-        "type": "number",
-        "description": "ID del rol para contribuidores",
-        "required": False
-    },
-    "KEEP_ALIVE_INTERVAL": {
-        "name": "Intervalo Keep-Alive",
-        "type": "number",
-        "description": "Intervalo en segundos para keep-alive (300 = 5 minutos)",
-        "required": False
-    },
-    # Configuraciones de comandos habilitados
-    "ENABLE_COMMAND_VERIFIED_LIST": {
-        "name": "Habilitar comando verified_list",
-        "type": "checkbox",
-        "description": "Permite usar el comando para listar usuarios verificados",
-        "required": False
-    },
-    "ENABLE_COMMAND_TEST_ROLES": {
-        "name": "Habilitar comando test_roles",
-        "type": "checkbox",
-        "description": "Permite usar el comando para probar asignación de roles",
-        "required": False
-    },
-    "ENABLE_COMMAND_LIST_ROLES": {
-        "name": "Habilitar comando list_roles",
-        "type": "checkbox",
-        "description": "Permite usar el comando para listar roles del servidor",
-        "required": False
-    },
-    "ENABLE_COMMAND_SHOW_CONFIG": {
-        "name": "Habilitar comando show_config",
-        "type": "checkbox",
-        "description": "Permite usar el comando para mostrar configuración",
-        "required": False
-    },
-    "ENABLE_COMMAND_CLEANUP_VERIFICATIONS": {
-        "name": "Habilitar comando cleanup_verifications",
-        "type": "checkbox",
-        "description": "Permite usar el comando para limpiar verificaciones",
-        "required": False
-    },
-    "ENABLE_COMMAND_SYNC": {
-        "name": "Habilitar comando sync",
-        "type": "checkbox",
-        "description": "Permite usar el comando para sincronizar comandos slash",
-        "required": False
-    },
-    "ENABLE_COMMAND_BOT_STATS": {
-        "name": "Habilitar comando bot_stats",
-        "type": "checkbox",
-        "description": "Permite usar el comando para mostrar estadísticas del bot",
-        "required": False
-    }
-}
+# Configuración actual del bot (derivada del esquema único de configuración)
+CONFIG_MAPPING = panel_mapping(SECTION_GENERAL)
 
 def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
     """Verificar credenciales de autenticación (soporte multiusuario)"""
@@ -214,19 +90,22 @@ def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
         headers={"WWW-Authenticate": "Basic"},
     )
 
+# Valor mostrado en lugar de los campos sensibles
+MASKED_VALUE = "●" * 8
+
+def mask_sensitive(mapping: Dict[str, Dict[str, Any]], values: Dict[str, Any]) -> Dict[str, Any]:
+    """Sustituir por MASKED_VALUE los campos de tipo password que tengan valor"""
+    return {
+        key: MASKED_VALUE if mapping[key]["type"] == "password" and value else value
+        for key, value in values.items()
+    }
+
 def get_current_config() -> Dict[str, Any]:
     """Obtener configuración actual desde sistema dinámico"""
     from src.utils.dynamic_config import config as dynamic_config
     
-    result = {}
-    for key, info in CONFIG_MAPPING.items():
-        value = dynamic_config.get(key, "")
-        # Ocultar valores sensibles para mostrar
-        if info["type"] == "password" and value:
-            result[key] = "●" * 8  # Mostrar asteriscos
-        else:
-            result[key] = value
-    return result
+    # Ocultar valores sensibles para mostrar
+    return mask_sensitive(CONFIG_MAPPING, {key: dynamic_config.get(key, "") for key in CONFIG_MAPPING})
 
 def get_raw_config() -> Dict[str, Any]:
     """Obtener configuración actual sin ocultar valores"""
@@ -241,8 +120,8 @@ async def notify_bot_config_reload():
     """Notificar al bot que debe recargar su configuración"""
     try:
         # Importar y recargar configuración del bot
-        from src.utils.config import reload_config
-        reload_config()
+        from src.utils.config import areload_config
+        await areload_config()
         print("🔄 Bot notificado para recargar configuración")
     except Exception as e:
         print(f"⚠️ Error notificando al bot: {e}")
@@ -299,176 +178,11 @@ async def config_page(request: Request, username: str = Depends(verify_credentia
 # ----------------------
 
 # Mapeo de configuración por secciones
-COMMANDS_CONFIG_MAPPING = {
-    "CMD_PREFIX": {
-        "name": "Prefijo de Comandos",
-        "type": "text",
-        "description": "Prefijo para comandos con texto (ej: !!)",
-        "required": False
-    },
-    "ENABLE_COMMAND_PING": {
-        "name": "Habilitar comando ping",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!ping",
-        "required": False
-    },
-    "ENABLE_COMMAND_TEST_WELCOME": {
-        "name": "Habilitar comando test_welcome",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!test_welcome",
-        "required": False
-    },
-    "ENABLE_COMMAND_HELP": {
-        "name": "Habilitar comando help",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!help",
-        "required": False
-    },
-    "ENABLE_COMMAND_TEST": {
-        "name": "Habilitar comando test",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!test",
-        "required": False
-    },
-    "ENABLE_COMMAND_SETUP_VERIFICATION": {
-        "name": "Habilitar comando setup_verification",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!setup_verification",
-        "required": False
-    },
-    "ENABLE_COMMAND_VERIFY_STATUS": {
-        "name": "Habilitar comando verify_status",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!verify_status",
-        "required": False
-    },
-    "ENABLE_COMMAND_UNVERIFY": {
-        "name": "Habilitar comando unverify",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!unverify",
-        "required": False
-    },
-    "ENABLE_COMMAND_VERIFIED_LIST": {
-        "name": "Habilitar comando verified_list",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!verified_list",
-        "required": False
-    },
-    "ENABLE_COMMAND_TEST_ROLES": {
-        "name": "Habilitar comando test_roles",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!test_roles",
-        "required": False
-    },
-    "ENABLE_COMMAND_LIST_ROLES": {
-        "name": "Habilitar comando list_roles",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!list_roles",
-        "required": False
-    },
-    "ENABLE_COMMAND_SHOW_CONFIG": {
-        "name": "Habilitar comando show_config",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!show_config",
-        "required": False
-    },
-    "ENABLE_COMMAND_CLEANUP_VERIFICATIONS": {
-        "name": "Habilitar comando cleanup_verifications",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!cleanup_verifications",
-        "required": False
-    },
-    "ENABLE_COMMAND_SYNC": {
-        "name": "Habilitar comando sync",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!sync",
-        "required": False
-    },
-    "ENABLE_COMMAND_BOT_STATS": {
-        "name": "Habilitar comando bot_stats",
-        "type": "checkbox",
-        "description": "Activa o desactiva el comando !!bot_stats",
-        "required": False
-    }
-}
+COMMANDS_CONFIG_MAPPING = panel_mapping(SECTION_COMMANDS)
 
-MESSAGES_CONFIG_MAPPING = {
-    "WELCOME_REACTION_ENABLED": {
-        "name": "Reacciones de Bienvenida",
-        "type": "checkbox",
-        "description": "Habilita reacciones automáticas a mensajes de bienvenida",
-        "required": False
-    },
-    "WELCOME_MESSAGE_TEXT": {
-        "name": "Texto de Bienvenida",
-        "type": "textarea",
-        "description": "Mensaje que puede usar el bot para bienvenida",
-        "required": False
-    },
-    "SUCCESS_VERIFICATION_MESSAGE": {
-        "name": "Mensaje de Verificación Exitosa",
-        "type": "textarea",
-        "description": "Mensaje mostrado cuando la verificación es exitosa",
-        "required": False
-    },
-    "ERROR_VERIFICATION_MESSAGE": {
-        "name": "Mensaje de Error en Verificación",
-        "type": "textarea",
-        "description": "Mensaje mostrado cuando hay error en la verificación",
-        "required": False
-    },
-    "OAUTH_ERROR_MESSAGE": {
-        "name": "Mensaje de Error OAuth",
-        "type": "textarea",
-        "description": "Mensaje mostrado cuando hay error en el proceso OAuth",
-        "required": False
-    },
-    "ALREADY_VERIFIED_MESSAGE": {
-        "name": "Mensaje Usuario Ya Verificado",
-        "type": "textarea",
-        "description": "Mensaje para usuarios que ya están verificados",
-        "required": False
-    },
-    "VERIFICATION_TIMEOUT_MESSAGE": {
-        "name": "Mensaje de Timeout en Verificación",
-        "type": "textarea",
-        "description": "Mensaje cuando expira el tiempo de verificación",
-        "required": False
-    },
-    "ROLE_ASSIGNMENT_SUCCESS_MESSAGE": {
-        "name": "Mensaje de Asignación de Rol Exitosa",
-        "type": "textarea",
-        "description": "Mensaje cuando se asigna un rol correctamente",
-        "required": False
-    },
-    "ROLE_ASSIGNMENT_ERROR_MESSAGE": {
-        "name": "Mensaje de Error en Asignación de Rol",
-        "type": "textarea",
-        "description": "Mensaje cuando hay error al asignar un rol",
-        "required": False
-    }
-}
+MESSAGES_CONFIG_MAPPING = panel_mapping(SECTION_MESSAGES)
 
-VERIFICATION_CONFIG_MAPPING = {
-    "VERIFICATION_EMBED_TITLE": {
-        "name": "Título del Embed de Verificación",
-        "type": "text",
-        "description": "Título mostrado en el embed del flujo de verificación",
-        "required": False
-    },
-    "VERIFICATION_EMBED_DESCRIPTION": {
-        "name": "Descripción del Embed de Verificación",
-        "type": "textarea",
-        "description": "Descripción para el embed de verificación",
-        "required": False
-    },
-    "VERIFICATION_BUTTON_LABEL": {
-        "name": "Texto del Botón de Verificación",
-        "type": "text",
-        "description": "Etiqueta del botón de verificación",
-        "required": False
-    }
-}
+VERIFICATION_CONFIG_MAPPING = panel_mapping(SECTION_VERIFICATION)
 
 @app.get("/config/commands", response_class=HTMLResponse)
 async def config_commands_page(request: Request, username: str = Depends(verify_credentials)):
@@ -502,11 +216,11 @@ async def update_commands_config(request: Request, username: str = Depends(verif
             updated_list.append(info["name"])
 
     if updates:
-        if not dynamic_config.update_multiple(updates):
+        if not await dynamic_config.aupdate_multiple(updates):
             errors.append("Error al guardar configuraciones de comandos")
         else:
-            from src.utils.config import reload_config
-            reload_config()
+            from src.utils.config import areload_config
+            await areload_config()
 
     return templates.TemplateResponse("config_success.html", {
         "request": request,
@@ -549,11 +263,11 @@ async def update_messages_config(request: Request, username: str = Depends(verif
             updated_list.append(info["name"])
 
     if updates:
-        if not dynamic_config.update_multiple(updates):
+        if not await dynamic_config.aupdate_multiple(updates):
             errors.append("Error al guardar configuraciones de mensajes")
         else:
-            from src.utils.config import reload_config
-            reload_config()
+            from src.utils.config import areload_config
+            await areload_config()
 
     return templates.TemplateResponse("config_success.html", {
         "request": request,
@@ -565,7 +279,8 @@ async def update_messages_config(request: Request, username: str = Depends(verif
 @app.get("/config/verification", response_class=HTMLResponse)
 async def config_verification_page(request: Request, username: str = Depends(verify_credentials)):
     from src.utils.dynamic_config import config as dynamic_config
-    data = {k: (dynamic_config.get(k, "") or "") for k in VERIFICATION_CONFIG_MAPPING.keys()}
+    data = mask_sensitive(VERIFICATION_CONFIG_MAPPING,
+                          {k: (dynamic_config.get(k, "") or "") for k in VERIFICATION_CONFIG_MAPPING.keys()})
     return templates.TemplateResponse("config_verification.html", {
         "request": request,
         "username": username,
@@ -584,17 +299,20 @@ async def update_verification_config(request: Request, username: str = Depends(v
 
     for key, info in VERIFICATION_CONFIG_MAPPING.items():
         new_value = (form.get(key) or "").strip()
+        # El valor oculto vuelve tal cual si no se ha tocado el campo
+        if info["type"] == "password" and new_value == MASKED_VALUE:
+            continue
         current = dynamic_config.get(key, "") or ""
         if new_value != current:
             updates[key] = new_value
             updated_list.append(info["name"])
 
     if updates:
-        if not dynamic_config.update_multiple(updates):
+        if not await dynamic_config.aupdate_multiple(updates):
             errors.append("Error al guardar configuraciones de verificación")
         else:
-            from src.utils.config import reload_config
-            reload_config()
+            from src.utils.config import areload_config
+            await areload_config()
 
     return templates.TemplateResponse("config_success.html", {
         "request": request,
@@ -651,7 +369,7 @@ async def update_config(request: Request, username: str = Depends(verify_credent
     
     # Actualizar configuraciones en la base de datos
     if configs_to_update:
-        success = dynamic_config.update_multiple(configs_to_update)
+        success = await dynamic_config.aupdate_multiple(configs_to_update)
         if not success:
             errors.append("Error al guardar las configuraciones")
             config = get_raw_config()
@@ -665,8 +383,8 @@ async def update_config(request: Request, username: str = Depends(verify_credent
         
         # Recargar configuración del bot si está disponible
         try:
-            from src.utils.config import reload_config
-            reload_config()
+            from src.utils.config import areload_config
+            await areload_config()
             print(f"✅ Configuración recargada: {', '.join(updated_configs)}")
             
             # Intentar notificar al bot para que recargue su configuración
@@ -721,9 +439,37 @@ async def status_page(request: Request, username: str = Depends(verify_credentia
 
     # Obtener estadísticas de la base de datos (verificados y pendientes)
     db_stats = {"verified_users": 0, "pending_verifications": 0}
+    role_distribution = {}
     try:
         from src.database.models import db
         db_stats = await db.get_stats()
+        role_distribution = await db.get_role_distribution()
+    except Exception:
+        pass
+
+    # Cola de acciones salientes hacia Discord (profundidad y espera por bucket)
+    action_queue = {}
+    try:
+        from src.bot.action_scheduler import action_scheduler
+        action_queue = action_scheduler.get_metrics()
+    except Exception:
+        pass
+
+    # Progreso de las reconciliaciones de roles: estado guardado tras cada tramo, válido
+    # aunque el bot corra en otro proceso o aún no haya reanudado los trabajos
+    reconcile_jobs = {}
+    try:
+        from src.database.models import db
+        for guild_id, job_status, dry_run, last_id, report in await db.get_reconcile_jobs():
+            job = json.loads(report or "{}")
+            job.update(guild_id=guild_id, status=job_status, dry_run=bool(dry_run), last_id=last_id)
+            reconcile_jobs[guild_id] = job
+    except Exception:
+        pass
+    # Los trabajos de este proceso llevan contadores más recientes que el último tramo guardado
+    try:
+        from src.bot.role_reconciler import role_reconciler
+        reconcile_jobs.update(role_reconciler.get_progress())
     except Exception:
         pass
 
@@ -737,7 +483,10 @@ async def status_page(request: Request, username: str = Depends(verify_credentia
         "bot_status": bot_status,
         "config_status": "configured" if config_complete else "incomplete",
         "bot_stats": bot_stats,
-        "database": db_stats
+        "database": db_stats,
+        "role_distribution": role_distribution,
+        "action_queue": action_queue,
+        "reconcile_jobs": reconcile_jobs
     }
 
     return templates.TemplateResponse("status.html", {
@@ -747,6 +496,31 @@ async def status_page(request: Request, username: str = Depends(verify_credentia
         "config": get_current_config()
     })
 
+@app.post("/reconcile")
+async def reconcile_roles(request: Request, username: str = Depends(verify_credentials)):
+    """Iniciar (simulación o aplicando cambios) o cancelar la reconciliación de roles"""
+    form = await request.form()
+    action = form.get("action", "simular")
+    try:
+        from src.utils.bot_instance import get_bot_instance
+        from src.utils.dynamic_config import config as dynamic_config
+        from src.bot.role_reconciler import role_reconciler
+        bot = get_bot_instance()
+        if bot is not None and bot.guilds:
+            # Servidor del canal de verificación (o el primero si no está configurado)
+            channel = bot.get_channel(dynamic_config.int('VERIFICATION_CHANNEL_ID'))
+            guild = channel.guild if channel is not None else bot.guilds[0]
+            if action == "cancelar":
+                role_reconciler.cancel(guild.id)
+            else:
+                await role_reconciler.start(guild, dry_run=(action != "aplicar"))
+            print(f"🔁 Reconciliación de roles ({action}) solicitada desde el panel por {username}")
+        else:
+            print("⚠️ Reconciliación de roles no disponible: el bot no está conectado en este proceso")
+    except Exception as e:
+        print(f"⚠️ Error con la reconciliación de roles: {e}")
+    return RedirectResponse(url="/panel/status", status_code=status.HTTP_303_SEE_OTHER)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PANEL_PORT", 8001))
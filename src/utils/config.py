@@ -30,53 +30,58 @@ def get_config(key: str, default=None, convert_type=None):
     
     return value
 
-# Discord Bot Token: usar primero el valor del archivo, luego dinámico
-TOKEN = DISCORD_TOKEN_FILE or get_config("DISCORD_TOKEN")
+# Valores tipados derivados del esquema (src/utils/config_schema.py)
+def _apply_config():
+    """Recalcula las variables globales a partir de los accesores tipados de la configuración"""
+    global TOKEN, GENIUS_CLIENT_ID, GENIUS_CLIENT_SECRET, BASE_URL, GENIUS_REDIRECT_URI
+    global VERIFICATION_CHANNEL_ID, VERIFIED_ROLE_ID, GENIUS_ROLE_IDS, KEEP_ALIVE_INTERVAL
+    global CMD_PREFIX, ENABLE_COMMAND_PING, ENABLE_COMMAND_TEST_WELCOME
+    global WELCOME_REACTION_ENABLED, WELCOME_MESSAGE_TEXT
+    global VERIFICATION_EMBED_TITLE, VERIFICATION_EMBED_DESCRIPTION, VERIFICATION_BUTTON_LABEL
+
+    # Discord Bot Token: usar primero el valor del archivo, luego dinámico
+    TOKEN = DISCORD_TOKEN_FILE or config.str("DISCORD_TOKEN") or None
+
+    # Genius OAuth2 Credentials - Ahora opcional al inicio
+    GENIUS_CLIENT_ID = config.str("GENIUS_CLIENT_ID") or None
+    GENIUS_CLIENT_SECRET = config.str("GENIUS_CLIENT_SECRET") or None
+
+    # BASE_URL: usar primero el valor del archivo, luego dinámico
+    BASE_URL = BASE_URL_FILE or config.str("BASE_URL")
+    GENIUS_REDIRECT_URI = f"{BASE_URL}/callback"
+
+    # Discord Server Configuration - Ahora dinámico
+    VERIFICATION_CHANNEL_ID = config.int("VERIFICATION_CHANNEL_ID")
+    VERIFIED_ROLE_ID = config.int("VERIFIED_ROLE_ID")
+
+    # Role IDs for Genius roles - Ahora dinámico
+    GENIUS_ROLE_IDS = dict(config.role_ids())
+
+    # Sección: Comandos
+    CMD_PREFIX = config.str("CMD_PREFIX")
+    ENABLE_COMMAND_PING = config.bool("ENABLE_COMMAND_PING")
+    ENABLE_COMMAND_TEST_WELCOME = config.bool("ENABLE_COMMAND_TEST_WELCOME")
+
+    # Sección: Mensajes
+    WELCOME_REACTION_ENABLED = config.bool("WELCOME_REACTION_ENABLED")
+    WELCOME_MESSAGE_TEXT = config.str("WELCOME_MESSAGE_TEXT")
+
+    # Sección: Verificación
+    VERIFICATION_EMBED_TITLE = config.str("VERIFICATION_EMBED_TITLE")
+    VERIFICATION_EMBED_DESCRIPTION = config.str("VERIFICATION_EMBED_DESCRIPTION")
+    VERIFICATION_BUTTON_LABEL = config.str("VERIFICATION_BUTTON_LABEL")
 
-# Genius OAuth2 Credentials - Ahora opcional al inicio  
-GENIUS_CLIENT_ID = get_config("GENIUS_CLIENT_ID")
-GENIUS_CLIENT_SECRET = get_config("GENIUS_CLIENT_SECRET")
+    # Keep-Alive Configuration
+    KEEP_ALIVE_INTERVAL = config.int("KEEP_ALIVE_INTERVAL")
 
-# BASE_URL: usar primero el valor del archivo, luego dinámico
-BASE_URL = BASE_URL_FILE or get_config("BASE_URL", "https://geebot-testing.onrender.com")
-GENIUS_REDIRECT_URI = f"{BASE_URL}/callback"
+_apply_config()
 
 # Configuración del servidor web para Render
 WEB_SERVER_HOST = "0.0.0.0"  # Render requiere 0.0.0.0
 WEB_SERVER_PORT = int(os.environ.get("PORT", 10000))  # Render usa puerto 10000 por defecto 
 
-# Discord Server Configuration - Ahora dinámico
-VERIFICATION_CHANNEL_ID = get_config("VERIFICATION_CHANNEL_ID", "0", int)
-VERIFIED_ROLE_ID = get_config("VERIFIED_ROLE_ID", "1404855696842821653", int)
-
-# Role IDs for Genius roles - Ahora dinámico
-GENIUS_ROLE_IDS = {
-    "Verified Artist": get_config("ROLE_VERIFIED_ARTIST", "1404856059717484684", int),
-    "Staff": get_config("ROLE_STAFF", "1404856078394724463", int),
-    "Moderator": get_config("ROLE_MODERATOR", "1404855980738740385", int),
-    "Editor": get_config("ROLE_EDITOR", "1404855934764847194", int),
-    "Transcriber": get_config("ROLE_TRANSCRIBER", "1404855862710763630", int),
-    "Mediator": get_config("ROLE_MEDIATOR", "1404855801201557514", int),
-    "Contributor": get_config("ROLE_CONTRIBUTOR", "1404855696842821653", int)
-}
-
-# Sección: Comandos (valores por defecto)
-CMD_PREFIX = get_config("CMD_PREFIX", "!!")
-ENABLE_COMMAND_PING = get_config("ENABLE_COMMAND_PING", "true").lower() == "true"
-ENABLE_COMMAND_TEST_WELCOME = get_config("ENABLE_COMMAND_TEST_WELCOME", "true").lower() == "true"
-
-# Sección: Mensajes (valores por defecto)
-WELCOME_REACTION_ENABLED = get_config("WELCOME_REACTION_ENABLED", "true").lower() == "true"
-WELCOME_MESSAGE_TEXT = get_config("WELCOME_MESSAGE_TEXT", "")
-
-# Sección: Verificación (valores por defecto)
-VERIFICATION_EMBED_TITLE = get_config("VERIFICATION_EMBED_TITLE", "Verificación con Genius")
-VERIFICATION_EMBED_DESCRIPTION = get_config("VERIFICATION_EMBED_DESCRIPTION", "Conecta tu cuenta de Genius para obtener roles.")
-VERIFICATION_BUTTON_LABEL = get_config("VERIFICATION_BUTTON_LABEL", "Verificar con Genius")
-
 # Keep-Alive Configuration
 KEEP_ALIVE_ENABLED = True
-KEEP_ALIVE_INTERVAL = get_config("KEEP_ALIVE_INTERVAL", 300, int)
 KEEP_ALIVE_TIMEOUT = 30  # Timeout para requests de keep-alive
 
 # Función para verificar si el bot está configurado
@@ -91,47 +96,11 @@ def get_missing_configs():
 
 # Función para recargar configuración
 def reload_config():
-    """Recargar configuración desde la base de datos"""
-    global TOKEN, GENIUS_CLIENT_ID, GENIUS_CLIENT_SECRET, BASE_URL
-    global DISCORD_TOKEN_FILE, BASE_URL_FILE
-    global VERIFICATION_CHANNEL_ID, VERIFIED_ROLE_ID, GENIUS_ROLE_IDS, KEEP_ALIVE_INTERVAL
-    global CMD_PREFIX, ENABLE_COMMAND_PING, ENABLE_COMMAND_TEST_WELCOME
-    global WELCOME_REACTION_ENABLED, WELCOME_MESSAGE_TEXT
-    global VERIFICATION_EMBED_TITLE, VERIFICATION_EMBED_DESCRIPTION, VERIFICATION_BUTTON_LABEL
-
-    config._load_config()
-    
-    # Actualizar variables globales
-    # Mantener prioridad de archivo en DISCORD_TOKEN y BASE_URL
-    TOKEN = DISCORD_TOKEN_FILE or get_config("DISCORD_TOKEN")
-    GENIUS_CLIENT_ID = get_config("GENIUS_CLIENT_ID")
-    GENIUS_CLIENT_SECRET = get_config("GENIUS_CLIENT_SECRET")
-    BASE_URL = BASE_URL_FILE or get_config("BASE_URL", "https://geebot-testing.onrender.com")
-    VERIFICATION_CHANNEL_ID = get_config("VERIFICATION_CHANNEL_ID", "0", int)
-    VERIFIED_ROLE_ID = get_config("VERIFIED_ROLE_ID", "1404855696842821653", int)
-    KEEP_ALIVE_INTERVAL = get_config("KEEP_ALIVE_INTERVAL", 300, int)
-
-    # Sección: Comandos
-    CMD_PREFIX = get_config("CMD_PREFIX", "!!")
-    ENABLE_COMMAND_PING = get_config("ENABLE_COMMAND_PING", "true").lower() == "true"
-    ENABLE_COMMAND_TEST_WELCOME = get_config("ENABLE_COMMAND_TEST_WELCOME", "true").lower() == "true"
-
-    # Sección: Mensajes
-    WELCOME_REACTION_ENABLED = get_config("WELCOME_REACTION_ENABLED", "true").lower() == "true"
-    WELCOME_MESSAGE_TEXT = get_config("WELCOME_MESSAGE_TEXT", "")
-
-    # Sección: Verificación
-    VERIFICATION_EMBED_TITLE = get_config("VERIFICATION_EMBED_TITLE", "Verificación con Genius")
-    VERIFICATION_EMBED_DESCRIPTION = get_config("VERIFICATION_EMBED_DESCRIPTION", "Conecta tu cuenta de Genius para obtener roles.")
-    VERIFICATION_BUTTON_LABEL = get_config("VERIFICATION_BUTTON_LABEL", "Verificar con Genius")
-    
-    # Actualizar roles
-    GENIUS_ROLE_IDS = {
-        "Verified Artist": get_config("ROLE_VERIFIED_ARTIST", "1404856059717484684", int),
-        "Staff": get_config("ROLE_STAFF", "1404856078394724463", int),
-        "Moderator": get_config("ROLE_MODERATOR", "1404855980738740385", int),
-        "Editor": get_config("ROLE_EDITOR", "1404855934764847194", int),
-        "Transcriber": get_config("ROLE_TRANSCRIBER", "1404855862710763630", int),
-        "Mediator": get_config("ROLE_MEDIATOR", "1404855801201557514", int),
-        "Contributor": get_config("ROLE_CONTRIBUTOR", "1404855696842821653", int)
-    }
\ No newline at end of file
+    """Aplicar cambios pendientes de la base de datos (solo las filas modificadas)"""
+    config.refresh()
+    _apply_config()
+
+async def areload_config():
+    """Versión asíncrona de reload_config: la consulta a la base de datos no bloquea el event loop"""
+    await config.arefresh()
+    _apply_config()
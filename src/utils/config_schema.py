@@ -0,0 +1,473 @@
+"""
+Esquema declarativo de la configuración de GeeBot
+Fuente única de claves, tipos, valores por defecto, obligatoriedad y secciones del panel
+"""
+
+from typing import Any, Callable, Dict, List
+
+# Secciones del panel (cada una es una página de configuración)
+SECTION_GENERAL = "general"
+SECTION_COMMANDS = "commands"
+SECTION_MESSAGES = "messages"
+SECTION_VERIFICATION = "verification"
+
+# type es el tipo de campo del panel; también determina el tipo del valor parseado:
+# checkbox -> bool, number -> int, el resto -> str
+CONFIG_SCHEMA: Dict[str, Dict[str, Any]] = {
+    # Sección: General
+    "DISCORD_TOKEN": {
+        "section": SECTION_GENERAL,
+        "name": "Discord Bot Token",
+        "type": "password",
+        "description": "Token del bot de Discord",
+        "required": True,
+        "default": ""
+    },
+    "GENIUS_CLIENT_ID": {
+        "section": SECTION_GENERAL,
+        "name": "Genius Client ID",
+        "type": "text",
+        "description": "ID de cliente de la aplicación Genius",
+        "required": True,
+        "default": ""
+    },
+    "GENIUS_CLIENT_SECRET": {
+        "section": SECTION_GENERAL,
+        "name": "Genius Client Secret",
+        "type": "password",
+        "description": "Secreto de cliente de la aplicación Genius",
+        "required": True,
+        "default": ""
+    },
+    "BASE_URL": {
+        "section": SECTION_GENERAL,
+        "name": "URL Base",
+        "type": "url",
+        "description": "URL base del servidor (ej: https://geebot.onrender.com)",
+        "required": True,
+        "default": "https://geebot-testing.onrender.com"
+    },
+    "VERIFICATION_CHANNEL_ID": {
+        "section": SECTION_GENERAL,
+        "name": "Canal de Verificación",
+        "type": "number",
+        "description": "ID del canal donde estará el botón de verificación",
+        "required": True,
+        "default": 0
+    },
+    "VERIFIED_ROLE_ID": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Verificado",
+        "type": "number",
+        "description": "ID del rol general para usuarios verificados",
+        "required": True,
+        "default": 0
+    },
+    "ROLE_VERIFIED_ARTIST": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Artista Verificado",
+        "type": "number",
+        "description": "ID del rol para artistas verificados",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_STAFF": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Staff",
+        "type": "number",
+        "description": "ID del rol para staff",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_MODERATOR": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Moderador",
+        "type": "number",
+        "description": "ID del rol para moderadores",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_EDITOR": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Editor",
+        "type": "number",
+        "description": "ID del rol para editores",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_TRANSCRIBER": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Transcriptor",
+        "type": "number",
+        "description": "ID del rol para transcriptores",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_MEDIATOR": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Mediador",
+        "type": "number",
+        "description": "ID del rol para mediadores",
+        "required": False,
+        "default": 0
+    },
+    "ROLE_CONTRIBUTOR": {
+        "section": SECTION_GENERAL,
+        "name": "Rol Contribuidor",
+        "type": "number",
+        "description": "ID del rol para contribuidores",
+        "required": False,
+        "default": 0
+    },
+    "STAFF_ROLE_IDS": {
+        "section": SECTION_GENERAL,
+        "name": "Roles de Staff del Bot",
+        "type": "text",
+        "description": "IDs de los roles con permisos de staff en el bot, separados por comas (vacío: roles llamados Staff, Moderator, Editor o Moderador)",
+        "required": False,
+        "default": ""
+    },
+    "KEEP_ALIVE_INTERVAL": {
+        "section": SECTION_GENERAL,
+        "name": "Intervalo Keep-Alive",
+        "type": "number",
+        "description": "Intervalo en segundos para keep-alive (300 = 5 minutos)",
+        "required": False,
+        "default": 300
+    },
+
+    # Sección: Comandos
+    "CMD_PREFIX": {
+        "section": SECTION_COMMANDS,
+        "name": "Prefijo de Comandos",
+        "type": "text",
+        "description": "Prefijo para comandos con texto (ej: !!)",
+        "required": False,
+        "default": "!!"
+    },
+    "ENABLE_COMMAND_PING": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando ping",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!ping",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_TEST_WELCOME": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando test_welcome",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!test_welcome",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_HELP": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando help",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!help",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_TEST": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando test",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!test",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_SETUP_VERIFICATION": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando setup_verification",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!setup_verification",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_VERIFY_STATUS": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando verify_status",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!verify_status",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_UNVERIFY": {
+        "section": SECTION_COMMANDS,
+        "name": "Habilitar comando unverify",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!unverify",
+        "required": False,
+        "default": True
+    },
+    # Los siguientes también se muestran en la página general del panel
+    "ENABLE_COMMAND_VERIFIED_LIST": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando verified_list",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!verified_list",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_TEST_ROLES": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando test_roles",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!test_roles",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_LIST_ROLES": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando list_roles",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!list_roles",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_SHOW_CONFIG": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando show_config",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!show_config",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_CLEANUP_VERIFICATIONS": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando cleanup_verifications",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!cleanup_verifications",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_RECONCILE_ROLES": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando reconcile_roles",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!reconcile_roles",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_SYNC": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando sync",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!sync",
+        "required": False,
+        "default": True
+    },
+    "ENABLE_COMMAND_BOT_STATS": {
+        "section": SECTION_COMMANDS,
+        "panels": [SECTION_GENERAL],
+        "name": "Habilitar comando bot_stats",
+        "type": "checkbox",
+        "description": "Activa o desactiva el comando !!bot_stats",
+        "required": False,
+        "default": True
+    },
+
+    # Sección: Mensajes
+    "WELCOME_REACTION_ENABLED": {
+        "section": SECTION_MESSAGES,
+        "name": "Reacciones de Bienvenida",
+        "type": "checkbox",
+        "description": "Habilita reacciones automáticas a mensajes de bienvenida",
+        "required": False,
+        "default": True
+    },
+    "WELCOME_MESSAGE_TEXT": {
+        "section": SECTION_MESSAGES,
+        "name": "Texto de Bienvenida",
+        "type": "textarea",
+        "description": "Mensaje que puede usar el bot para bienvenida",
+        "required": False,
+        "default": ""
+    },
+    "SUCCESS_VERIFICATION_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Verificación Exitosa",
+        "type": "textarea",
+        "description": "Mensaje mostrado cuando la verificación es exitosa",
+        "required": False,
+        "default": ""
+    },
+    "ERROR_VERIFICATION_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Error en Verificación",
+        "type": "textarea",
+        "description": "Mensaje mostrado cuando hay error en la verificación",
+        "required": False,
+        "default": ""
+    },
+    "OAUTH_ERROR_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Error OAuth",
+        "type": "textarea",
+        "description": "Mensaje mostrado cuando hay error en el proceso OAuth",
+        "required": False,
+        "default": ""
+    },
+    "ALREADY_VERIFIED_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje Usuario Ya Verificado",
+        "type": "textarea",
+        "description": "Mensaje para usuarios que ya están verificados",
+        "required": False,
+        "default": ""
+    },
+    "VERIFICATION_TIMEOUT_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Timeout en Verificación",
+        "type": "textarea",
+        "description": "Mensaje cuando expira el tiempo de verificación",
+        "required": False,
+        "default": ""
+    },
+    "ROLE_ASSIGNMENT_SUCCESS_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Asignación de Rol Exitosa",
+        "type": "textarea",
+        "description": "Mensaje cuando se asigna un rol correctamente",
+        "required": False,
+        "default": ""
+    },
+    "ROLE_ASSIGNMENT_ERROR_MESSAGE": {
+        "section": SECTION_MESSAGES,
+        "name": "Mensaje de Error en Asignación de Rol",
+        "type": "textarea",
+        "description": "Mensaje cuando hay error al asignar un rol",
+        "required": False,
+        "default": ""
+    },
+
+    # Sección: Verificación
+    "VERIFICATION_EMBED_TITLE": {
+        "section": SECTION_VERIFICATION,
+        "name": "Título del Embed de Verificación",
+        "type": "text",
+        "description": "Título mostrado en el embed del flujo de verificación",
+        "required": False,
+        "default": "Verificación con Genius"
+    },
+    "VERIFICATION_EMBED_DESCRIPTION": {
+        "section": SECTION_VERIFICATION,
+        "name": "Descripción del Embed de Verificación",
+        "type": "textarea",
+        "description": "Descripción para el embed de verificación",
+        "required": False,
+        "default": "Conecta tu cuenta de Genius para obtener roles."
+    },
+    "VERIFICATION_BUTTON_LABEL": {
+        "section": SECTION_VERIFICATION,
+        "name": "Texto del Botón de Verificación",
+        "type": "text",
+        "description": "Etiqueta del botón de verificación",
+        "required": False,
+        "default": "Verificar con Genius"
+    },
+    "OAUTH_STATE_MODE": {
+        "section": SECTION_VERIFICATION,
+        "name": "Modo de Estado OAuth",
+        "type": "select",
+        "options": ["db", "signed"],
+        "description": "db guarda cada intento en la base de datos; signed usa tokens HMAC validados en memoria",
+        "required": False,
+        "default": "db"
+    },
+    "OAUTH_STATE_SECRET": {
+        "section": SECTION_VERIFICATION,
+        "name": "Secreto de Firma OAuth",
+        "type": "password",
+        "description": "Secreto compartido entre bot y servidor web (vacío = usar Genius Client Secret)",
+        "required": False,
+        "default": ""
+    },
+    "CLEANUP_INTERVAL_HOURS": {
+        "section": SECTION_VERIFICATION,
+        "name": "Intervalo de Limpieza Automática",
+        "type": "number",
+        "description": "Horas entre limpiezas de verificaciones de usuarios que ya no están en el servidor (0 = desactivado)",
+        "required": False,
+        "default": 24
+    },
+}
+
+# Rol canónico de Genius -> clave de configuración con el ID del rol de Discord
+ROLE_CONFIG_KEYS: Dict[str, str] = {
+    "Verified Artist": "ROLE_VERIFIED_ARTIST",
+    "Staff": "ROLE_STAFF",
+    "Moderator": "ROLE_MODERATOR",
+    "Editor": "ROLE_EDITOR",
+    "Transcriber": "ROLE_TRANSCRIBER",
+    "Mediator": "ROLE_MEDIATOR",
+    "Contributor": "ROLE_CONTRIBUTOR",
+}
+
+# Claves imprescindibles para que el bot arranque
+REQUIRED_KEYS: List[str] = [key for key, field in CONFIG_SCHEMA.items() if field["required"]]
+
+TRUE_VALUES = ("true", "1", "yes", "on")
+
+def _parse_bool(raw: str, field: Dict[str, Any]) -> bool:
+    return raw.strip().lower() in TRUE_VALUES
+
+def _parse_int(raw: str, field: Dict[str, Any]) -> int:
+    try:
+        return int(raw.strip())
+    except ValueError:
+        return int(field.get("default") or 0)
+
+def _parse_select(raw: str, field: Dict[str, Any]) -> str:
+    value = raw.strip().lower()
+    return value if value in field["options"] else field["default"]
+
+def _parse_str(raw: str, field: Dict[str, Any]) -> str:
+    return raw
+
+# Tipo de campo del panel -> función de parseo
+PARSERS: Dict[str, Callable[[str, Dict[str, Any]], Any]] = {
+    "checkbox": _parse_bool,
+    "number": _parse_int,
+    "select": _parse_select,
+}
+
+def parse_value(key: str, raw: Any) -> Any:
+    """Convierte el valor en texto de una clave a su tipo según el esquema (vacío = default)"""
+    field = CONFIG_SCHEMA.get(key)
+    if field is None:
+        return raw
+    if raw is None or raw == "":
+        return field["default"]
+    return PARSERS.get(field["type"], _parse_str)(raw, field)
+
+def panel_mapping(section: str) -> Dict[str, Dict[str, Any]]:
+    """Mapeo clave -> metadatos para una página del panel, en el orden del esquema"""
+    mapping = {}
+    for key, field in CONFIG_SCHEMA.items():
+        if field["section"] == section or section in field.get("panels", ()):
+            info = {
+                "name": field["name"],
+                "type": field["type"],
+                "description": field["description"],
+                "required": field["required"]
+            }
+            if "options" in field:
+                info["options"] = field["options"]
+            mapping[key] = info
+    return mapping
+
+def default_text(key: str) -> str:
+    """Valor por defecto de una clave en el formato texto que se guarda en la tabla config"""
+    default = CONFIG_SCHEMA[key]["default"]
+    if isinstance(default, bool):
+        return "true" if default else "false"
+    return str(default)
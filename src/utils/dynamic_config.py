@@ -6,10 +6,44 @@ Permite configurar el bot desde el panel web sin reiniciar
 import os
 import json
 import sqlite3
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Mapping
 import threading
 
+from .config_schema import (
+    CONFIG_SCHEMA, ROLE_CONFIG_KEYS, REQUIRED_KEYS, SECTION_COMMANDS, parse_value, default_text
+)
+
+# Red de seguridad (segundos): los cambios de otros procesos llegan por el bus de topics,
+# que refresca antes de entregar; este repaso solo cubre escrituras sin aviso
+CONFIG_WATCH_INTERVAL = float(os.environ.get("CONFIG_WATCH_INTERVAL", 30.0))
+# Marca de tiempo con milisegundos: updated_at debe avanzar aunque haya varias escrituras por segundo
+SQL_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+class ConfigSnapshot:
+    """
+    Vista inmutable de la configuración en un instante.
+    Nunca se modifica: cada cambio construye un snapshot nuevo que sustituye al anterior.
+    """
+    __slots__ = ('version', 'stored', 'values', 'typed', 'role_ids')
+
+    def __init__(self, version: int, stored: Dict[str, str]):
+        self.version = version
+        # Valores tal y como están en la tabla config
+        self.stored = stored
+        # Valores efectivos: los no vacíos de la base de datos tienen prioridad
+        # y el resto cae a las variables de entorno (resuelto aquí, no en cada lectura)
+        values = {key: value for key, value in os.environ.items() if value}
+        values.update((key, value) for key, value in stored.items() if value)
+        self.values = values
+        # Valores parseados según el esquema; se rellenan al primer acceso y mueren con el snapshot
+        self.typed: Dict[str, Any] = {}
+        self.role_ids: Optional[Dict[str, int]] = None
+
 class DynamicConfig:
     """Gestor de configuración dinámico"""
     
@@ -29,11 +63,42 @@ class DynamicConfig:
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
         
-        self.config_cache = {}
+        # Snapshot actual; los lectores solo hacen una carga de atributo, sin lock.
+        # self.lock serializa únicamente a los escritores.
+        self._snapshot = ConfigSnapshot(0, {})
         self.lock = threading.Lock()
+        # Conexión persistente para vigilar cambios externos (usar con self.lock)
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        # Mayor updated_at aplicado; las recargas incrementales solo leen filas desde aquí
+        self._updated_high_water = ""
+        self.watching = False
+        self.watch_thread = None
+        self._watch_stop = threading.Event()
+        # Hilo escritor único para la API asíncrona: las escrituras se aplican en orden
+        # y un disco lento nunca bloquea el event loop del bot ni del panel
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-writer")
         self._init_database()
         self._load_config()
     
+    @property
+    def version(self) -> int:
+        """Versión del snapshot actual; cambia con cada modificación"""
+        return self._snapshot.version
+    
+    @property
+    def config_cache(self) -> Mapping[str, str]:
+        """Valores almacenados en la tabla config (solo lectura)"""
+        return MappingProxyType(self._snapshot.stored)
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """Devuelve el snapshot actual para leer varias claves de forma coherente"""
+        return self._snapshot
+    
+    def _publish(self, stored: Dict[str, str]):
+        """Construye el siguiente snapshot a partir de stored y lo publica (llamar con self.lock)"""
+        self._snapshot = ConfigSnapshot(self._snapshot.version + 1, stored)
+    
     def _init_database(self):
         """Inicializar base de datos de configuración"""
         with sqlite3.connect(self.db_path) as conn:
@@ -46,75 +111,154 @@ class DynamicConfig:
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_config_updated_at ON config(updated_at)")
             conn.commit()
     
+    def _get_watch_conn(self) -> sqlite3.Connection:
+        """Conexión persistente en autocommit; data_version solo es comparable dentro de una misma conexión"""
+        if self._watch_conn is None:
+            self._watch_conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        return self._watch_conn
+    
     def _load_config(self):
-        """Cargar configuración desde la base de datos"""
+        """Cargar configuración completa desde la base de datos"""
         with self.lock:
             try:
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.execute("SELECT key, value FROM config")
-                    self.config_cache = {row[0]: row[1] for row in cursor.fetchall()}
+                conn = self._get_watch_conn()
+                # Leer data_version antes que las filas: un cambio posterior siempre se detectará
+                self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                rows = conn.execute("SELECT key, value, updated_at FROM config").fetchall()
+                stored = {row[0]: row[1] for row in rows}
+                self._updated_high_water = max((row[2] for row in rows if row[2]), default="")
                 
                 # Establecer valores por defecto para comandos habilitados
-                self._set_default_command_configs()
+                self._set_default_command_configs(stored)
                 
             except Exception as e:
                 print(f"⚠️ Error cargando configuración: {e}")
-                self.config_cache = {}
-    
-    def _set_default_command_configs(self):
-        """Establecer valores por defecto para configuraciones de comandos"""
-        default_command_configs = {
-            'ENABLE_COMMAND_VERIFIED_LIST': 'true',
-            'ENABLE_COMMAND_TEST_ROLES': 'true',
-            'ENABLE_COMMAND_LIST_ROLES': 'true',
-            'ENABLE_COMMAND_SHOW_CONFIG': 'true',
-            'ENABLE_COMMAND_CLEANUP_VERIFICATIONS': 'true',
-            'ENABLE_COMMAND_SYNC': 'true',
-            'ENABLE_COMMAND_BOT_STATS': 'true'
-        }
+                stored = {}
+            
+            self._publish(stored)
+    
+    def _set_default_command_configs(self, stored: Dict[str, str]):
+        """Establecer valores por defecto para los interruptores de comandos (según el esquema)"""
+        for key, field in CONFIG_SCHEMA.items():
+            if field["section"] == SECTION_COMMANDS and field["type"] == "checkbox" and key not in stored:
+                stored[key] = default_text(key)
+    
+    def refresh(self) -> bool:
+        """
+        Aplica los cambios que otros procesos hayan escrito en la tabla config.
+        Si nadie ha escrito desde la última comprobación solo cuesta un PRAGMA data_version;
+        si hay cambios se leen únicamente las filas cuyo updated_at ha avanzado.
+        Devuelve True si se publicó un snapshot nuevo.
+        """
+        with self.lock:
+            try:
+                conn = self._get_watch_conn()
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if data_version == self._data_version:
+                    return False
+                self._data_version = data_version
+                # >= para no perder filas escritas en el mismo milisegundo que la última aplicada
+                rows = conn.execute(
+                    "SELECT key, value, updated_at FROM config WHERE updated_at >= ?",
+                    (self._updated_high_water,)
+                ).fetchall()
+            except Exception as e:
+                print(f"⚠️ Error comprobando cambios de configuración: {e}")
+                return False
+            
+            current = self._snapshot.stored
+            changed_configs = {}
+            for key, value, updated_at in rows:
+                if updated_at > self._updated_high_water:
+                    self._updated_high_water = updated_at
+                if current.get(key) != value:
+                    changed_configs[key] = {'old': current.get(key), 'new': value}
+            
+            # Escrituras propias (ya publicadas) o sin cambios de valor: nada que hacer
+            if not changed_configs:
+                return False
+            
+            stored = dict(current)
+            for key, change in changed_configs.items():
+                stored[key] = change['new']
+                if change['new'] is not None:
+                    os.environ[key] = change['new']
+            self._publish(stored)
         
-        for key, default_value in default_command_configs.items():
-            if key not in self.config_cache:
-                self.config_cache[key] = default_value
+        # Los suscriptores se enteran por el bus de topics (el proceso que escribió ya publicó)
+        print(f"🔄 Configuración recargada desde otro proceso: {', '.join(changed_configs)}")
+        return True
     
-    def get(self, key: str, default: Any = None) -> Any:
-        """Obtener valor de configuración"""
-        # Primero intentar desde cache
-        if key in self.config_cache and self.config_cache[key]:
-            return self.config_cache[key]
+    def start_watching(self, interval: float = CONFIG_WATCH_INTERVAL):
+        """Iniciar el hilo que aplica los cambios de configuración hechos por otros procesos"""
+        if self.watching:
+            return
         
-        # Luego desde variables de entorno (para compatibilidad)
-        env_value = os.environ.get(key)
-        if env_value:
-            return env_value
+        # Refrescar antes de entregar mensajes remotos: los suscriptores siempre leen
+        # la configuración que provocó el mensaje
+        from .topic_bus import bus
+        bus.before_remote_delivery(self.refresh)
         
-        return default
+        self.watching = True
+        self._watch_stop.clear()
+        self.watch_thread = threading.Thread(
+            target=self._watch_config,
+            args=(interval,),
+            daemon=True
+        )
+        self.watch_thread.start()
+        print(f"👀 Vigilancia de configuración iniciada (respaldo cada {interval:.0f}s)")
+    
+    def stop_watching(self):
+        """Detener el hilo de vigilancia de configuración"""
+        self.watching = False
+        self._watch_stop.set()
+        if self.watch_thread:
+            self.watch_thread.join(timeout=2)
+    
+    def _watch_config(self, interval: float):
+        """Repaso de respaldo en hilo separado (el aviso normal llega por el bus)"""
+        while not self._watch_stop.wait(interval):
+            self.refresh()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """Obtener valor de configuración (base de datos y, si está vacío, entorno)"""
+        return self._snapshot.values.get(key, default)
     
     def set(self, key: str, value: str, description: str = "", required: bool = False):
         """Establecer valor de configuración"""
         with self.lock:
             try:
                 # Obtener valor anterior para comparar
-                old_value = self.config_cache.get(key)
+                current = self._snapshot.stored
+                old_value = current.get(key)
                 
                 with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("""
-                        INSERT OR REPLACE INTO config (key, value, description, required)
-                        VALUES (?, ?, ?, ?)
+                    conn.execute(f"""
+                        INSERT INTO config (key, value, description, required, updated_at)
+                        VALUES (?, ?, ?, ?, {SQL_NOW})
+                        ON CONFLICT(key) DO UPDATE SET
+                            value = excluded.value,
+                            description = excluded.description,
+                            required = excluded.required,
+                            updated_at = excluded.updated_at
                     """, (key, value, description, required))
                     conn.commit()
                 
-                # Actualizar cache
-                self.config_cache[key] = value
-                
                 # También actualizar variable de entorno para compatibilidad
                 os.environ[key] = value
                 
+                # Publicar el nuevo snapshot
+                stored = dict(current)
+                stored[key] = value
+                self._publish(stored)
+                
                 # Emitir evento si el valor cambió
                 if old_value != value:
-                    self._emit_config_event(key, value, old_value)
+                    self._publish_changes({key: {'old': old_value, 'new': value}})
                 
                 return True
             except Exception as e:
@@ -143,37 +287,71 @@ class DynamicConfig:
         with self.lock:
             try:
                 # Obtener valores anteriores para comparar
+                current = self._snapshot.stored
                 old_values = {}
                 for key in configs.keys():
-                    old_values[key] = self.config_cache.get(key)
+                    old_values[key] = current.get(key)
                 
+                # Upsert: conserva descripción y required de las filas existentes
                 with sqlite3.connect(self.db_path) as conn:
-                    for key, value in configs.items():
-                        conn.execute("""
-                            INSERT OR REPLACE INTO config (key, value)
-                            VALUES (?, ?)
-                        """, (key, value))
+                    conn.executemany(f"""
+                        INSERT INTO config (key, value, updated_at)
+                        VALUES (?, ?, {SQL_NOW})
+                        ON CONFLICT(key) DO UPDATE SET
+                            value = excluded.value,
+                            updated_at = excluded.updated_at
+                    """, list(configs.items()))
                     conn.commit()
                 
-                # Actualizar cache y variables de entorno
+                # Construir el siguiente snapshot aparte y publicarlo de una vez:
+                # los lectores nunca ven una actualización aplicada a medias
+                stored = dict(current)
                 changed_configs = {}
                 for key, value in configs.items():
-                    self.config_cache[key] = value
+                    stored[key] = value
                     os.environ[key] = value
                     
                     # Registrar cambios
                     if old_values[key] != value:
                         changed_configs[key] = {'old': old_values[key], 'new': value}
+                self._publish(stored)
                 
                 # Emitir eventos para configuraciones que cambiaron
                 if changed_configs:
-                    self._emit_multiple_config_events(changed_configs)
+                    self._publish_changes(changed_configs)
                 
                 return True
             except Exception as e:
                 print(f"❌ Error actualizando configuraciones: {e}")
                 return False
     
+    # ==================== API ASÍNCRONA ====================
+    
+    async def _run_in_writer(self, func, *args, **kwargs):
+        """Ejecutar una operación de la API síncrona en el hilo escritor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(func, *args, **kwargs))
+    
+    async def aset(self, key: str, value: str, description: str = "", required: bool = False) -> bool:
+        """Versión asíncrona de set para usar desde handlers async"""
+        return await self._run_in_writer(self.set, key, value, description, required)
+    
+    async def aupdate_multiple(self, configs: Dict[str, str]) -> bool:
+        """Versión asíncrona de update_multiple para usar desde handlers async"""
+        return await self._run_in_writer(self.update_multiple, configs)
+    
+    async def aget_all(self) -> Dict[str, Any]:
+        """Versión asíncrona de get_all"""
+        return await self._run_in_writer(self.get_all)
+    
+    async def ainit_default_configs(self):
+        """Versión asíncrona de init_default_configs"""
+        return await self._run_in_writer(self.init_default_configs)
+    
+    async def arefresh(self) -> bool:
+        """Versión asíncrona de refresh"""
+        return await self._run_in_writer(self.refresh)
+    
     def is_configured(self) -> bool:
         """Verificar si las configuraciones básicas están completas"""
         required_keys = [
@@ -190,162 +368,107 @@ class DynamicConfig:
     
     def get_missing_configs(self) -> list:
         """Obtener lista de configuraciones faltantes"""
-        required_keys = [
-            'DISCORD_TOKEN',
-            'GENIUS_CLIENT_ID',
-            'GENIUS_CLIENT_SECRET', 
-            'BASE_URL',
-            'VERIFICATION_CHANNEL_ID',
-            'VERIFIED_ROLE_ID'
-        ]
-        
         missing = []
-        for key in required_keys:
+        for key in REQUIRED_KEYS:
             if not self.get(key):
                 missing.append(key)
         return missing
     
     def init_default_configs(self):
-        """Inicializar configuraciones por defecto"""
-        default_configs = {
-            'DISCORD_TOKEN': {'desc': 'Token del bot de Discord', 'required': True},
-            'GENIUS_CLIENT_ID': {'desc': 'ID de cliente de la aplicación Genius', 'required': True},
-            'GENIUS_CLIENT_SECRET': {'desc': 'Secreto de cliente de la aplicación Genius', 'required': True},
-            'BASE_URL': {'desc': 'URL base del servidor', 'required': True},
-            'VERIFICATION_CHANNEL_ID': {'desc': 'ID del canal de verificación', 'required': True},
-            'VERIFIED_ROLE_ID': {'desc': 'ID del rol de usuario verificado', 'required': True},
-            'ROLE_VERIFIED_ARTIST': {'desc': 'ID del rol de artista verificado', 'required': False},
-            'ROLE_STAFF': {'desc': 'ID del rol de staff', 'required': False},
-            'ROLE_MODERATOR': {'desc': 'ID del rol de moderador', 'required': False},
-            'ROLE_EDITOR': {'desc': 'ID del rol de editor', 'required': False},
-            'ROLE_TRANSCRIBER': {'desc': 'ID del rol de transcriptor', 'required': False},
-            'ROLE_MEDIATOR': {'desc': 'ID del rol de mediador', 'required': False},
-            'ROLE_CONTRIBUTOR': {'desc': 'ID del rol de contribuidor', 'required': False},
-            'KEEP_ALIVE_INTERVAL': {'desc': 'Intervalo de keep-alive en segundos', 'required': False},
-
-            # Sección: Comandos
-            'CMD_PREFIX': {'desc': 'Prefijo de comandos (ej: !!)', 'required': False},
-            'ENABLE_COMMAND_PING': {'desc': 'Habilitar comando ping', 'required': False},
-            'ENABLE_COMMAND_TEST_WELCOME': {'desc': 'Habilitar comando test_welcome', 'required': False},
-            'ENABLE_COMMAND_HELP': {'desc': 'Habilitar comando help', 'required': False},
-            'ENABLE_COMMAND_TEST': {'desc': 'Habilitar comando test', 'required': False},
-            'ENABLE_COMMAND_SETUP_VERIFICATION': {'desc': 'Habilitar comando setup_verification', 'required': False},
-            'ENABLE_COMMAND_VERIFY_STATUS': {'desc': 'Habilitar comando verify_status', 'required': False},
-            'ENABLE_COMMAND_UNVERIFY': {'desc': 'Habilitar comando unverify', 'required': False},
-            'ENABLE_COMMAND_VERIFIED_LIST': {'desc': 'Habilitar comando verified_list', 'required': False},
-            'ENABLE_COMMAND_TEST_ROLES': {'desc': 'Habilitar comando test_roles', 'required': False},
-            'ENABLE_COMMAND_LIST_ROLES': {'desc': 'Habilitar comando list_roles', 'required': False},
-            'ENABLE_COMMAND_SHOW_CONFIG': {'desc': 'Habilitar comando show_config', 'required': False},
-            'ENABLE_COMMAND_CLEANUP_VERIFICATIONS': {'desc': 'Habilitar comando cleanup_verifications', 'required': False},
-            'ENABLE_COMMAND_SYNC': {'desc': 'Habilitar comando sync', 'required': False},
-            'ENABLE_COMMAND_BOT_STATS': {'desc': 'Habilitar comando bot_stats', 'required': False},
-
-            # Sección: Mensajes
-            'WELCOME_REACTION_ENABLED': {'desc': 'Reaccionar a mensajes de bienvenida', 'required': False},
-            'WELCOME_MESSAGE_TEXT': {'desc': 'Texto de mensaje de bienvenida', 'required': False},
-            'SUCCESS_VERIFICATION_MESSAGE': {'desc': 'Mensaje de verificación exitosa', 'required': False},
-            'ERROR_VERIFICATION_MESSAGE': {'desc': 'Mensaje de error en verificación', 'required': False},
-            'OAUTH_ERROR_MESSAGE': {'desc': 'Mensaje de error OAuth', 'required': False},
-            'ALREADY_VERIFIED_MESSAGE': {'desc': 'Mensaje para usuarios ya verificados', 'required': False},
-            'VERIFICATION_TIMEOUT_MESSAGE': {'desc': 'Mensaje de timeout en verificación', 'required': False},
-            'ROLE_ASSIGNMENT_SUCCESS_MESSAGE': {'desc': 'Mensaje de asignación de rol exitosa', 'required': False},
-            'ROLE_ASSIGNMENT_ERROR_MESSAGE': {'desc': 'Mensaje de error en asignación de rol', 'required': False},
-
-            # Sección: Verificación
-            'VERIFICATION_EMBED_TITLE': {'desc': 'Título del embed de verificación', 'required': False},
-            'VERIFICATION_EMBED_DESCRIPTION': {'desc': 'Descripción del embed de verificación', 'required': False},
-            'VERIFICATION_BUTTON_LABEL': {'desc': 'Texto del botón de verificación', 'required': False},
-        }
-        
-        with sqlite3.connect(self.db_path) as conn:
-            for key, info in default_configs.items():
-                # Solo insertar si no existe
-                cursor = conn.execute("SELECT key FROM config WHERE key = ?", (key,))
-                if not cursor.fetchone():
-                    conn.execute("""
-                        INSERT INTO config (key, value, description, required)
-                        VALUES (?, ?, ?, ?)
-                    """, (key, '', info['desc'], info['required']))
-            conn.commit()
-    
-    def _emit_config_event(self, key: str, new_value: str, old_value: str):
-        """Emitir evento cuando cambia una configuración"""
-        try:
-            # Usar sistema de eventos local
-            from .event_system import event_system, Events
-            
-            event_system.emit(Events.CONFIG_UPDATED, {
-                'key': key,
-                'old_value': old_value,
-                'new_value': new_value
-            })
-            
-            # Usar sistema de señales para comunicación entre procesos
-            from .signal_system import signal_system, Signals
-            
-            signal_system.emit_signal(Signals.CONFIG_UPDATED, {
-                'key': key,
-                'old_value': old_value,
-                'new_value': new_value
-            })
-            
-            # Señales específicas para configuraciones críticas
-            if key == 'DISCORD_TOKEN':
-                signal_system.emit_signal(Signals.DISCORD_TOKEN_CHANGED, {
-                    'old_token': old_value,
-                    'new_token': new_value
-                })
-            elif key.startswith('ROLE_'):
-                signal_system.emit_signal(Signals.ROLE_CONFIG_CHANGED, {
-                    'role_key': key,
-                    'old_value': old_value,
-                    'new_value': new_value
-                })
-            
-            print(f"🔄 Evento y señal emitidos para configuración: {key}")
+        """Inicializar configuraciones por defecto (una fila por clave del esquema)"""
+        with self.lock:
+            inserted = {}
+            with sqlite3.connect(self.db_path) as conn:
+                for key, field in CONFIG_SCHEMA.items():
+                    # Solo insertar si no existe
+                    cursor = conn.execute("SELECT key FROM config WHERE key = ?", (key,))
+                    if not cursor.fetchone():
+                        # Los interruptores de comandos se guardan con su valor por defecto
+                        value = self._snapshot.stored.get(key, '')
+                        conn.execute(f"""
+                            INSERT INTO config (key, value, description, required, updated_at)
+                            VALUES (?, ?, ?, ?, {SQL_NOW})
+                        """, (key, value, field['description'], field['required']))
+                        inserted[key] = value
+                conn.commit()
             
-        except Exception as e:
-            print(f"⚠️ Error emitiendo evento para {key}: {e}")
+            # Reflejar las filas nuevas en el snapshot para que refresh no las tome por cambios externos
+            if any(self._snapshot.stored.get(key) != value for key, value in inserted.items()):
+                stored = dict(self._snapshot.stored)
+                stored.update(inserted)
+                self._publish(stored)
     
-    def _emit_multiple_config_events(self, changed_configs: Dict[str, Dict]):
-        """Emitir eventos para múltiples configuraciones que cambiaron"""
+    def _publish_changes(self, changed_configs: Dict[str, Dict]):
+        """
+        Publicar en el bus un mensaje por clave cambiada (config.<categoría>.<clave>)
+        y el aviso de reinicio si cambió alguna clave crítica.
+        Se entregan una sola vez: en proceso a los suscriptores locales y por el registro
+        de señales solo si hay consumidores remotos interesados.
+        """
         try:
-            # Usar sistema de eventos local
-            from .event_system import event_system, Events
-            
-            event_system.emit(Events.CONFIG_UPDATED, {
-                'multiple': True,
-                'changes': changed_configs
-            })
+            from .topic_bus import bus, Topics
             
-            # Usar sistema de señales para comunicación entre procesos
-            from .signal_system import signal_system, Signals
-            
-            signal_system.emit_signal(Signals.CONFIG_UPDATED, {
-                'multiple': True,
-                'changes': changed_configs
-            })
+            messages = [
+                (Topics.config_key(key), {
+                    'key': key,
+                    'old_value': change['old'],
+                    'new_value': change['new']
+                })
+                for key, change in changed_configs.items()
+            ]
             
             # Verificar si hay cambios críticos que requieren reinicio
             critical_keys = ['DISCORD_TOKEN', 'GENIUS_CLIENT_ID', 'GENIUS_CLIENT_SECRET']
             if any(key in changed_configs for key in critical_keys):
-                signal_system.emit_signal(Signals.BOT_RESTART_REQUIRED, {
+                messages.append((Topics.RESTART_REQUIRED, {
                     'reason': 'critical_config_changed',
                     'changed_keys': [k for k in changed_configs.keys() if k in critical_keys]
-                })
+                }))
             
-            # Señales específicas para roles
-            role_changes = {k: v for k, v in changed_configs.items() if k.startswith('ROLE_')}
-            if role_changes:
-                signal_system.emit_signal(Signals.ROLE_CONFIG_CHANGED, {
-                    'multiple': True,
-                    'role_changes': role_changes
-                })
+            bus.publish_many(messages)
             
-            print(f"🔄 Eventos y señales emitidos para {len(changed_configs)} configuraciones")
+            print(f"🔄 Cambios de configuración publicados: {', '.join(changed_configs)}")
             
         except Exception as e:
-            print(f"⚠️ Error emitiendo eventos múltiples: {e}")
+            print(f"⚠️ Error publicando cambios de configuración: {e}")
+
+    # ==================== ACCESORES TIPADOS ====================
+    # Se definen al final de la clase porque sus nombres ocultan a bool/int/str
+    # dentro del cuerpo de la clase.
+    
+    def value(self, key: str) -> Any:
+        """Valor de una clave parseado según el esquema, cacheado por versión de configuración"""
+        snapshot = self._snapshot
+        try:
+            return snapshot.typed[key]
+        except KeyError:
+            parsed = parse_value(key, snapshot.values.get(key))
+            snapshot.typed[key] = parsed
+            return parsed
+    
+    def role_ids(self) -> Dict[str, int]:
+        """Rol de Genius -> ID del rol de Discord configurado (0 si no está configurado)"""
+        snapshot = self._snapshot
+        role_ids = snapshot.role_ids
+        if role_ids is None:
+            role_ids = {
+                name: parse_value(key, snapshot.values.get(key)) or 0
+                for name, key in ROLE_CONFIG_KEYS.items()
+            }
+            snapshot.role_ids = role_ids
+        return role_ids
+    
+    def bool(self, key: str) -> bool:
+        """Valor booleano de una clave checkbox del esquema"""
+        return self.value(key) is True
+    
+    def int(self, key: str) -> int:
+        """Valor entero de una clave numérica del esquema (0 si no es válida)"""
+        return self.value(key) or 0
+    
+    def str(self, key: str) -> str:
+        """Valor de texto de una clave (el default del esquema si está vacía)"""
+        return self.value(key) or ""
 
 # Instancia global
 config = DynamicConfig()
\ No newline at end of file
@@ -1,9 +1,10 @@
 """
-Sistema de eventos para sincronización en tiempo real
-Permite notificar al bot cuando la configuración cambia desde el panel
+Piezas internas de entrega del bus de topics
+Colas acotadas por suscriptor async (AsyncDispatcher) y agrupación de ráfagas (Coalescer)
 """
 
 import asyncio
+import os
 import threading
 import time
 from typing import Dict, List, Callable, Any
@@ -11,75 +12,235 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-class EventSystem:
-    """Sistema de eventos para comunicación entre componentes"""
+# Ventana (segundos) en la que se agrupan los cambios de configuración de una misma ráfaga
+CONFIG_COALESCE_WINDOW = float(os.environ.get("CONFIG_COALESCE_WINDOW", 0.2))
+
+# Cola por suscriptor async: tamaño máximo y política cuando está llena
+DISPATCH_QUEUE_SIZE = int(os.environ.get("DISPATCH_QUEUE_SIZE", 100))
+# Espera máxima (segundos) de un emisor con política "block" antes de descartar
+DISPATCH_BLOCK_TIMEOUT = float(os.environ.get("DISPATCH_BLOCK_TIMEOUT", 5.0))
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DROP_NEWEST = "drop_newest"
+POLICY_BLOCK = "block"
+
+def merge_change_sets(payloads: List[Any]) -> Dict[str, Any]:
+    """
+    Fusiona varios payloads de cambios de configuración en un único change-set.
+    Acepta la forma simple (key/role_key con old_value/new_value) y la múltiple
+    (changes/role_changes); por clave conserva el primer valor antiguo y el último nuevo.
+    """
+    changes: Dict[str, Dict[str, Any]] = {}
+    for data in payloads:
+        if not isinstance(data, dict):
+            continue
+        if 'changes' in data or 'role_changes' in data:
+            items = list((data.get('changes') or {}).items()) + list((data.get('role_changes') or {}).items())
+        elif 'key' in data or 'role_key' in data:
+            items = [(data.get('key') or data.get('role_key'), {'old': data.get('old_value'), 'new': data.get('new_value')})]
+        else:
+            items = []
+        for key, change in items:
+            if key in changes:
+                changes[key]['new'] = change.get('new')
+            else:
+                changes[key] = {'old': change.get('old'), 'new': change.get('new')}
+    return {'multiple': True, 'changes': changes, 'coalesced': len(payloads)}
+
+class Coalescer:
+    """
+    Agrupa los payloads de un topic recibidos dentro de una ventana y los entrega de una vez.
+    La ventana empieza con el primer payload, así que la latencia añadida está acotada.
+    """
+    
+    def __init__(self, window: float, merge: Callable[[List[Any]], Any], deliver: Callable[[Any], None]):
+        self.window = window
+        self.merge = merge
+        self.deliver = deliver
+        self.pending: List[Any] = []
+        self.timer = None
+        self.lock = threading.Lock()
+    
+    def add(self, data: Any):
+        """Añadir un payload a la ventana actual (abriéndola si no hay ninguna)"""
+        with self.lock:
+            self.pending.append(data)
+            if self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+    
+    def flush(self):
+        """Entregar lo acumulado; un único payload se entrega tal cual"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if batch:
+            self.deliver(batch[0] if len(batch) == 1 else self.merge(batch))
+
+class Subscription:
+    """Suscriptor async con su cola acotada y sus métricas de entrega"""
+    
+    def __init__(self, topic: str, callback: Callable, maxsize: int, policy: str):
+        self.topic = topic
+        self.callback = callback
+        self.maxsize = maxsize
+        self.policy = policy
+        # Se crean en el hilo del loop al adjuntar el dispatcher
+        self.queue = None
+        self.task = None
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_handle = 0.0
+    
+    @property
+    def name(self) -> str:
+        return f"{self.topic}:{getattr(self.callback, '__name__', repr(self.callback))}"
+    
+    def metrics(self) -> Dict[str, Any]:
+        delivered = self.delivered or 1
+        return {
+            "policy": self.policy,
+            "depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "avg_wait_ms": round(self.total_wait / delivered * 1000, 3),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_handle_ms": round(self.total_handle / delivered * 1000, 3),
+        }
+
+class AsyncDispatcher:
+    """
+    Entrega callbacks async en el loop registrado al arrancar.
+    Cada suscriptor tiene una cola acotada y una tarea que la consume en orden, así que un
+    handler lento solo retrasa su propia cola y nunca acumula futures sin límite.
+    Los emisores pueden estar en cualquier hilo; la política "block" solo bloquea a emisores
+    fuera del loop (dentro del loop se comporta como "drop_oldest" para no detenerlo).
+    """
     
     def __init__(self):
-        self.listeners: Dict[str, List[Callable]] = {}
-        self.async_listeners: Dict[str, List[Callable]] = {}
+        self.loop = None
+        self.subscriptions: List[Subscription] = []
         self.lock = threading.Lock()
-        self._loop = None
     
-    def set_event_loop(self, loop):
-        """Establecer el loop de eventos para callbacks async"""
-        self._loop = loop
+    def attach(self, loop):
+        """Registrar el loop en el que se ejecutarán los callbacks async"""
+        with self.lock:
+            self.loop = loop
+            subscriptions = list(self.subscriptions)
+        for sub in subscriptions:
+            loop.call_soon_threadsafe(self._start, sub)
     
-    def subscribe(self, event_name: str, callback: Callable):
-        """Suscribirse a un evento (callback síncrono)"""
+    def register(self, topic: str, callback: Callable, maxsize: int = DISPATCH_QUEUE_SIZE,
+                 policy: str = POLICY_DROP_OLDEST) -> Subscription:
+        """Crear la cola de un suscriptor (su tarea arranca en cuanto haya loop)"""
+        sub = Subscription(topic, callback, maxsize, policy)
         with self.lock:
-            if event_name not in self.listeners:
-                self.listeners[event_name] = []
-            self.listeners[event_name].append(callback)
-            logger.debug(f"Suscrito a evento '{event_name}' (sync)")
+            self.subscriptions.append(sub)
+            loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._start, sub)
+        return sub
     
-    def subscribe_async(self, event_name: str, callback: Callable):
-        """Suscribirse a un evento (callback asíncrono)"""
+    def unregister(self, sub: Subscription):
+        """Eliminar un suscriptor y detener su tarea"""
         with self.lock:
-            if event_name not in self.async_listeners:
-                self.async_listeners[event_name] = []
-            self.async_listeners[event_name].append(callback)
-            logger.debug(f"Suscrito a evento '{event_name}' (async)")
-    
-    def emit(self, event_name: str, data: Any = None):
-        """Emitir un evento"""
-        logger.info(f"Emitiendo evento: {event_name}")
+            if sub in self.subscriptions:
+                self.subscriptions.remove(sub)
+            loop = self.loop
+        if loop is not None and sub.task is not None:
+            loop.call_soon_threadsafe(sub.task.cancel)
+    
+    def submit(self, sub: Subscription, data: Any):
+        """Encolar un payload para un suscriptor (seguro desde cualquier hilo)"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            self._record_drop(sub, "sin loop registrado")
+            return
+        item = (data, time.perf_counter())
         
-        # Ejecutar callbacks síncronos
-        with self.lock:
-            sync_callbacks = self.listeners.get(event_name, [])
+        try:
+            in_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            in_loop = False
         
-        for callback in sync_callbacks:
+        if in_loop:
+            self._enqueue(sub, item)
+        elif sub.policy == POLICY_BLOCK:
+            # Contrapresión: el hilo emisor espera a que haya hueco en la cola
+            future = asyncio.run_coroutine_threadsafe(self._put(sub, item), loop)
+            try:
+                future.result(timeout=DISPATCH_BLOCK_TIMEOUT)
+            except Exception:
+                future.cancel()
+                self._record_drop(sub, "tiempo de espera agotado")
+        else:
+            loop.call_soon_threadsafe(self._enqueue, sub, item)
+    
+    def _start(self, sub: Subscription):
+        """Crear cola y tarea del suscriptor (en el hilo del loop)"""
+        if sub.task is None:
+            sub.queue = asyncio.Queue(maxsize=sub.maxsize)
+            sub.task = self.loop.create_task(self._worker(sub))
+    
+    def _enqueue(self, sub: Subscription, item):
+        """Encolar aplicando la política de desbordamiento (en el hilo del loop)"""
+        self._start(sub)
+        if sub.queue.full():
+            if sub.policy == POLICY_DROP_NEWEST:
+                self._record_drop(sub, "cola llena")
+                return
+            sub.queue.get_nowait()
+            self._record_drop(sub, "cola llena")
+        sub.queue.put_nowait(item)
+        sub.max_depth = max(sub.max_depth, sub.queue.qsize())
+    
+    async def _put(self, sub: Subscription, item):
+        """Encolar esperando hueco (política block)"""
+        self._start(sub)
+        await sub.queue.put(item)
+        sub.max_depth = max(sub.max_depth, sub.queue.qsize())
+    
+    def _record_drop(self, sub: Subscription, reason: str):
+        sub.dropped += 1
+        # Avisar la primera vez y luego cada 100 descartes para no inundar el log
+        if sub.dropped == 1 or sub.dropped % 100 == 0:
+            logger.warning(f"⚠️ Descartados {sub.dropped} payloads para {sub.name} ({reason})")
+    
+    async def _worker(self, sub: Subscription):
+        """Consumir la cola de un suscriptor en orden"""
+        while True:
+            data, enqueued_at = await sub.queue.get()
+            started = time.perf_counter()
             try:
-                callback(data)
+                result = sub.callback(data)
+                if asyncio.iscoroutine(result):
+                    await result
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Error en callback síncrono para {event_name}: {e}")
-        
-        # Ejecutar callbacks asíncronos
-        with self.lock:
-            async_callbacks = self.async_listeners.get(event_name, [])
-        
-        if async_callbacks and self._loop:
-            for callback in async_callbacks:
-                try:
-                    # Crear tarea en el loop de eventos
-                    asyncio.run_coroutine_threadsafe(callback(data), self._loop)
-                except Exception as e:
-                    logger.error(f"Error en callback asíncrono para {event_name}: {e}")
-    
-    def unsubscribe(self, event_name: str, callback: Callable):
-        """Desuscribirse de un evento"""
+                sub.errors += 1
+                logger.error(f"Error en callback asíncrono para {sub.topic}: {e}")
+            finished = time.perf_counter()
+            wait = started - enqueued_at
+            sub.delivered += 1
+            sub.total_wait += wait
+            sub.max_wait = max(sub.max_wait, wait)
+            sub.total_handle += finished - started
+    
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Profundidad de cola, descartes y latencias por suscriptor"""
         with self.lock:
-            if event_name in self.listeners and callback in self.listeners[event_name]:
-                self.listeners[event_name].remove(callback)
-            if event_name in self.async_listeners and callback in self.async_listeners[event_name]:
-                self.async_listeners[event_name].remove(callback)
-
-# Instancia global del sistema de eventos
-event_system = EventSystem()
+            subscriptions = list(self.subscriptions)
+        return {sub.name: sub.metrics() for sub in subscriptions}
 
-# Eventos predefinidos
-class Events:
-    CONFIG_UPDATED = "config_updated"
-    BOT_RESTART_REQUIRED = "bot_restart_required"
-    ROLE_CONFIG_CHANGED = "role_config_changed"
-    DISCORD_TOKEN_CHANGED = "discord_token_changed"
\ No newline at end of file
+# Dispatcher compartido por todos los suscriptores del bus
+dispatcher = AsyncDispatcher()
@@ -0,0 +1,119 @@
+"""
+Tokens de estado OAuth firmados (HMAC) para el flujo de verificación
+Permiten validar el callback sin consultar la tabla pending_verifications
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Misma caducidad que las verificaciones pendientes en base de datos
+STATE_TTL_SECONDS = int(os.environ.get("PENDING_TTL_SECONDS", 600))
+# Máximo de nonces recordados para protección contra reutilización
+REPLAY_CACHE_SIZE = 10000
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+class StateSigner:
+    """Emite y verifica tokens de estado firmados de un solo uso"""
+
+    def __init__(self, ttl: int = STATE_TTL_SECONDS, replay_cache_size: int = REPLAY_CACHE_SIZE):
+        self.ttl = ttl
+        self.replay_cache_size = replay_cache_size
+        # nonce -> expiración; ordenado por inserción para podar los más antiguos
+        self._used_nonces: "OrderedDict[str, float]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _get_secret(self) -> Optional[bytes]:
+        """Secreto de firma: OAUTH_STATE_SECRET o, en su defecto, GENIUS_CLIENT_SECRET"""
+        from src.utils.dynamic_config import config
+        secret = config.get('OAUTH_STATE_SECRET') or config.get('GENIUS_CLIENT_SECRET')
+        return secret.encode('utf-8') if secret else None
+
+    def is_enabled(self) -> bool:
+        """Indica si el modo de estado firmado está activo y hay secreto disponible"""
+        from src.utils.dynamic_config import config
+        return config.value('OAUTH_STATE_MODE') == 'signed' and self._get_secret() is not None
+
+    @staticmethod
+    def looks_signed(state: str) -> bool:
+        """Los estados firmados tienen forma payload.firma; los UUID de la tabla no"""
+        return bool(state) and state.count('.') == 1
+
+    def issue(self, discord_id: int, guild_id: Optional[int] = None) -> str:
+        """Genera un token firmado con discord_id, guild y expiración"""
+        secret = self._get_secret()
+        if secret is None:
+            raise ValueError("No hay secreto configurado para firmar estados OAuth")
+        expires_at = int(time.time()) + self.ttl
+        nonce = secrets.token_hex(8)
+        payload = f"{discord_id}:{guild_id or 0}:{expires_at}:{nonce}".encode('ascii')
+        signature = hmac.new(secret, payload, hashlib.sha256).digest()
+        return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+    def verify(self, state: str) -> Optional[Tuple[int, Optional[int]]]:
+        """
+        Verifica un token firmado y lo marca como usado.
+        Devuelve (discord_id, guild_id) o None si es inválido, caducado o reutilizado.
+        """
+        secret = self._get_secret()
+        if secret is None or not self.looks_signed(state):
+            return None
+        try:
+            payload_b64, signature_b64 = state.split('.')
+            payload = _b64decode(payload_b64)
+            signature = _b64decode(signature_b64)
+        except Exception:
+            return None
+
+        expected = hmac.new(secret, payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(signature, expected):
+            return None
+
+        try:
+            discord_id, guild_id, expires_at, nonce = payload.decode('ascii').split(':')
+            discord_id, guild_id, expires_at = int(discord_id), int(guild_id), int(expires_at)
+        except ValueError:
+            return None
+
+        now = time.time()
+        if expires_at <= now:
+            return None
+
+        with self.lock:
+            # Podar nonces caducados (los más antiguos están al principio)
+            while self._used_nonces:
+                oldest_nonce, oldest_expiry = next(iter(self._used_nonces.items()))
+                if oldest_expiry > now and len(self._used_nonces) < self.replay_cache_size:
+                    break
+                self._used_nonces.popitem(last=False)
+            if nonce in self._used_nonces:
+                return None
+            self._used_nonces[nonce] = expires_at
+
+        return discord_id, (guild_id or None)
+
+async def resolve_state(state: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Resuelve un estado OAuth a (discord_id, guild_id).
+    Los tokens firmados se validan en memoria; el resto se busca en la base de datos.
+    """
+    if StateSigner.looks_signed(state):
+        result = state_signer.verify(state)
+        return result if result else (None, None)
+
+    from src.database.models import db
+    return await db.get_pending_verification(state), None
+
+# Instancia global
+state_signer = StateSigner()
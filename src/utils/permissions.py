@@ -0,0 +1,115 @@
+"""
+Servicio de permisos de staff del bot
+Resuelve los roles de staff a un frozenset de IDs por servidor y comprueba los permisos
+con una intersección de conjuntos sobre los IDs de roles del miembro
+"""
+
+import threading
+from typing import Dict, FrozenSet, Optional, Tuple
+
+# Nombres de roles de staff usados cuando STAFF_ROLE_IDS no está configurado
+STAFF_ROLE_NAMES = ("Staff", "Moderator", "Editor", "Moderador")  # Incluir variantes en español
+
+# Tamaño máximo de la memoización de comprobaciones
+MEMO_MAX_SIZE = 2048
+
+def parse_role_ids(raw: str) -> FrozenSet[int]:
+    """IDs de roles de un texto separado por comas (se ignoran las entradas no numéricas)"""
+    return frozenset(int(part) for part in raw.replace(' ', '').split(',') if part.isdigit())
+
+def member_role_ids(member):
+    """IDs de los roles de un miembro sin construir objetos Role"""
+    role_ids = getattr(member, '_roles', None)
+    if role_ids is None:
+        role_ids = [role.id for role in member.roles]
+    return role_ids
+
+class PermissionService:
+    """
+    Comprobaciones de staff indexadas por ID de rol.
+    Los roles de staff de cada servidor se resuelven una vez por versión de roles
+    (versión de configuración + contador de cambios de roles del servidor), y el resultado
+    de cada comprobación se memoriza mientras no cambien ni esa versión ni los roles del miembro.
+    """
+
+    def __init__(self):
+        # guild_id -> (versión de roles, IDs de roles de staff)
+        self._staff_ids: Dict[int, Tuple[Tuple[int, int], FrozenSet[int]]] = {}
+        # guild_id -> contador de cambios de roles (creación, borrado, renombrado)
+        self._guild_versions: Dict[int, int] = {}
+        # (guild_id, member_id, versión de roles) -> (lista de roles del miembro, resultado)
+        self._memo: Dict[Tuple[int, int, Tuple[int, int]], Tuple[object, bool]] = {}
+        self.lock = threading.Lock()
+
+    def roles_version(self, guild_id: int) -> Tuple[int, int]:
+        """Versión de los roles de staff de un servidor"""
+        from src.utils.dynamic_config import config
+        return (config.snapshot().version, self._guild_versions.get(guild_id, 0))
+
+    def staff_role_ids(self, guild) -> FrozenSet[int]:
+        """IDs de los roles de staff de un servidor para la configuración actual"""
+        version = self.roles_version(guild.id)
+        entry = self._staff_ids.get(guild.id)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        from src.utils.dynamic_config import config
+        staff_ids = parse_role_ids(config.str('STAFF_ROLE_IDS'))
+        if not staff_ids:
+            staff_ids = frozenset(role.id for role in guild.roles if role.name in STAFF_ROLE_NAMES)
+        with self.lock:
+            self._staff_ids[guild.id] = (version, staff_ids)
+        return staff_ids
+
+    def is_staff(self, member) -> bool:
+        """Verifica si un miembro tiene permisos de staff (administrador o roles de staff)"""
+        guild = getattr(member, 'guild', None)
+        if guild is None:
+            return False
+        if member.guild_permissions.administrator:
+            return True
+
+        role_ids = member_role_ids(member)
+        key = (guild.id, member.id, self.roles_version(guild.id))
+        cached = self._memo.get(key)
+        # discord.py sustituye la lista de roles del miembro cuando cambian sus roles
+        if cached is not None and cached[0] is role_ids:
+            return cached[1]
+
+        result = not self.staff_role_ids(guild).isdisjoint(role_ids)
+        with self.lock:
+            if len(self._memo) >= MEMO_MAX_SIZE:
+                self._memo.clear()
+            self._memo[key] = (role_ids, result)
+        return result
+
+    def can_manage_messages(self, member) -> bool:
+        """Verifica si un miembro puede gestionar mensajes o es staff"""
+        if getattr(member, 'guild', None) is None:
+            return False
+        return member.guild_permissions.manage_messages or self.is_staff(member)
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Marcar como cambiados los roles de un servidor (o de todos)"""
+        with self.lock:
+            if guild_id is None:
+                self._staff_ids.clear()
+                self._memo.clear()
+            else:
+                self._guild_versions[guild_id] = self._guild_versions.get(guild_id, 0) + 1
+                self._staff_ids.pop(guild_id, None)
+
+# Instancia global
+permissions = PermissionService()
+
+def has_staff_permissions(user) -> bool:
+    """
+    Verifica si un usuario tiene permisos de staff (administrador o roles de staff)
+    """
+    return permissions.is_staff(user)
+
+def has_manage_messages_or_staff(user) -> bool:
+    """
+    Verifica si un usuario tiene permisos para gestionar mensajes o es staff
+    """
+    return permissions.can_manage_messages(user)
@@ -0,0 +1,87 @@
+"""
+Caché de roles de Discord resueltos a partir de la configuración de roles de Genius
+Evita reconstruir la lista de IDs y llamar a guild.get_role en cada asignación o desverificación
+"""
+
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from .role_mapping import mask_to_roles
+
+class ResolvedRoles:
+    """Roles de Genius de un servidor resueltos para una versión concreta de la configuración"""
+    __slots__ = ('guild_id', 'version', 'genius_role_ids', 'managed_role_ids',
+                 'role_ids_by_name', 'roles_by_name', 'verified_role', '_mask_role_ids')
+
+    def __init__(self, guild, version: int, role_ids_by_name: Dict[str, int], verified_role_id: int):
+        self.guild_id = guild.id
+        self.version = version
+        # Nombre de Genius -> ID configurado (0 si no está configurado)
+        self.role_ids_by_name = role_ids_by_name
+        # IDs configurados de roles de Genius (sin el rol de verificado)
+        self.genius_role_ids = frozenset(role_id for role_id in role_ids_by_name.values() if role_id)
+        # Todos los roles que gestiona el bot: los de Genius y el de verificado
+        self.managed_role_ids = self.genius_role_ids | ({verified_role_id} if verified_role_id else frozenset())
+        # Nombre de Genius -> discord.Role existente en el servidor
+        self.roles_by_name = {}
+        for name, role_id in role_ids_by_name.items():
+            role = guild.get_role(role_id) if role_id else None
+            if role is not None:
+                self.roles_by_name[name] = role
+        self.verified_role = guild.get_role(verified_role_id) if verified_role_id else None
+        # Máscara de roles de Genius -> IDs de Discord que le corresponden (pocas máscaras distintas)
+        self._mask_role_ids: Dict[int, FrozenSet[int]] = {}
+
+    def roles_for(self, genius_roles: Iterable[str], include_verified: bool = True) -> List:
+        """Roles de Discord a asignar para una lista de roles de Genius"""
+        roles = [self.roles_by_name[name] for name in genius_roles if name in self.roles_by_name]
+        if include_verified and self.verified_role is not None:
+            roles.append(self.verified_role)
+        return roles
+
+    def role_ids_for_mask(self, mask: int) -> FrozenSet[int]:
+        """IDs de los roles existentes que debe tener un verificado con esa máscara (incluye el de verificado)"""
+        role_ids = self._mask_role_ids.get(mask)
+        if role_ids is None:
+            role_ids = frozenset(role.id for role in self.roles_for(mask_to_roles(mask)))
+            self._mask_role_ids[mask] = role_ids
+        return role_ids
+
+    def managed_roles_of(self, member) -> List:
+        """Roles gestionados por el bot que tiene un miembro"""
+        return [role for role in member.roles if role.id in self.managed_role_ids]
+
+class RoleCache:
+    """
+    Caché de ResolvedRoles por servidor. Cada entrada recuerda la versión de configuración
+    con la que se construyó: cualquier cambio de configuración la invalida sin bookkeeping,
+    y una entrada por servidor mantiene la caché acotada.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, ResolvedRoles] = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, guild) -> ResolvedRoles:
+        """Roles resueltos de un servidor para la configuración actual"""
+        from src.utils.dynamic_config import config
+        snapshot = config.snapshot()
+        entry = self._entries.get(guild.id)
+        if entry is not None and entry.version == snapshot.version:
+            return entry
+
+        entry = ResolvedRoles(guild, snapshot.version, config.role_ids(), config.int('VERIFIED_ROLE_ID'))
+        with self.lock:
+            self._entries[guild.id] = entry
+        return entry
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Descartar las entradas de un servidor (o de todos)"""
+        with self.lock:
+            if guild_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(guild_id, None)
+
+# Instancia global
+role_cache = RoleCache()
@@ -1,7 +1,38 @@
 """
 Utilidades para mapear roles de Genius a roles internos del bot
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable
+
+
+# Roles canónicos en orden fijo: la posición es el bit en verifications.genius_roles_mask.
+# Solo se pueden añadir roles al final; reordenar invalidaría las máscaras guardadas.
+CANONICAL_ROLES: List[str] = [
+    "Contributor",
+    "Editor",
+    "Moderator",
+    "Staff",
+    "Verified Artist",
+    "Transcriber",
+    "Mediator",
+]
+
+ROLE_BITS: Dict[str, int] = {name: 1 << index for index, name in enumerate(CANONICAL_ROLES)}
+
+# Rol asumido cuando no hay ninguno guardado (igual que al mostrar la lista)
+DEFAULT_ROLE = "Contributor"
+
+
+def roles_to_mask(roles: Iterable[str]) -> int:
+    """Convierte una lista de nombres de roles canónicos en su máscara de bits"""
+    mask = 0
+    for name in roles:
+        mask |= ROLE_BITS.get(name.strip(), 0)
+    return mask or ROLE_BITS[DEFAULT_ROLE]
+
+
+def mask_to_roles(mask: int) -> List[str]:
+    """Convierte una máscara de bits en la lista de nombres de roles canónicos"""
+    return [name for name in CANONICAL_ROLES if mask & ROLE_BITS[name]] or [DEFAULT_ROLE]
 
 
 def map_genius_roles(user_info: Dict[str, Any]) -> List[str]:
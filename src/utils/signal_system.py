@@ -4,19 +4,32 @@ Permite notificar al bot cuando la configuración cambia desde el panel
 """
 
 import os
+import json
 import time
+import secrets
+import socket
 import sqlite3
 import threading
-import asyncio
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Con notificación por socket, el polling solo es una red de seguridad (p. ej. datagramas perdidos)
+SIGNAL_FALLBACK_INTERVAL = float(os.environ.get("SIGNAL_FALLBACK_INTERVAL", 30.0))
+# Retención del registro de señales: anillo acotado por número de filas y por antigüedad
+SIGNAL_MAX_ROWS = int(os.environ.get("SIGNAL_MAX_ROWS", 10000))
+SIGNAL_MAX_AGE_HOURS = float(os.environ.get("SIGNAL_MAX_AGE_HOURS", 24))
+# Cada cuánto (segundos) compacta el registro el hilo de escucha
+SIGNAL_COMPACT_INTERVAL = float(os.environ.get("SIGNAL_COMPACT_INTERVAL", 3600))
+
+# Identificador de este proceso: distingue las señales propias de las de otros procesos
+PROCESS_ORIGIN = f"{os.getpid()}-{secrets.token_hex(4)}"
+
 class SignalSystem:
-    """Sistema de señales para comunicación entre procesos usando SQLite"""
+    """Transporte durable del bus de topics entre procesos usando SQLite (entrega vía catch_all)"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, consumer: str = None):
         # Usar almacenamiento persistente en Render si está disponible
         if db_path is None:
             data_dir = os.environ.get("RENDER_DATA_DIR", "/opt/render/project/src/data")
@@ -32,11 +45,30 @@ class SignalSystem:
         if db_dir and not os.path.exists(db_dir):
             os.makedirs(db_dir, exist_ok=True)
         
-        self.listeners = {}
+        # Socket Unix (datagramas) con el que el emisor despierta al proceso que escucha
+        self.socket_path = os.environ.get("SIGNAL_SOCKET_PATH") or f"{self.db_path}.sock"
+        
+        # Reciben (signal_type, data) de toda señal emitida por otro proceso
+        self.catch_all: List[Callable[[str, Any], None]] = []
+        self.origin = PROCESS_ORIGIN
         self.lock = threading.Lock()
         self.running = False
         self.poll_thread = None
-        self.last_check = time.time()
+        self._notify_sock = None
+        self._listen_sock = None
+        # Conexión persistente del hilo de escucha (solo la usa ese hilo)
+        self._poll_conn = None
+        # Cada consumidor guarda su posición (id) en signal_consumers y la retoma al reiniciar
+        self.consumer = consumer or os.environ.get("SIGNAL_CONSUMER", "bot")
+        self.last_id = None
+        self.last_compaction = 0.0
+        self.metrics = {
+            "delivered": 0,
+            "batches": 0,
+            "compactions": 0,
+            "deleted_by_age": 0,
+            "deleted_by_count": 0,
+        }
         self._init_database()
     
     def _init_database(self):
@@ -51,39 +83,217 @@ class SignalSystem:
                     processed BOOLEAN DEFAULT 0
                 )
             """)
+            # La retención por antigüedad borra por rango de timestamp
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_timestamp ON signals(timestamp)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS signal_consumers (
+                    consumer TEXT PRIMARY KEY,
+                    last_id INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._migrate_columns(conn)
             conn.commit()
     
+    def _migrate_columns(self, conn: sqlite3.Connection):
+        """Añadir origen de cada señal y patrones/origen de cada consumidor a bases existentes"""
+        migrations = {
+            "signals": [("origin", "TEXT")],
+            "signal_consumers": [("patterns", "TEXT"), ("origin", "TEXT")],
+        }
+        for table, columns in migrations.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    
+    def _get_conn(self) -> sqlite3.Connection:
+        """Conexión persistente del hilo de escucha: ni los avisos ni el respaldo abren ficheros nuevos"""
+        if self._poll_conn is None:
+            self._poll_conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._poll_conn
+    
+    def _load_cursor(self):
+        """
+        Recuperar la posición persistida del consumidor.
+        Un consumidor nuevo empieza en la última señal existente (no se reproduce el histórico).
+        """
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT last_id FROM signal_consumers WHERE consumer = ?", (self.consumer,)
+        ).fetchone()
+        if row is not None:
+            self.last_id = row[0]
+            return
+        self.last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM signals").fetchone()[0]
+        conn.execute(
+            "INSERT OR IGNORE INTO signal_consumers (consumer, last_id, updated_at, origin) VALUES (?, ?, ?, ?)",
+            (self.consumer, self.last_id, time.time(), self.origin)
+        )
+        conn.commit()
+    
+    def register_patterns(self, patterns: List[str]):
+        """
+        Publicar qué topics le interesan a este consumidor. Los emisores de otros procesos
+        solo persisten señales si algún consumidor remoto tiene un patrón que coincida.
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT INTO signal_consumers (consumer, last_id, updated_at, patterns, origin)
+                    VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM signals), ?, ?, ?)
+                    ON CONFLICT(consumer) DO UPDATE SET
+                        patterns = excluded.patterns,
+                        origin = excluded.origin,
+                        updated_at = excluded.updated_at
+                """, (self.consumer, time.time(), json.dumps(patterns), self.origin))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"❌ Error registrando patrones del consumidor {self.consumer}: {e}")
+    
+    def get_remote_consumers(self) -> List[Optional[List[str]]]:
+        """Patrones de los consumidores de otros procesos (None = sin patrones, recibe todo)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute("SELECT origin, patterns FROM signal_consumers").fetchall()
+        except Exception as e:
+            logger.error(f"❌ Error leyendo consumidores de señales: {e}")
+            return []
+        return [
+            json.loads(patterns) if patterns else None
+            for origin, patterns in rows
+            if origin != self.origin
+        ]
+    
     def emit_signal(self, signal_type: str, data: Any = None):
         """Emitir una señal"""
+        self.emit_signals([(signal_type, data)])
+    
+    def emit_signals(self, signals: List[Tuple[str, Any]]):
+        """Emitir varias señales en una sola transacción y con un único aviso"""
+        if not signals:
+            return
         try:
-            import json
-            data_json = json.dumps(data) if data else None
+            now = time.time()
+            rows = [
+                (signal_type, json.dumps(data) if data else None, now, self.origin)
+                for signal_type, data in signals
+            ]
             
             with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO signals (signal_type, data, timestamp)
-                    VALUES (?, ?, ?)
-                """, (signal_type, data_json, time.time()))
+                conn.executemany("""
+                    INSERT INTO signals (signal_type, data, timestamp, origin)
+                    VALUES (?, ?, ?, ?)
+                """, rows)
                 conn.commit()
             
-            logger.info(f"📡 Señal emitida: {signal_type}")
+            # Las filas ya son durables: avisar al proceso que escucha para que las lea ya
+            self._notify()
+            
+            logger.info(f"📡 Señales emitidas: {', '.join(signal_type for signal_type, _ in signals)}")
             
         except Exception as e:
-            logger.error(f"❌ Error emitiendo señal {signal_type}: {e}")
+            logger.error(f"❌ Error emitiendo señales {[signal_type for signal_type, _ in signals]}: {e}")
     
-    def subscribe(self, signal_type: str, callback: Callable):
-        """Suscribirse a un tipo de señal"""
-        with self.lock:
-            if signal_type not in self.listeners:
-                self.listeners[signal_type] = []
-            self.listeners[signal_type].append(callback)
-            logger.debug(f"Suscrito a señal: {signal_type}")
+    def _notify(self):
+        """Enviar un datagrama de aviso; si nadie escucha, el polling de respaldo recogerá la señal"""
+        if not hasattr(socket, "AF_UNIX"):
+            return
+        try:
+            with self.lock:
+                if self._notify_sock is None:
+                    self._notify_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                    self._notify_sock.setblocking(False)
+                self._notify_sock.sendto(b"1", self.socket_path)
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
+            # Sin oyente o cola llena: en ambos casos la señal se recogerá de la tabla
+            pass
+        except OSError as e:
+            logger.debug(f"No se pudo notificar la señal por socket: {e}")
+    
+    def _bind_listen_socket(self):
+        """Crear el socket de escucha; None si la plataforma no lo soporta o ya hay otro oyente"""
+        if not hasattr(socket, "AF_UNIX"):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            if os.path.exists(self.socket_path):
+                # Si el socket responde, otro proceso está escuchando: no robarle la ruta
+                try:
+                    sock.sendto(b"", self.socket_path)
+                    sock.close()
+                    logger.warning(f"⚠️ Ya hay un oyente de señales en {self.socket_path}, se usará polling")
+                    return None
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Socket huérfano de una ejecución anterior
+                    os.unlink(self.socket_path)
+            sock.bind(self.socket_path)
+            return sock
+        except OSError as e:
+            sock.close()
+            logger.warning(f"⚠️ No se pudo crear el socket de señales ({e}), se usará polling")
+            return None
+    
+    def start_listening(self, fallback_interval: float = SIGNAL_FALLBACK_INTERVAL, poll_interval: float = 2.0):
+        """
+        Iniciar la escucha de señales por socket Unix.
+        Cada emisión despierta al hilo al instante; cada fallback_interval segundos se revisa
+        igualmente la tabla por si se perdió algún aviso. Sin socket disponible se recurre a
+        start_polling(poll_interval).
+        """
+        if self.running:
+            return
+        
+        sock = self._bind_listen_socket()
+        if sock is None:
+            self.start_polling(interval=poll_interval)
+            return
+        
+        self._load_cursor()
+        self._listen_sock = sock
+        self.running = True
+        self.poll_thread = threading.Thread(
+            target=self._listen_signals,
+            args=(sock, fallback_interval),
+            daemon=True
+        )
+        self.poll_thread.start()
+        logger.info(f"🔔 Sistema de señales iniciado (socket {self.socket_path}, respaldo cada {fallback_interval}s)")
+    
+    def _listen_signals(self, sock: socket.socket, fallback_interval: float):
+        """Esperar avisos por socket en hilo separado y procesar las señales nuevas"""
+        # Recuperar lo emitido mientras este consumidor estaba parado
+        self._process_pending_signals()
+        while self.running:
+            try:
+                sock.settimeout(fallback_interval)
+                sock.recv(64)
+                # Vaciar avisos acumulados: una sola pasada procesa todas las filas nuevas.
+                # (Con timeout activo, recv esperaría el timeout completo aunque no haya datos)
+                sock.setblocking(False)
+                while True:
+                    try:
+                        sock.recv(64)
+                    except BlockingIOError:
+                        break
+            except socket.timeout:
+                pass
+            except OSError as e:
+                if not self.running:
+                    break
+                logger.error(f"❌ Error en el socket de señales: {e}")
+                time.sleep(fallback_interval)
+            
+            if self.running:
+                self._process_pending_signals()
+                self._maybe_compact()
     
     def start_polling(self, interval: float = 1.0):
         """Iniciar polling de señales"""
         if self.running:
             return
         
+        self._load_cursor()
         self.running = True
         self.poll_thread = threading.Thread(
             target=self._poll_signals,
@@ -94,10 +304,20 @@ class SignalSystem:
         logger.info(f"🔄 Sistema de señales iniciado (polling cada {interval}s)")
     
     def stop_polling(self):
-        """Detener polling de señales"""
+        """Detener polling o escucha de señales"""
         self.running = False
+        if self._listen_sock is not None:
+            # Despertar al hilo bloqueado en recv
+            self._notify()
         if self.poll_thread:
             self.poll_thread.join(timeout=2)
+        if self._listen_sock is not None:
+            self._listen_sock.close()
+            self._listen_sock = None
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
         logger.info("⏹️ Sistema de señales detenido")
     
     def _poll_signals(self, interval: float):
@@ -105,88 +325,123 @@ class SignalSystem:
         while self.running:
             try:
                 self._process_pending_signals()
+                self._maybe_compact()
                 time.sleep(interval)
             except Exception as e:
                 logger.error(f"❌ Error en polling de señales: {e}")
                 time.sleep(interval)
     
     def _process_pending_signals(self):
-        """Procesar señales pendientes"""
+        """Procesar las señales posteriores a la posición del consumidor"""
         try:
-            import json
+            conn = self._get_conn()
+            # Escaneo por rango sobre la clave primaria; id es monotónico, así que no se
+            # pierden filas escritas en el mismo instante que la última procesada
+            cursor = conn.execute("""
+                SELECT id, signal_type, data, timestamp, origin
+                FROM signals
+                WHERE id > ?
+                ORDER BY id ASC
+            """, (self.last_id,))
             
-            with sqlite3.connect(self.db_path) as conn:
-                # Obtener señales no procesadas desde la última verificación
-                cursor = conn.execute("""
-                    SELECT id, signal_type, data, timestamp
-                    FROM signals
-                    WHERE processed = 0 AND timestamp > ?
-                    ORDER BY timestamp ASC
-                """, (self.last_check,))
-                
-                signals = cursor.fetchall()
-                
-                for signal_id, signal_type, data_json, timestamp in signals:
-                    try:
-                        # Deserializar datos
-                        data = json.loads(data_json) if data_json else None
-                        
-                        # Ejecutar callbacks
-                        with self.lock:
-                            callbacks = self.listeners.get(signal_type, [])
-                        
-                        for callback in callbacks:
+            signals = cursor.fetchall()
+            if not signals:
+                return
+            
+            for signal_id, signal_type, data_json, timestamp, origin in signals:
+                try:
+                    # Deserializar datos
+                    data = json.loads(data_json) if data_json else None
+                    
+                    # Las señales propias ya se entregaron en proceso (bus de topics)
+                    if origin != self.origin:
+                        for handler in self.catch_all:
                             try:
-                                if asyncio.iscoroutinefunction(callback):
-                                    # Para callbacks async, crear tarea
-                                    loop = asyncio.get_event_loop()
-                                    asyncio.run_coroutine_threadsafe(callback(data), loop)
-                                else:
-                                    callback(data)
+                                handler(signal_type, data)
                             except Exception as e:
-                                logger.error(f"❌ Error en callback para {signal_type}: {e}")
-                        
-                        # Marcar como procesada
-                        conn.execute("""
-                            UPDATE signals SET processed = 1 WHERE id = ?
-                        """, (signal_id,))
-                        
-                        logger.debug(f"📨 Señal procesada: {signal_type}")
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Error procesando señal {signal_id}: {e}")
-                
-                conn.commit()
-                self.last_check = time.time()
+                                logger.error(f"❌ Error en receptor general para {signal_type}: {e}")
+                    
+                    logger.debug(f"📨 Señal procesada: {signal_type}")
+                    
+                except Exception as e:
+                    logger.error(f"❌ Error procesando señal {signal_id}: {e}")
+            
+            # Confirmar el lote completo con una sola escritura de la posición
+            self.last_id = signals[-1][0]
+            conn.execute("""
+                INSERT INTO signal_consumers (consumer, last_id, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(consumer) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    updated_at = excluded.updated_at
+            """, (self.consumer, self.last_id, time.time()))
+            conn.commit()
+            
+            self.metrics["delivered"] += len(signals)
+            self.metrics["batches"] += 1
                 
         except Exception as e:
             logger.error(f"❌ Error procesando señales pendientes: {e}")
     
-    def cleanup_old_signals(self, max_age_hours: int = 24):
-        """Limpiar señales antiguas"""
+    def _maybe_compact(self):
+        """Compactar el registro si ha pasado SIGNAL_COMPACT_INTERVAL desde la última vez"""
+        if time.time() - self.last_compaction >= SIGNAL_COMPACT_INTERVAL:
+            self.compact_signals()
+    
+    def compact_signals(self, max_rows: int = SIGNAL_MAX_ROWS, max_age_hours: float = SIGNAL_MAX_AGE_HOURS) -> Dict[str, int]:
+        """
+        Recortar el registro de señales a un anillo acotado: se borran las filas más antiguas
+        que max_age_hours y las que queden por debajo de las últimas max_rows.
+        Un consumidor que se haya quedado más atrás pierde esas señales (se registra como lag).
+        """
+        self.last_compaction = time.time()
+        result = {"deleted_by_age": 0, "deleted_by_count": 0, "remaining": 0, "max_lag": 0}
         try:
+            # Conexión propia: compact_signals también puede llamarse desde fuera del hilo de escucha
+            conn = sqlite3.connect(self.db_path)
             cutoff_time = time.time() - (max_age_hours * 3600)
+            result["deleted_by_age"] = conn.execute(
+                "DELETE FROM signals WHERE timestamp < ?", (cutoff_time,)
+            ).rowcount
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    DELETE FROM signals WHERE timestamp < ? AND processed = 1
-                """, (cutoff_time,))
-                
-                deleted_count = cursor.rowcount
-                conn.commit()
-                
-                if deleted_count > 0:
-                    logger.info(f"🧹 Limpiadas {deleted_count} señales antiguas")
-                    
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM signals").fetchone()[0]
+            result["deleted_by_count"] = conn.execute(
+                "DELETE FROM signals WHERE id <= ?", (max_id - max_rows,)
+            ).rowcount
+            conn.commit()
+            
+            result["remaining"] = conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+            min_consumer_id = conn.execute("SELECT MIN(last_id) FROM signal_consumers").fetchone()[0]
+            if min_consumer_id is not None:
+                result["max_lag"] = max(0, max_id - min_consumer_id)
+            conn.close()
+            
+            self.metrics["compactions"] += 1
+            self.metrics["deleted_by_age"] += result["deleted_by_age"]
+            self.metrics["deleted_by_count"] += result["deleted_by_count"]
+            
+            deleted = result["deleted_by_age"] + result["deleted_by_count"]
+            if deleted > 0:
+                logger.info(
+                    f"🧹 Registro de señales compactado: {deleted} borradas "
+                    f"({result['deleted_by_age']} por antigüedad, {result['deleted_by_count']} por límite), "
+                    f"{result['remaining']} restantes, lag máximo {result['max_lag']}"
+                )
         except Exception as e:
-            logger.error(f"❌ Error limpiando señales antiguas: {e}")
+            logger.error(f"❌ Error compactando señales: {e}")
+        return result
+    
+    def cleanup_old_signals(self, max_age_hours: int = 24):
+        """Limpiar señales antiguas (compactación solo por antigüedad)"""
+        self.compact_signals(max_rows=SIGNAL_MAX_ROWS, max_age_hours=max_age_hours)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas de entrega y retención del consumidor actual"""
+        metrics = dict(self.metrics)
+        metrics["consumer"] = self.consumer
+        metrics["last_id"] = self.last_id
+        metrics["last_compaction"] = self.last_compaction or None
+        return metrics
 
 # Instancia global
 signal_system = SignalSystem()
-
-# Tipos de señales predefinidas
-class Signals:
-    CONFIG_UPDATED = "config_updated"
-    ROLE_CONFIG_CHANGED = "role_config_changed"
-    DISCORD_TOKEN_CHANGED = "discord_token_changed"
-    BOT_RESTART_REQUIRED = "bot_restart_required"
\ No newline at end of file
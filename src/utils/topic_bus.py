@@ -0,0 +1,197 @@
+"""
+Bus de topics unificado para la comunicación entre componentes y procesos
+Los suscriptores locales reciben el payload en proceso, sin serializar; solo si hay un
+consumidor remoto interesado el mensaje se persiste en el registro de señales
+"""
+
+import asyncio
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+from .event_system import (
+    Coalescer, merge_change_sets, dispatcher, DISPATCH_QUEUE_SIZE, POLICY_DROP_OLDEST
+)
+from .signal_system import signal_system, SignalSystem
+
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern: str) -> "re.Pattern":
+    """
+    Compila un patrón de topic jerárquico (niveles separados por '.').
+    '*' coincide con exactamente un nivel y '#' (solo al final) con cero o más niveles.
+    """
+    segments = pattern.split('.')
+    if '#' in segments[:-1]:
+        raise ValueError(f"'#' solo puede ir al final del patrón: {pattern}")
+    regex = r'\.'.join(r'[^.]+' if segment == '*' else re.escape(segment)
+                       for segment in segments if segment != '#')
+    if segments[-1] == '#':
+        regex = regex + r'(?:\.[^.]+)*' if regex else r'[^.]+(?:\.[^.]+)*'
+    return re.compile(regex + r'\Z')
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Indica si un topic coincide con un patrón"""
+    return compile_pattern(pattern).match(topic) is not None
+
+class BusSubscription:
+    """Suscriptor del bus: patrón, callback y, opcionalmente, ventana de agrupación"""
+
+    def __init__(self, pattern: str, callback: Callable, remote: bool, coalesce: Optional[float],
+                 maxsize: int, policy: str):
+        compile_pattern(pattern)
+        self.pattern = pattern
+        self.callback = callback
+        self.remote = remote
+        # Los callbacks async pasan por la cola acotada del dispatcher; los síncronos se llaman directamente
+        self.dispatch_sub = (
+            dispatcher.register(pattern, callback, maxsize, policy)
+            if asyncio.iscoroutinefunction(callback) else None
+        )
+        self.coalescer = Coalescer(coalesce, merge_change_sets, self.deliver) if coalesce else None
+
+    def push(self, data: Any):
+        """Recibir un payload (agrupándolo si hay ventana)"""
+        if self.coalescer is not None:
+            self.coalescer.add(data)
+        else:
+            self.deliver(data)
+
+    def deliver(self, data: Any):
+        """Entregar un payload al callback"""
+        if self.dispatch_sub is not None:
+            dispatcher.submit(self.dispatch_sub, data)
+            return
+        try:
+            self.callback(data)
+        except Exception as e:
+            logger.error(f"❌ Error en suscriptor de {self.pattern}: {e}")
+
+class TopicBus:
+    """Bus de topics con entrega local directa y entrega durable solo a consumidores remotos"""
+
+    def __init__(self, signals: SignalSystem):
+        self.signals = signals
+        self.subscriptions: List[BusSubscription] = []
+        self.lock = threading.Lock()
+        # topic -> suscriptores que coinciden; se invalida al cambiar las suscripciones
+        self._routes: Dict[str, List[BusSubscription]] = {}
+        # Se ejecutan antes de entregar cada mensaje remoto (p. ej. refrescar la configuración)
+        self._remote_hooks: List[Callable[[], Any]] = []
+        signals.catch_all.append(self._deliver_remote)
+
+    def subscribe(self, pattern: str, callback: Callable, remote: bool = False,
+                  coalesce: Optional[float] = None, maxsize: int = DISPATCH_QUEUE_SIZE,
+                  policy: str = POLICY_DROP_OLDEST) -> BusSubscription:
+        """
+        Suscribirse a los topics que coincidan con pattern.
+        remote=True también recibe los mensajes publicados por otros procesos.
+        coalesce agrupa los payloads de esa ventana (segundos) en un solo change-set.
+        """
+        sub = BusSubscription(pattern, callback, remote, coalesce, maxsize, policy)
+        with self.lock:
+            self.subscriptions.append(sub)
+            self._routes = {}
+        if remote:
+            self.signals.register_patterns(self._remote_patterns())
+        logger.debug(f"Suscrito a topic '{pattern}'{' (remoto)' if remote else ''}")
+        return sub
+
+    def unsubscribe(self, sub: BusSubscription):
+        """Eliminar una suscripción"""
+        with self.lock:
+            if sub not in self.subscriptions:
+                return
+            self.subscriptions.remove(sub)
+            self._routes = {}
+        if sub.dispatch_sub is not None:
+            dispatcher.unregister(sub.dispatch_sub)
+        if sub.remote:
+            self.signals.register_patterns(self._remote_patterns())
+
+    def before_remote_delivery(self, hook: Callable[[], Any]):
+        """Registrar una función a ejecutar antes de entregar mensajes de otros procesos"""
+        self._remote_hooks.append(hook)
+
+    def _remote_patterns(self) -> List[str]:
+        with self.lock:
+            return sorted({sub.pattern for sub in self.subscriptions if sub.remote})
+
+    def _route(self, topic: str) -> List[BusSubscription]:
+        """Suscriptores que coinciden con un topic (cacheado por topic)"""
+        routes = self._routes
+        matched = routes.get(topic)
+        if matched is None:
+            with self.lock:
+                matched = [sub for sub in self.subscriptions if topic_matches(sub.pattern, topic)]
+            routes[topic] = matched
+        return matched
+
+    def publish(self, topic: str, data: Any = None):
+        """Publicar un mensaje"""
+        self.publish_many([(topic, data)])
+
+    def publish_many(self, messages: List[Tuple[str, Any]]):
+        """
+        Publicar varios mensajes: entrega local inmediata y, para los que interesen
+        a algún consumidor remoto, una única transacción en el registro de señales.
+        """
+        for topic, data in messages:
+            for sub in self._route(topic):
+                sub.push(data)
+
+        remote_patterns = self.signals.get_remote_consumers()
+        if not remote_patterns:
+            return
+        remote_messages = [
+            (topic, data) for topic, data in messages
+            if any(patterns is None or any(topic_matches(p, topic) for p in patterns)
+                   for patterns in remote_patterns)
+        ]
+        if remote_messages:
+            self.signals.emit_signals(remote_messages)
+
+    def _deliver_remote(self, topic: str, data: Any):
+        """Entregar un mensaje llegado de otro proceso a los suscriptores remotos"""
+        for hook in self._remote_hooks:
+            try:
+                hook()
+            except Exception as e:
+                logger.error(f"❌ Error en hook previo a la entrega remota: {e}")
+        for sub in self._route(topic):
+            if sub.remote:
+                sub.push(data)
+
+    def start(self, loop, poll_interval: float = 2.0):
+        """Registrar el loop para callbacks async y empezar a recibir mensajes de otros procesos"""
+        dispatcher.attach(loop)
+        self.signals.start_listening(poll_interval=poll_interval)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas de colas por suscriptor y del registro de señales"""
+        return {
+            "subscribers": dispatcher.get_metrics(),
+            "signals": self.signals.get_metrics(),
+        }
+
+# Instancia global
+bus = TopicBus(signal_system)
+
+# Topics predefinidos
+class Topics:
+    CONFIG_ALL = "config.#"
+    CONFIG_ROLES = "config.role.*"
+    CONFIG_TOKEN = "config.token.*"
+    RESTART_REQUIRED = "bot.restart_required"
+
+    @staticmethod
+    def config_key(key: str) -> str:
+        """Topic de un cambio de configuración: config.<categoría>.<clave>"""
+        if key.startswith('ROLE_'):
+            return f"config.role.{key}"
+        if key == 'DISCORD_TOKEN':
+            return f"config.token.{key}"
+        return f"config.general.{key}"
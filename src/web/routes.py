@@ -147,6 +147,7 @@ def setup_routes(app: FastAPI):
             try:
                 from src.database.models import db
                 from src.utils.bot_instance import get_bot_instance
+                from src.utils.role_cache import role_cache
                 from src.utils.dynamic_config import config
                 import asyncio
                 
@@ -157,7 +158,8 @@ def setup_routes(app: FastAPI):
                         "request": request,
                         "error_message": "Falta parámetro 'state' en el callback"
                     })
-                discord_id = await db.get_pending_verification(state)
+                from src.utils.oauth_state import resolve_state
+                discord_id, state_guild_id = await resolve_state(state)
                 if not discord_id:
                     return templates.TemplateResponse("error.html", {
                         "request": request,
@@ -185,27 +187,17 @@ def setup_routes(app: FastAPI):
                 try:
                     bot = get_bot_instance()
                     if bot and not bot.is_closed():
-                        # Determinar guild objetivo
-                        target_guild = None
-                        try:
-                            verification_channel_id = config.get('VERIFICATION_CHANNEL_ID', '')
-                            ch_id = int(verification_channel_id) if verification_channel_id.isdigit() else 0
-                        except Exception:
-                            ch_id = 0
-                        if ch_id:
+                        # Determinar guild objetivo (el estado firmado ya lo incluye)
+                        target_guild = bot.get_guild(state_guild_id) if state_guild_id else None
+                        ch_id = config.int('VERIFICATION_CHANNEL_ID')
+                        if ch_id and target_guild is None:
                             channel = bot.get_channel(ch_id)
                             if channel is not None:
                                 target_guild = channel.guild
                         if target_guild is None:
                             # Fallback: buscar guild que tenga alguno de los roles configurados
-                            genius_role_ids = []
-                            for role_key in ['ROLE_CONTRIBUTOR', 'ROLE_EDITOR', 'ROLE_MODERATOR', 'ROLE_STAFF', 'ROLE_VERIFIED_ARTIST', 'ROLE_TRANSCRIBER', 'ROLE_MEDIATOR']:
-                                role_id = config.get(role_key, '')
-                                if role_id and role_id.isdigit():
-                                    genius_role_ids.append(int(role_id))
-                            
                             for g in bot.guilds:
-                                if any(g.get_role(rid) for rid in genius_role_ids):
+                                if role_cache.resolve(g).roles_by_name:
                                     target_guild = g
                                     break
                             if target_guild is None and bot.guilds:
@@ -219,49 +211,19 @@ def setup_routes(app: FastAPI):
                                 except Exception:
                                     member = None
                             if member is not None:
-                                # Preparar roles a asignar
-                                role_ids = []
-                                genius_role_mapping = {
-                                    "Contributor": config.get('ROLE_CONTRIBUTOR', ''),
-                                    "Editor": config.get('ROLE_EDITOR', ''),
-                                    "Moderator": config.get('ROLE_MODERATOR', ''),
-                                    "Staff": config.get('ROLE_STAFF', ''),
-                                    "Verified Artist": config.get('ROLE_VERIFIED_ARTIST', ''),
-                                    "Transcriber": config.get('ROLE_TRANSCRIBER', ''),
-                                    "Mediator": config.get('ROLE_MEDIATOR', '')
-                                }
-                                
-                                print(f"🔍 DEBUG - Role mapping config: {genius_role_mapping}")
-                                print(f"🔍 DEBUG - Roles to assign: {roles_out}")
-                                
-                                for name in roles_out:
-                                    role_id = genius_role_mapping.get(name, '')
-                                    print(f"🔍 DEBUG - Checking role '{name}' -> ID: '{role_id}'")
-                                    if role_id and role_id.isdigit():
-                                        role_ids.append(int(role_id))
-                                        print(f"✅ DEBUG - Added role ID: {role_id}")
-                                
-                                verified_role_id = config.get('VERIFIED_ROLE_ID', '')
-                                if verified_role_id and verified_role_id.isdigit():
-                                    role_ids.append(int(verified_role_id))
-                                    print(f"✅ DEBUG - Added verified role ID: {verified_role_id}")
-                                
-                                print(f"🔍 DEBUG - Final role IDs to assign: {role_ids}")
-                                discord_roles = [target_guild.get_role(rid) for rid in role_ids]
-                                discord_roles = [r for r in discord_roles if r is not None]
-                                if discord_roles:
-                                    try:
-                                        await member.add_roles(*discord_roles, reason="Genius verification")
-                                    except Exception:
-                                        pass
+                                from src.bot.action_scheduler import PRIORITY_VERIFICATION
+                                from src.bot.member_mutation import MemberMutation
+                                # Preparar roles a asignar (roles de Genius + verificado)
+                                discord_roles = role_cache.resolve(target_guild).roles_for(roles_out)
+                                logger.debug(f"🔍 Roles to assign: {roles_out} -> {[r.name for r in discord_roles]}")
+                                mutation = MemberMutation(member).add_roles(*discord_roles)
                                 # Actualizar nickname
-                                try:
-                                    desired = (user_info.get('name') or user_info.get('login') or '')
-                                    desired = desired[:32] if desired else None
-                                    if desired:
-                                        await member.edit(nick=desired, reason="Genius verification")
-                                except Exception:
-                                    pass
+                                desired = (user_info.get('name') or user_info.get('login') or '')
+                                if desired:
+                                    mutation.set_nick(desired)
+                                # Roles y nickname en un único PATCH, encolado sin esperar:
+                                # la redirección no depende de los rate limits de Discord
+                                mutation.schedule(PRIORITY_VERIFICATION, reason="Genius verification")
                 except Exception as e:
                     logger.error(f"Error asignando roles/nickname en Discord: {e}")
                 
@@ -324,8 +324,9 @@ async def callback():
                                           error_message="Parámetros de callback inválidos")
     
     try:
-        # Obtener discord_id del estado
-        discord_id = await db.get_pending_verification(state)
+        # Obtener discord_id del estado (firmado o desde la tabla de pendientes)
+        from src.utils.oauth_state import resolve_state
+        discord_id, _ = await resolve_state(state)
         if not discord_id:
             return await render_template("error.html", 
                                               error_message="Estado de verificación expirado o inválido")
@@ -500,7 +501,8 @@ async def health():
         "database": {
             "status": db_status,
             "verified_users": db_stats.get("verified_users", 0),
-            "pending_verifications": db_stats.get("pending_verifications", 0)
+            "pending_verifications": db_stats.get("pending_verifications", 0),
+            "pending_sweeper": db.get_sweeper_stats()
         },
         "services": {
             "genius_api": "online",
@@ -565,8 +567,10 @@ async def status():
     
     # Obtener estadísticas de la base de datos
     db_stats = {"verified_users": 0, "pending_verifications": 0}
+    role_distribution = {}
     try:
         db_stats = await db.get_stats()
+        role_distribution = await db.get_role_distribution()
     except Exception as e:
         logger.warning(f"Error getting DB stats: {e}")
     
@@ -594,7 +598,8 @@ async def status():
         "database": {
             "status": db_status,
             "verified_users": db_stats.get("verified_users", 0),
-            "pending_verifications": db_stats.get("pending_verifications", 0)
+            "pending_verifications": db_stats.get("pending_verifications", 0),
+            "role_distribution": role_distribution
         },
         "services": {
             "genius_api": "online",
@@ -645,48 +650,28 @@ async def handle_verification_complete(discord_id: int, user_info: dict):
 async def assign_roles_to_member(member, user_info: dict, guild):
     """Asigna roles al miembro basado en su información de Genius"""
     try:
-        from src.utils.dynamic_config import config
-        
-        roles_to_add = []
+        from src.utils.role_cache import role_cache
+        from src.bot.action_scheduler import PRIORITY_VERIFICATION
+        from src.bot.member_mutation import MemberMutation
         
-        # Agregar rol de verificado general
-        verified_role_id = config.get('VERIFIED_ROLE_ID', '')
-        if verified_role_id and verified_role_id.isdigit():
-            verified_role = guild.get_role(int(verified_role_id))
-            if verified_role:
-                roles_to_add.append(verified_role)
+        # Rol de verificado general + roles específicos de Genius
+        resolved = role_cache.resolve(guild)
+        roles_to_add = resolved.roles_for(user_info.get("roles", []))
+        mutation = MemberMutation(member).add_roles(*roles_to_add)
         
-        # Mapeo de roles de Genius
-        genius_role_mapping = {
-            "Contributor": config.get('ROLE_CONTRIBUTOR', ''),
-            "Editor": config.get('ROLE_EDITOR', ''),
-            "Moderator": config.get('ROLE_MODERATOR', ''),
-            "Staff": config.get('ROLE_STAFF', ''),
-            "Verified Artist": config.get('ROLE_VERIFIED_ARTIST', ''),
-            "Transcriber": config.get('ROLE_TRANSCRIBER', ''),
-            "Mediator": config.get('ROLE_MEDIATOR', '')
-        }
+        # Nickname de Genius si es distinto del nombre visible
+        genius_name = user_info.get("name", user_info.get("login", ""))
+        if genius_name and genius_name != member.display_name:
+            mutation.set_nick(genius_name)
         
-        # Agregar roles específicos de Genius
-        for genius_role in user_info.get("roles", []):
-            role_id = genius_role_mapping.get(genius_role, '')
-            if role_id and role_id.isdigit():
-                role = guild.get_role(int(role_id))
-                if role:
-                    roles_to_add.append(role)
+        # Roles y nickname en un único PATCH (ninguno si no hay cambios)
+        changes = await mutation.schedule(PRIORITY_VERIFICATION, reason="Verificación con Genius completada")
         
-        if roles_to_add:
-            await member.add_roles(*roles_to_add, reason="Verificación con Genius completada")
+        if "roles" in changes:
             logger.info(f"✅ Roles asignados a {member}: {[role.name for role in roles_to_add]}")
         
-        # Actualizar nickname si es posible
-        try:
-            genius_name = user_info.get("name", user_info.get("login", ""))
-            if genius_name and genius_name != member.display_name:
-                await member.edit(nick=genius_name, reason="Nickname de Genius")
-                logger.info(f"✅ Nickname actualizado para {member}: {genius_name}")
-        except Exception as e:
-            logger.warning(f"⚠️ No se pudo actualizar nickname de {member}: {e}")
+        if "nick" in changes:
+            logger.info(f"✅ Nickname actualizado para {member}: {changes['nick']}")
             
     except Exception as e:
         logger.error(f"Error asignando roles a {member}: {e}")